@@ -0,0 +1 @@
+"""Benchmarks offline do pipeline (LLM falso + corpus sintético)."""
@@ -0,0 +1,65 @@
+"""
+Gerador de corpus sintético no mesmo formato de rag/igor/data:
+• N arquivos Markdown com seções (## Título) e parágrafos
+• Um CSV de FAQ (pergunta,resposta,categoria) com M linhas
+Determinístico pela semente, para comparar execuções entre si.
+"""
+
+from __future__ import annotations
+import csv
+import random
+from pathlib import Path
+from typing import List
+
+TERMS = [
+    "Python", "automação", "web scraping", "Selenium", "Playwright", "LangChain", "LangGraph",
+    "RAG", "Chroma", "embeddings", "Groq", "OpenAI", "Gemini", "Google Drive", "Mercado Livre",
+    "YOLO v8", "OpenCV", "MediaPipe", "React", "Tailwind", "Flutter", "Docker", "CI/CD",
+    "FastAPI", "PostgreSQL", "APIs REST", "chatbots jurídicos", "dashboards", "CAPTCHA",
+]
+FILLER = (
+    "o projeto entregou resultados consistentes para clientes com foco em qualidade "
+    "desempenho e manutenção usando boas práticas de engenharia de software"
+).split()
+CATEGORIES = ["habilidades", "experiencia", "projetos", "educacao", "contato"]
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.sample(FILLER, 8) + rng.sample(TERMS, 2)
+    rng.shuffle(words)
+    return " ".join(words).capitalize() + "."
+
+
+def generate_corpus(data_dir: Path, n_docs: int = 50, sections: int = 6, faq_rows: int = 200,
+                    seed: int = 42) -> Path:
+    rng = random.Random(seed)
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    for i in range(n_docs):
+        lines: List[str] = [f"# Documento {i}", ""]
+        for j in range(sections):
+            lines += [f"## Seção {j} — {rng.choice(TERMS)}", ""]
+            for _ in range(rng.randint(2, 5)):
+                lines.append(" ".join(_sentence(rng) for _ in range(rng.randint(2, 4))))
+                lines.append("")
+        (data_dir / f"doc_{i:04d}.md").write_text("\n".join(lines), encoding="utf-8")
+
+    with open(data_dir / "faq_sintetico.csv", "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["pergunta", "resposta", "categoria"])
+        for _ in range(faq_rows):
+            term = rng.choice(TERMS)
+            writer.writerow([f"O Igor conhece {term}?", _sentence(rng), rng.choice(CATEGORIES)])
+    return data_dir
+
+
+def sample_queries(n: int = 100, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    templates = [
+        "Quais projetos o Igor fez com {t}?",
+        "O Igor tem experiência em {t}?",
+        "Fale sobre {t} e {u} no portfólio",
+        "{t}",
+    ]
+    return [rng.choice(templates).format(t=rng.choice(TERMS), u=rng.choice(TERMS)) for _ in range(n)]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Execute:  python bench/embed_quality.py [--runtime onnx-int8] [--k 4]
+Compara um runtime de embeddings (onnx / onnx-int8) com o MiniLM fp32 (torch):
+• Qualidade: cosseno entre os vetores das duas variantes para o mesmo texto
+  e concordância do top‑k de recuperação (overlap@k e top‑1)
+• Custo: latência por consulta (p50/p95), vazão na codificação do corpus e
+  RSS adicional ao carregar cada modelo (aproximado: mesmo processo)
+Falha (exit 1) se a qualidade sair da tolerância.
+"""
+
+from __future__ import annotations
+import argparse, csv, json, sys, time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]          # raiz do projeto
+sys.path.insert(0, str(ROOT))
+
+from bench.corpus import generate_corpus, sample_queries  # noqa: E402
+from bench.run_bench import RESULTS_DIR, memory_mb, percentiles  # noqa: E402
+from core.embeddings import EMBED_RUNTIMES, embed_model_id, load_embeddings  # noqa: E402
+from core.loaders import iter_files  # noqa: E402
+
+
+def load_chunks(data_dir: Path) -> List[str]:
+    files = sorted(f for f in data_dir.glob("*") if f.is_file())
+    return [c.page_content for _, chunks in iter_files(files) for c in chunks]
+
+
+def faq_questions(data_dir: Path) -> List[str]:
+    questions: List[str] = []
+    for csv_path in data_dir.glob("*.csv"):
+        with open(csv_path, encoding="utf-8", newline="") as fh:
+            questions += [row["pergunta"] for row in csv.DictReader(fh) if row.get("pergunta")]
+    return questions
+
+
+def encode(runtime: str, chunks: List[str], queries: List[str]) -> Dict[str, Any]:
+    before = memory_mb()["rss_mb"]
+    start = time.perf_counter()
+    model = load_embeddings(runtime)
+    model.embed_query("aquecimento")
+    load_s = time.perf_counter() - start
+    rss_mb = memory_mb()["rss_mb"] - before
+
+    start = time.perf_counter()
+    docs = np.asarray(model.embed_documents(chunks), dtype=np.float32)
+    docs_s = time.perf_counter() - start
+
+    latencies: List[float] = []
+    vectors: List[List[float]] = []
+    for query in queries:
+        t0 = time.perf_counter()
+        vectors.append(model.embed_query(query))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "docs": docs,
+        "queries": np.asarray(vectors, dtype=np.float32),
+        "stats": {
+            "modelo": embed_model_id(runtime),
+            "carga_s": round(load_s, 3),
+            "rss_adicional_mb": round(rss_mb, 1),
+            "chunks_por_segundo": round(len(chunks) / docs_s, 1) if docs_s > 0 else 0.0,
+            "consulta": percentiles(latencies),
+        },
+    }
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quality(ref: Dict[str, Any], cand: Dict[str, Any], k: int) -> Dict[str, float]:
+    doc_cos = np.sum(_unit(ref["docs"]) * _unit(cand["docs"]), axis=1)
+    query_cos = np.sum(_unit(ref["queries"]) * _unit(cand["queries"]), axis=1)
+
+    k = min(k, len(ref["docs"]))
+    ref_top = np.argsort(-(_unit(ref["queries"]) @ _unit(ref["docs"]).T), axis=1)[:, :k]
+    cand_top = np.argsort(-(_unit(cand["queries"]) @ _unit(cand["docs"]).T), axis=1)[:, :k]
+    overlap = [len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]
+    top1 = [r[0] == c[0] for r, c in zip(ref_top, cand_top)]
+    return {
+        "cosseno_docs_medio": round(float(doc_cos.mean()), 4),
+        "cosseno_docs_min": round(float(doc_cos.min()), 4),
+        "cosseno_consultas_medio": round(float(query_cos.mean()), 4),
+        f"overlap@{k}": round(float(np.mean(overlap)), 4),
+        "top1_igual": round(float(np.mean(top1)), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Qualidade/custo de runtimes de embeddings")
+    parser.add_argument("--runtime", choices=[r for r in EMBED_RUNTIMES if r != "torch"], default="onnx-int8")
+    parser.add_argument("--data", type=Path, default=ROOT / "rag" / "igor" / "data")
+    parser.add_argument("--synthetic", type=int, default=0, help="usa N docs sintéticos em vez de --data")
+    parser.add_argument("--queries", type=int, default=100, help="consultas sintéticas além das do FAQ")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--min-overlap", type=float, default=0.9, help="overlap@k mínimo aceitável")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="cosseno médio mínimo aceitável")
+    parser.add_argument("--out", type=Path, help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    data_dir = args.data
+    if args.synthetic:
+        data_dir = Path(f"/tmp/embed-quality-{args.synthetic}")
+        generate_corpus(data_dir, n_docs=args.synthetic)
+
+    chunks = load_chunks(data_dir)
+    queries = faq_questions(data_dir) + sample_queries(args.queries)
+    print(f"== {len(chunks)} chunks · {len(queries)} consultas ==")
+
+    print("== torch (referência) ==")
+    ref = encode("torch", chunks, queries)
+    print(f"== {args.runtime} ==")
+    cand = encode(args.runtime, chunks, queries)
+
+    results = {
+        "meta": {"data": datetime.now().isoformat(timespec="seconds"), "corpus": str(data_dir)},
+        "referencia": ref["stats"],
+        "candidato": cand["stats"],
+        "qualidade": quality(ref, cand, args.k),
+    }
+    out = args.out or RESULTS_DIR / f"embed-{args.runtime}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"\n✅  Resultados salvos em {out}")
+
+    q = results["qualidade"]
+    if q[f"overlap@{min(args.k, len(chunks))}"] < args.min_overlap or q["cosseno_docs_medio"] < args.min_cosine:
+        print("\n❌  Qualidade fora da tolerância em relação ao fp32.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
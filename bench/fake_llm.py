@@ -0,0 +1,115 @@
+"""
+Chat model determinístico para benchmarks offline (substitui o Groq):
+• Mesma entrada → mesma resposta; latência simulada configurável
+• Entende o formato ReAct (responde direto com "Final Answer:")
+• Suporta streaming palavra a palavra e informa uso de tokens
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_WORDS = (
+    "o Igor trabalha com automação em Python web scraping agentes de IA LangChain LangGraph "
+    "RAG integrações de API visão computacional YOLO React Flutter e DevOps"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.05          # "tempo até o primeiro token"
+    token_latency: float = 0.0     # atraso entre tokens no streaming
+    answer_words: int = 40
+    model_name: str = "fake-chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    # ------------------------------------------------------------------ #
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content)
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        words = [_WORDS[(seed >> (i % 64)) % len(_WORDS)] for i in range(self.answer_words)]
+        text = " ".join(words).capitalize() + "."
+        if "Final Answer" in prompt and "Action Input" in prompt:  # prompt ReAct
+            return f"Thought: Sei a resposta.\nFinal Answer: {text}"
+        return text
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], text: str) -> dict:
+        prompt_tokens = sum(len(str(m.content)) // 4 for m in messages)
+        completion_tokens = len(text) // 4
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        text = self._answer(messages)
+        msg = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        text = self._answer(messages)
+        msg = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(self._answer(messages)):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(self._answer(messages)):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    @staticmethod
+    def _tokens(text: str) -> Iterator[str]:
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == 0 else " " + word
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Execute:  python bench/run_bench.py [--docs 50] [--compare bench/results/base.json]
+Benchmark offline do pipeline (sem Groq nem rede):
+• Ingestão: chunks/s na criação completa e tempo de um sync sem mudanças
+• Recuperação: p50/p95 de search/get_context por modo (vector/keyword/hybrid)
+• Agente: p50/p95 de conversar() e latência por nó do grafo
+• Memória: RSS atual/pico por etapa
+Resultados em JSON (bench/results/) para comparação entre execuções.
+"""
+
+from __future__ import annotations
+import argparse, json, os, resource, statistics, sys, tempfile, time, warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from uuid import UUID
+
+ROOT = Path(__file__).resolve().parents[1]          # raiz do projeto
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)                                       # agent/prompt.md é relativo à raiz
+
+# O RAG global é injetado pelo benchmark; nada deve carregar rag/igor
+os.environ.setdefault("DISABLE_RAG_AUTOLOAD", "1")
+# Embeddings falsos não são normalizados: a Chroma avisa a cada busca
+warnings.filterwarnings("ignore", message="Relevance scores must be between")
+
+from langchain_core.callbacks import BaseCallbackHandler  # noqa: E402
+
+from bench.corpus import generate_corpus, sample_queries  # noqa: E402
+from bench.fake_llm import FakeChatModel  # noqa: E402
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+# ---------------------------------------------------------------------------
+# Utilidades
+# ---------------------------------------------------------------------------
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {"n": 0}
+    ordered = sorted(samples_ms)
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+    return {
+        "n": len(ordered),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "media_ms": round(statistics.fmean(ordered), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def memory_mb() -> Dict[str, float]:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        current = pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        current = float("nan")
+    return {"rss_mb": round(current, 1), "pico_rss_mb": round(peak_kb / 1024, 1)}
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Mede a duração de cada nó do LangGraph via callbacks de chain."""
+
+    def __init__(self) -> None:
+        self._starts: Dict[UUID, tuple[str, float]] = {}
+        self.samples: Dict[str, List[float]] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        started = self._starts.pop(run_id, None)
+        if started:
+            node, t0 = started
+            self.samples.setdefault(node, []).append((time.perf_counter() - t0) * 1000)
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        self._starts.pop(run_id, None)
+
+
+def build_embeddings(kind: str):
+    if kind == "fake":
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        return DeterministicFakeEmbedding(size=384)
+    from core.embeddings import get_base_embeddings
+
+    return get_base_embeddings()
+
+
+# ---------------------------------------------------------------------------
+# Etapas
+# ---------------------------------------------------------------------------
+def bench_ingest(base: Path, embeddings) -> tuple[Any, Dict[str, Any]]:
+    from core.rag import RAGService
+
+    start = time.perf_counter()
+    service = RAGService(base / "data", base / "vectors", cache_dir=base / ".cache", base_embeddings=embeddings)
+    full_s = time.perf_counter() - start
+    pipeline = service.last_ingest           # o sync abaixo sobrescreve
+    sync_ms = timed(service.sync)
+    return service, {
+        "total_s": round(full_s, 3),
+        "pipeline": pipeline,
+        "sync_sem_mudancas_ms": round(sync_ms, 3),
+        "memoria": memory_mb(),
+    }
+
+
+def bench_retrieval(service, queries: List[str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for mode in ("vector", "keyword", "hybrid"):
+        service.search(queries[0], mode=mode)  # aquece (índice BM25, caches)
+        out[mode] = {
+            "search": percentiles([timed(lambda q=q: service.search(q, k=4, mode=mode)) for q in queries]),
+            "get_context": percentiles([timed(lambda q=q: service.get_context(q, mode=mode)) for q in queries]),
+        }
+    out["memoria"] = memory_mb()
+    return out
+
+
+def bench_agent(queries: List[str], turns: int, latency: float) -> Dict[str, Any]:
+    import core.agent as agent_mod
+
+    agent_mod.use_llm(FakeChatModel(latency=latency))
+    agent = agent_mod.ConversationalAgent()
+    timer = NodeTimer()
+    totals: List[float] = []
+    for i in range(turns):
+        text = queries[i % len(queries)]
+        totals.append(timed(lambda: agent.conversar(text, config={"callbacks": [timer]})))
+    return {
+        "conversar": percentiles(totals),
+        "nos": {node: percentiles(samples) for node, samples in sorted(timer.samples.items())},
+        "ultimo_prompt_tokens": agent.last_prompt_tokens,
+        "memoria": memory_mb(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Comparação
+# ---------------------------------------------------------------------------
+def _flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(_flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix] = float(data)
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> bool:
+    """
+    Imprime variações de latência; devolve False se alguma piorar além da
+    tolerância relativa E de `min_delta_ms` (ignora ruído em métricas sub‑ms).
+    """
+    cur, base = _flatten(current), _flatten(baseline)
+    ok = True
+    print(f"\n{'métrica':60} {'base':>10} {'atual':>10} {'Δ%':>8}")
+    for key in sorted(cur):
+        if not (key.endswith(("p50_ms", "p95_ms", "_s", "sync_sem_mudancas_ms"))) or key not in base:
+            continue
+        if base[key] <= 0:
+            continue
+        delta = (cur[key] - base[key]) / base[key]
+        diff_ms = (cur[key] - base[key]) * (1000 if key.endswith("_s") else 1)
+        flag = ""
+        if delta > tolerance and diff_ms > min_delta_ms:
+            flag, ok = "  ⚠️", False
+        print(f"{key:60} {base[key]:10.3f} {cur[key]:10.3f} {delta * 100:7.1f}%{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark offline do agente")
+    parser.add_argument("--docs", type=int, default=50, help="arquivos .md sintéticos")
+    parser.add_argument("--faq", type=int, default=200, help="linhas do CSV de FAQ")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=20, help="turnos de conversar()")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="latência simulada do LLM (s)")
+    parser.add_argument("--embeddings", choices=["fake", "minilm"], default="fake")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], help="sobrescreve RAG_VECTOR_BACKEND")
+    parser.add_argument("--out", type=Path, help="arquivo JSON de saída")
+    parser.add_argument("--compare", type=Path, help="JSON de referência para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="piora tolerada (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="piora absoluta mínima para acusar regressão")
+    args = parser.parse_args()
+
+    # Mede o pipeline em si, não o cache de respostas
+    os.environ.setdefault("SEMANTIC_CACHE", "0")
+    if args.vector_backend:
+        os.environ["RAG_VECTOR_BACKEND"] = args.vector_backend
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "args": {k: str(v) for k, v in vars(args).items()},
+        },
+        "memoria_inicial": memory_mb(),
+    }
+    queries = sample_queries(args.queries)
+
+    with tempfile.TemporaryDirectory(prefix="bench-rag-") as tmp:
+        base = Path(tmp)
+        print("== Corpus sintético ==")
+        generate_corpus(base / "data", n_docs=args.docs, faq_rows=args.faq)
+
+        print("== Ingestão ==")
+        service, results["ingestao"] = bench_ingest(base, build_embeddings(args.embeddings))
+
+        print("== Recuperação ==")
+        results["recuperacao"] = bench_retrieval(service, queries)
+
+        print("== Agente ==")
+        from core import rag
+
+        rag.set_rag_service(service)
+        results["agente"] = bench_agent(queries, args.turns, args.llm_latency)
+        results["embeddings_cache"] = service.embeddings.get_stats()
+        service.embeddings.close()
+
+    out = args.out or RESULTS_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n✅  Resultados salvos em {out}")
+    print(json.dumps({
+        "ingestao_chunks_por_s": (results["ingestao"]["pipeline"] or {}).get("chunks_por_segundo"),
+        "hybrid_get_context": results["recuperacao"]["hybrid"]["get_context"],
+        "conversar": results["agente"]["conversar"],
+    }, ensure_ascii=False, indent=2))
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if not compare(results, baseline, args.tolerance, args.min_delta_ms):
+            print("\n❌  Regressão acima da tolerância.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
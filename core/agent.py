@@ -1,20 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import logging
 import os
+import re
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Annotated, List
+from typing import Annotated, Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
 from typing_extensions import TypedDict
 
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain.agents import initialize_agent, AgentType
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, AIMessageChunk
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langmem.short_term import SummarizationNode
 
-from tools import EchoTool, CalculatorTool, DateTimeTool          # ← NEW
-from core.rag import rag_service
+from tools import EchoTool, CalculatorTool, DateTimeTool, WebSearchTool
+from tools import PDFGeneratorTool, CSVGeneratorTool, TXTGeneratorTool
+from core import rag
+from core.cache import SemanticCache
+from core.context import count_tokens
+from core.metrics import TraceRecorder, attach, get_registry, metrics_enabled
 
 # ---------------------------------------------------------------------------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
@@ -22,129 +31,760 @@ log = logging.getLogger("agent")
 
 # ---------- Esquema de estado ----------
 class State(TypedDict):
-    messages: Annotated[List, add_messages]
+    messages: Annotated[List, add_messages]   # histórico compacto: só perguntas/respostas brutas
     input: str
     rag_ctx: str
+    rag_hits: int
     context: dict
+    query_vec: List[float]
+    cache_hit: bool
+    tools_used: List[str]
+    prompt_prefix: List                       # persona + resumo + histórico (estável entre turnos)
+    prompt_messages: List                     # prefixo + pergunta atual com CONTEXTO (só deste turno)
+    prompt_tokens: int
+    tenant: str                               # base RAG / persona (core.rag.RAGRegistry)
 
 # ---------- Persona ----------
 PERSONA = Path("agent/prompt.md").read_text(encoding="utf-8").strip()
 
+
+@functools.lru_cache(maxsize=None)
+def persona(tenant: Optional[str] = None) -> str:
+    """Persona do tenant (`rag/<tenant>/prompt.md`); sem arquivo próprio, a padrão."""
+    path = rag.get_rag_registry().root / rag.tenant_id(tenant) / "prompt.md"
+    return path.read_text(encoding="utf-8").strip() if path.is_file() else PERSONA
+
+# ---------- Inicialização sob demanda ----------
+# LLM, agente ReAct, memória e grafo só são construídos no primeiro uso
+# (ou em `warmup()`), para que importar este módulo seja instantâneo.
+_lazy_lock = threading.RLock()
+_lazy_objs: Dict[str, Any] = {}
+
+
+def _lazy(name: str, factory: Callable[[], Any]) -> Any:
+    obj = _lazy_objs.get(name)
+    if obj is None:
+        with _lazy_lock:
+            obj = _lazy_objs.get(name)
+            if obj is None:
+                obj = _lazy_objs[name] = factory()
+    return obj
+
+
+def _build_blocking_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv("AGENT_BLOCKING_THREADS", 8)),
+        thread_name_prefix="agent-blocking",
+    )
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    """Executa trabalho CPU‑bound/bloqueante (embeddings, Chroma) fora do event loop."""
+    loop = asyncio.get_running_loop()
+    pool = _lazy("blocking_pool", _build_blocking_pool)
+    return await loop.run_in_executor(pool, functools.partial(fn, *args))
+
+
+def llm_model_name() -> str:
+    return os.getenv("GROQ_MODEL_NAME", "groq:llama-3.3-70b-versatile")
+
+
 # ---------- LLM principal ----------
-llm = init_chat_model(
-    os.getenv("GROQ_MODEL_NAME", "groq:llama-3.3-70b-versatile"),
-    temperature=float(os.getenv("GROQ_TEMPERATURE", 0.7)),
-    max_tokens=int(os.getenv("GROQ_MAX_TOKENS", 1024)),
-    groq_api_key=os.environ["GROQ_API_KEY"],
-)
+# Fila por limite de taxa, novas tentativas, hedging e fallback: ver core/llm.py
+def _build_llm():
+    from core.llm import build_llm
+
+    return build_llm(llm_model_name())
+
+
+def get_llm():
+    return _lazy("llm", _build_llm)
+
+
+def use_llm(model: Any) -> None:
+    """Troca o LLM (ex.: modelo falso em benchmarks) e descarta o que dependia dele."""
+    with _lazy_lock:
+        for name in ("agent_executor", "graph"):
+            _lazy_objs.pop(name, None)
+        _lazy_objs["llm"] = model
+
 
 # ---------- Ferramentas básicas ----------
+# Busca web só com AGENT_WEB_SEARCH=1 (depende de rede externa) e
+# exportação de documentos só com AGENT_DOC_EXPORT=1 (grava em EXPORT_DIR)
+WEB_SEARCH_ENABLED = os.getenv("AGENT_WEB_SEARCH", "0") == "1"
+DOC_EXPORT_ENABLED = os.getenv("AGENT_DOC_EXPORT", "0") == "1"
 TOOLS = [EchoTool, CalculatorTool, DateTimeTool]
+if WEB_SEARCH_ENABLED:
+    TOOLS.append(WebSearchTool())
+if DOC_EXPORT_ENABLED:
+    TOOLS += [PDFGeneratorTool(), CSVGeneratorTool(), TXTGeneratorTool()]
+
 
-agent_executor = initialize_agent(
-    tools=TOOLS,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    handle_parsing_errors=True,
-    verbose=False,
-    max_iterations=3,             # ← NOVO
-    early_stopping_method="force" # ← NOVO
-)
+def _build_agent_executor():
+    from langchain.agents import initialize_agent, AgentType
+
+    return initialize_agent(
+        tools=TOOLS,
+        llm=get_llm(),
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        handle_parsing_errors=True,
+        return_intermediate_steps=True,
+        verbose=False,
+        max_iterations=3,             # ← NOVO
+        early_stopping_method="force" # ← NOVO
+    )
+
+
+def get_agent_executor():
+    return _lazy("agent_executor", _build_agent_executor)
+
+
+# ---------- Cache semântico ----------
+def _build_response_cache() -> SemanticCache:
+    return SemanticCache(
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92)),
+        ttl=float(os.getenv("SEMANTIC_CACHE_TTL", 3600)),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_MAX", 512)),
+    )
+
+
+def get_response_cache(tenant: Optional[str] = None) -> SemanticCache | None:
+    """Um cache por tenant: respostas de uma persona nunca servem a outra."""
+    if os.getenv("SEMANTIC_CACHE", "1") == "0":
+        return None
+    return _lazy(f"response_cache:{rag.tenant_id(tenant)}", _build_response_cache)
+
+
+def peek_response_cache(tenant: Optional[str] = None) -> SemanticCache | None:
+    """Cache do tenant só se já existir (não cria)."""
+    return _lazy_objs.get(f"response_cache:{rag.tenant_id(tenant)}")
+
+
+AGENT_ERROR_MSG = "⚠️ Desculpe, ocorreu um erro ao usar as ferramentas. Tente novamente."
+LLM_ERROR_MSG = "⚠️ Desculpe, ocorreu um erro ao gerar a resposta. Tente novamente."
+BUSY_MSG = "⏳ Muitas perguntas ao mesmo tempo agora. Tente novamente em alguns instantes."
+ERROR_MESSAGES = {AGENT_ERROR_MSG, LLM_ERROR_MSG, BUSY_MSG}
+
+
+def _error_message(exc: BaseException, default: str) -> str:
+    """Limite de taxa esgotado (mesmo após fila/tentativas/fallback) ≠ erro genérico."""
+    from core.llm import is_rate_limited
+
+    return BUSY_MSG if is_rate_limited(exc) else default
 
 # ---------- Nós ----------
-def node_rag(state: State) -> State:
-    query = state["input"]
-    state["rag_ctx"] = rag_service.get_context(query) if rag_service else ""
-    return state
+# Cada nó tem versão síncrona (`invoke`) e assíncrona (`ainvoke`); as
+# assíncronas mandam o trabalho bloqueante para `run_blocking`.
+def _cacheable(state: State) -> bool:
+    """
+    O cache é chaveado só pela pergunta e compartilhado entre sessões: vale
+    apenas para a primeira pergunta da conversa (sem histórico nem resumo),
+    senão um "e o que mais?" de uma sessão responderia outra.
+    """
+    return not state["messages"] and not state["context"].get("running_summary")
+
+
+def _cache_result(state: State, cache: SemanticCache, vec: List[float]) -> dict:
+    answer = cache.lookup(vec)
+    if answer is None:
+        return {"query_vec": vec, "cache_hit": False}
+
+    log.info("Cache semântico: acerto para %r", state["input"][:60])
+    new_msgs = [HumanMessage(content=state["input"]), AIMessage(content=answer)]
+    return {"messages": new_msgs, "cache_hit": True}
+
+
+def node_cache(state: State) -> dict:
+    """
+    Embeda a pergunta com o MiniLM do RAG e procura resposta equivalente já
+    dada. Em caso de acerto o grafo termina aqui, sem RAG nem LLM.
+    """
+    cache = get_response_cache(state.get("tenant"))
+    if cache is None or not _cacheable(state):
+        return {"cache_hit": False}
+    rag_service = rag.get_rag_service(state.get("tenant"))
+    if rag_service is None:
+        return {"cache_hit": False}
+
+    # O vetor fica no cache de embeddings, então o `rag` reaproveita a consulta
+    vec = rag_service.embeddings.embed_query(state["input"])
+    return _cache_result(state, cache, vec)
+
+
+async def anode_cache(state: State) -> dict:
+    cache = get_response_cache(state.get("tenant"))
+    if cache is None or not _cacheable(state):
+        return {"cache_hit": False}
+    rag_service = await run_blocking(rag.get_rag_service, state.get("tenant"))
+    if rag_service is None:
+        return {"cache_hit": False}
+
+    vec = await run_blocking(rag_service.embeddings.embed_query, state["input"])
+    return _cache_result(state, cache, vec)
+
+
+def route_after_cache(state: State) -> str | List[str]:
+    # Em caso de miss, recuperação e preparo do histórico rodam em paralelo
+    return END if state.get("cache_hit") else ["rag", "history"]
+
+
+def node_cache_store(state: State) -> dict:
+    """
+    Guarda a resposta recém‑gerada (exceto erros e respostas de tools).
+    `query_vec` só existe quando o turno era cacheável (ver `_cacheable`).
+    """
+    cache = get_response_cache(state.get("tenant"))
+    answer = state["messages"][-1].content
+    if cache is not None and state.get("query_vec") and not state.get("tools_used") \
+            and answer not in ERROR_MESSAGES:
+        cache.store(state["query_vec"], state["input"], answer)
+    return {}
+
+
+def node_rag(state: State) -> dict:
+    rag_service = rag.get_rag_service(state.get("tenant"))
+    if rag_service is None:
+        return {"rag_ctx": "", "rag_hits": 0}
+    ctx, hits = rag_service.get_context_with_hits(state["input"])
+    return {"rag_ctx": ctx, "rag_hits": hits}
+
+
+async def anode_rag(state: State) -> dict:
+    rag_service = await run_blocking(rag.get_rag_service, state.get("tenant"))
+    if rag_service is None:
+        return {"rag_ctx": "", "rag_hits": 0}
+    ctx, hits = await run_blocking(rag_service.get_context_with_hits, state["input"])
+    return {"rag_ctx": ctx, "rag_hits": hits}
+
+
+def node_history(state: State) -> dict:
+    """
+    Monta o prefixo do prompt em paralelo ao `rag`: persona fixa no início
+    (prefixo estável entre turnos), resumo corrente e as mensagens ainda não
+    resumidas. O contexto RAG de turnos passados nunca volta ao prompt.
+    """
+    prefix: List = [SystemMessage(content=persona(state.get("tenant")))]
+    running_summary = state["context"].get("running_summary")
+    summarized = set()
+    if running_summary is not None:
+        prefix.append(SystemMessage(content=f"Resumo da conversa até aqui:\n{running_summary.summary}"))
+        summarized = running_summary.summarized_message_ids
+    prefix += [
+        m for m in state["messages"]
+        # Históricos antigos podiam conter a persona/resumos como SystemMessage
+        if not isinstance(m, SystemMessage) and m.id not in summarized
+    ]
+    return {"prompt_prefix": prefix}
+
+
+def format_user_message(question: str, rag_ctx: str) -> HumanMessage:
+    return HumanMessage(content=f"{question}\n\n### CONTEXTO\n{rag_ctx}")
+
+
+def node_format(state: State) -> dict:
+    """
+    Junção rag + history: a pergunta entra crua no histórico e com CONTEXTO
+    apenas no prompt deste turno.
+    """
+    prompt = state["prompt_prefix"] + [format_user_message(state["input"], state["rag_ctx"])]
+    return {
+        "messages": [HumanMessage(content=state["input"])],
+        "prompt_messages": prompt,
+        "prompt_tokens": sum(count_tokens(m.content) for m in prompt),
+    }
+
+
+def _agent_result(result: dict) -> tuple[str, List[str]]:
+    tools_used = [action.tool for action, _ in result.get("intermediate_steps", [])]
+    return result["output"].strip(), tools_used
+
+
+_ROLES = {"human": "Usuário", "ai": "Assistente"}
+
+
+def agent_input(messages: List) -> str:
+    """
+    Serializa o prompt do turno para o ReAct, que recebe um único `input`
+    textual: instruções de sistema (persona, resumo) no topo, histórico como
+    transcrição e, por último, a pergunta atual com CONTEXTO.
+    """
+    *earlier, current = messages
+    system = [m.content for m in earlier if isinstance(m, SystemMessage)]
+    turns = [
+        f"{_ROLES.get(m.type, m.type)}: {m.content}"
+        for m in earlier if not isinstance(m, SystemMessage)
+    ]
+    parts = system[:]
+    if turns:
+        parts.append("### HISTÓRICO\n" + "\n".join(turns))
+    parts.append(f"### PERGUNTA\n{current.content}" if parts else current.content)
+    return "\n\n".join(parts)
 
 
-def node_format(state: State) -> State:
-    """Adiciona persona + pergunta com contexto RAG ao histórico."""
-    if not state["messages"]:
-        state["messages"].append(SystemMessage(content=PERSONA))
+def agent_call(prompt: str, config: Optional[RunnableConfig] = None) -> tuple[str, List[str]]:
+    """Executa o agente LangChain (LLM + tools); devolve (resposta, tools usadas)."""
+    return _agent_result(get_agent_executor().invoke({"input": prompt}, config=config))
 
-    user_msg = f'{state["input"]}\n\n### CONTEXTO\n{state["rag_ctx"]}'
-    state["messages"].append(HumanMessage(content=user_msg))
-    return state
 
+async def aagent_call(prompt: str, config: Optional[RunnableConfig] = None) -> tuple[str, List[str]]:
+    """Versão assíncrona: LLM via `ainvoke`, tools via `_arun`."""
+    return _agent_result(await get_agent_executor().ainvoke({"input": prompt}, config=config))
 
-def safe_agent_call(prompt: str) -> str:
+
+def safe_agent_call(prompt: str, config: Optional[RunnableConfig] = None) -> tuple[str, List[str]]:
     """
-    Executa o agente LangChain (LLM + tools) capturando exceções.
-    Se o modelo ou a tool falharem, devolve aviso ao usuário.
+    `agent_call` capturando exceções: se o modelo ou a tool falharem,
+    devolve aviso ao usuário. `config` propaga os callbacks do grafo
+    (necessário para o streaming de tokens).
     """
     try:
-        return agent_executor.run(prompt).strip()
+        return agent_call(prompt, config)
+    except Exception as exc:  # noqa: BLE001
+        log.error("Falha no agente/tools: %s", exc, exc_info=True)
+        return _error_message(exc, AGENT_ERROR_MSG), []
+
+
+async def asafe_agent_call(prompt: str, config: Optional[RunnableConfig] = None) -> tuple[str, List[str]]:
+    try:
+        return await aagent_call(prompt, config)
     except Exception as exc:  # noqa: BLE001
         log.error("Falha no agente/tools: %s", exc, exc_info=True)
-        return "⚠️ Desculpe, ocorreu um erro ao usar as ferramentas. Tente novamente."
+        return _error_message(exc, AGENT_ERROR_MSG), []
 
 
-def node_llm_or_tool(state: State) -> State:
+def node_llm_or_tool(state: State, config: RunnableConfig) -> dict:
     """
     Decide automaticamente: LLM puro ou chamada de tool.
     Zero-shot ReAct do LangChain cuida da escolha.
     """
-    prompt = state["messages"][-1].content  # última mensagem do usuário com contexto
-    response_text = safe_agent_call(prompt)
-    state["messages"].append(AIMessage(content=response_text))
-    return state
+    prompt = agent_input(state["prompt_messages"])  # persona + histórico + pergunta com contexto
+    response_text, tools_used = safe_agent_call(prompt, config)
+    return {"messages": [AIMessage(content=response_text)], "tools_used": tools_used}
+
+
+async def anode_llm_or_tool(state: State, config: RunnableConfig) -> dict:
+    prompt = agent_input(state["prompt_messages"])
+    response_text, tools_used = await asafe_agent_call(prompt, config)
+    return {"messages": [AIMessage(content=response_text)], "tools_used": tools_used}
+
+
+# ---------- Roteador ----------
+# Classificador barato (regex) que decide se o turno precisa de tool.
+# A maioria das perguntas do portfólio vai direto para UMA chamada ao LLM,
+# poupando o scaffolding do ReAct (1+ chamadas extras por turno).
+_TOOL_PATTERNS = {
+    "CalculatorTool": re.compile(
+        r"\d\s*[-+*/^%x×÷]\s*\(?\d|\b(calcul\w*|quanto (é|e|dá|da)|raiz|porcentagem|percentual|soma|multiplica)",
+        re.IGNORECASE,
+    ),
+    "DateTimeTool": re.compile(
+        r"\b(que horas|hora atual|horário|horario|data (de )?hoje|que dia|dia (é|e) hoje|data atual|what time)",
+        re.IGNORECASE,
+    ),
+    "EchoTool": re.compile(r"\b(repita|repete|ecoe|echo)\b", re.IGNORECASE),
+}
+if WEB_SEARCH_ENABLED:
+    _TOOL_PATTERNS["web_search"] = re.compile(
+        r"\b(pesquise|pesquisa na|busque|procure na|na (web|internet)|not[ií]cias?|google|search)\b",
+        re.IGNORECASE,
+    )
+if DOC_EXPORT_ENABLED:
+    _TOOL_PATTERNS["document_export"] = re.compile(
+        r"\b(ger[ae]\w*|export\w*|salv[ae]\w*|cri[ae]\w*)\b.*\b(pdf|csv|txt)\b",
+        re.IGNORECASE,
+    )
+
+
+def needs_tools(text: str) -> bool:
+    return any(pattern.search(text) for pattern in _TOOL_PATTERNS.values())
+
+
+def route_turn(state: State) -> str:
+    """AGENT_ROUTER = heuristic (padrão) | tools (sempre ReAct) | llm (nunca tools)."""
+    mode = os.getenv("AGENT_ROUTER", "heuristic")
+    if mode == "tools":
+        return "llm_or_tool"
+    if mode == "llm":
+        return "llm"
+    return "llm_or_tool" if needs_tools(state["input"]) else "llm"
+
+
+def node_llm(state: State, config: RunnableConfig) -> dict:
+    """Resposta direta: uma única chamada ao LLM com histórico + contexto."""
+    try:
+        reply = get_llm().invoke(state["prompt_messages"], config=config)
+        text = reply.content.strip()
+    except Exception as exc:  # noqa: BLE001
+        log.error("Falha no LLM: %s", exc, exc_info=True)
+        text = _error_message(exc, LLM_ERROR_MSG)
+    return {"messages": [AIMessage(content=text)], "tools_used": []}
+
+
+async def anode_llm(state: State, config: RunnableConfig) -> dict:
+    try:
+        reply = await get_llm().ainvoke(state["prompt_messages"], config=config)
+        text = reply.content.strip()
+    except Exception as exc:  # noqa: BLE001
+        log.error("Falha no LLM: %s", exc, exc_info=True)
+        text = _error_message(exc, LLM_ERROR_MSG)
+    return {"messages": [AIMessage(content=text)], "tools_used": []}
 
 
 # ---------- Memória – LangMem ----------
-summarization_model = llm.bind(max_tokens=128)
-summarize_node = SummarizationNode(
-    model=summarization_model,
-    max_tokens=int(os.getenv("GROQ_MAX_TOKENS", 1024)),
-    max_summary_tokens=128,
-    input_messages_key="messages",
-    output_messages_key="messages",
-)
+# O resumo saiu do caminho da resposta: roda em segundo plano depois que a
+# resposta é entregue, e só quando o histórico passa do limite de tokens.
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("GROQ_MAX_TOKENS", 1024))
+
+
+@dataclass
+class SummaryResult:
+    running_summary: Any
+
+    def apply(self, current: List) -> List:
+        """Compacta o histórico: mensagens já resumidas saem (o resumo as representa)."""
+        summarized = self.running_summary.summarized_message_ids
+        return [m for m in current if m.id not in summarized]
+
+
+def needs_summary(history: List) -> bool:
+    from langchain_core.messages.utils import count_tokens_approximately
+
+    return count_tokens_approximately(history) > SUMMARY_TRIGGER_TOKENS
+
+
+def summarize_history(history: List, running_summary: Any) -> Optional[SummaryResult]:
+    """Resumo LangMem do histórico; None se não houve o que resumir ou se falhou."""
+    from langmem.short_term import summarize_messages
+
+    model = get_llm().bind(max_tokens=128)
+    recorder = TraceRecorder("summary") if metrics_enabled() else None
+    if recorder is not None:
+        model = model.with_config(callbacks=[recorder], metadata={"langgraph_node": "summary"})
+    error: Optional[Exception] = None
+    try:
+        result = summarize_messages(
+            history,
+            running_summary=running_summary,
+            model=model,
+            max_tokens=SUMMARY_TRIGGER_TOKENS,
+            max_summary_tokens=128,
+        )
+    except Exception as exc:  # noqa: BLE001
+        log.error("Falha ao resumir histórico: %s", exc, exc_info=True)
+        error = exc
+        return None
+    finally:
+        if recorder is not None:
+            get_registry().record(recorder.finish(error))
+    if result.running_summary is None or result.running_summary is running_summary:
+        return None
+    return SummaryResult(result.running_summary)
+
+
+def schedule_summary(history: List, running_summary: Any) -> Optional[Future]:
+    if not needs_summary(history):
+        return None
+    pool = _lazy("blocking_pool", _build_blocking_pool)
+    return pool.submit(summarize_history, list(history), running_summary)
+
 
 # ---------- Grafo ----------
-builder = StateGraph(State)
-builder.add_node("rag", node_rag)
-builder.add_node("format", node_format)
-builder.add_node("llm_or_tool", node_llm_or_tool)     # ← NEW
-builder.add_node("summarize", summarize_node)
+def _build_graph():
+    builder = StateGraph(State)
+    builder.add_node("cache", RunnableLambda(node_cache, afunc=anode_cache))
+    builder.add_node("rag", RunnableLambda(node_rag, afunc=anode_rag))
+    builder.add_node("history", node_history)
+    builder.add_node("format", node_format)
+    builder.add_node("llm", RunnableLambda(node_llm, afunc=anode_llm))
+    builder.add_node("llm_or_tool", RunnableLambda(node_llm_or_tool, afunc=anode_llm_or_tool))
+    builder.add_node("cache_store", node_cache_store)
+
+    builder.add_edge(START, "cache")
+    builder.add_conditional_edges("cache", route_after_cache, ["rag", "history", END])
+    builder.add_edge(["rag", "history"], "format")
+    builder.add_conditional_edges("format", route_turn, ["llm", "llm_or_tool"])
+    builder.add_edge("llm", "cache_store")
+    builder.add_edge("llm_or_tool", "cache_store")
+    builder.add_edge("cache_store", END)
 
-builder.add_edge(START, "rag")
-builder.add_edge("rag", "format")
-builder.add_edge("format", "llm_or_tool")
-builder.add_edge("llm_or_tool", "summarize")
-builder.add_edge("summarize", END)
+    return builder.compile()
+
+
+def get_graph():
+    return _lazy("graph", _build_graph)
+
+
+def warmup(background: bool = True, tenant: Optional[str] = None) -> threading.Thread | None:
+    """Constrói LLM/grafo e carrega o RAG (MiniLM + Chroma) antecipadamente."""
+    def _run() -> None:
+        try:
+            get_graph()
+            get_agent_executor()
+        except Exception as exc:  # noqa: BLE001
+            log.error("Falha no warmup do agente: %s", exc, exc_info=True)
+        rag.warmup(background=False, tenant=tenant)
+
+    if not background:
+        _run()
+        return None
+    thread = threading.Thread(target=_run, name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def __getattr__(name: str) -> Any:
+    # Compatibilidade com os antigos globais do módulo
+    factories = {
+        "llm": get_llm,
+        "agent_executor": get_agent_executor,
+        "graph": get_graph,
+        "rag_service": rag.get_rag_service,
+    }
+    if name in factories:
+        return factories[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ---------- Streaming ----------
+REACT_NODE = "llm_or_tool"
+DIRECT_NODE = "llm"
+
+
+class _TokenSelector:
+    """Decide quais chunks do stream `messages` são tokens da resposta final."""
+
+    def __init__(self) -> None:
+        self._react = _FinalAnswerFilter()
+
+    def feed(self, chunk: Any, meta: dict) -> str:
+        if not isinstance(chunk, AIMessageChunk):
+            return ""  # mensagens completas vindas das saídas dos nós
+        node = meta.get("langgraph_node")
+        if node == DIRECT_NODE:
+            return chunk.content if isinstance(chunk.content, str) else ""
+        if node == REACT_NODE:
+            return self._react.feed(chunk)
+        return ""
+
+
+class _FinalAnswerFilter:
+    """
+    Filtra tokens do ReAct: descarta o rascunho (Thought/Action/Observation)
+    e repassa só o que vem depois de "Final Answer:". Cada chamada ao LLM
+    (id da mensagem) tem seu próprio buffer.
+    """
+
+    MARKER = "Final Answer:"
+
+    def __init__(self) -> None:
+        self._run_id: Optional[str] = None
+        self._buffer = ""
+        self._open = False
+        self._started = False
+
+    def feed(self, chunk: Any) -> str:
+        content = chunk.content if isinstance(chunk.content, str) else ""
+        if chunk.id != self._run_id:
+            self._run_id, self._buffer, self._open = chunk.id, "", False
+        if not self._open:
+            self._buffer += content
+            idx = self._buffer.find(self.MARKER)
+            if idx < 0:
+                return ""
+            self._open = True
+            content = self._buffer[idx + len(self.MARKER):]
+        if not self._started:
+            # Descarta o espaço/quebra de linha logo após o marcador
+            content = content.lstrip()
+            self._started = bool(content)
+        return content
 
-graph = builder.compile()
 
 # ---------- Wrapper ----------
 class ConversationalAgent:
     """Agente com LangGraph + LangChain + LangMem + Tools."""
 
-    def __init__(self) -> None:
-        self._running_summary = None
-        self._history: List = []
-
-        summarize_node.model = llm  # garante que memória use o mesmo modelo
+    def __init__(
+        self,
+        history: Optional[List] = None,
+        running_summary: Any = None,
+        tenant: Optional[str] = None,
+    ) -> None:
+        # Base RAG, persona e cache semântico deste agente (padrão: RAG_DEFAULT_TENANT)
+        self.tenant = rag.tenant_id(tenant)
+        self._running_summary = running_summary
+        self._history: List = list(history) if history else []
+        # Serializa turnos concorrentes da mesma conversa (aconversar)
+        self._turn_lock = asyncio.Lock()
+        # Resumo LangMem em andamento (disparado depois da última resposta)
+        self.pending_summary: Optional[Future] = None
+        self.last_prompt_tokens = 0
+        self.last_turn: Optional[dict] = None   # resumo do trace do último turno
 
-    def conversar(self, text: str) -> str:
-        init_state: State = {
+    def _initial_state(self, text: str) -> State:
+        return {
             "messages": self._history,
             "input": text,
             "rag_ctx": "",
+            "rag_hits": 0,
             "context": {"running_summary": self._running_summary} if self._running_summary else {},
+            "query_vec": [],
+            "cache_hit": False,
+            "tools_used": [],
+            "prompt_prefix": [],
+            "prompt_messages": [],
+            "prompt_tokens": 0,
+            "tenant": self.tenant,
         }
 
-        final = graph.invoke(init_state)
+    @staticmethod
+    def _interrupted(final: dict, streamed: List[str]) -> str:
+        """
+        Falha do LLM no meio do stream: o nó devolve a mensagem de erro, mas o
+        cliente já recebeu parte da resposta. Histórico passa a guardar o que
+        foi visto (parcial + aviso); devolve o trecho que ainda falta enviar.
+        """
+        last = final["messages"][-1]
+        if not streamed or last.content not in ERROR_MESSAGES:
+            return ""
+        tail = f"\n\n{last.content}"
+        final["messages"][-1] = last.model_copy(update={"content": "".join(streamed) + tail})
+        return tail
 
+    def _commit(self, final: dict) -> str:
         self._history = final["messages"]
-        self._running_summary = final["context"].get("running_summary") if "context" in final else None
-
+        self.last_prompt_tokens = final.get("prompt_tokens", 0)
+        self.pending_summary = schedule_summary(self._history, self._running_summary)
         return self._history[-1].content
 
+    @contextmanager
+    def _traced(self, config: Optional[RunnableConfig]) -> Iterator[Optional[RunnableConfig]]:
+        """Anexa um `TraceRecorder` ao turno e registra o trace ao final."""
+        if not metrics_enabled():
+            yield config
+            return
+        recorder = TraceRecorder("turn")
+        error: Optional[Exception] = None
+        try:
+            yield attach(config, recorder)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            trace = recorder.finish(error)
+            get_registry().record(trace)
+            self.last_turn = trace.summary()
+
+    def _apply_summary(self, result: Optional[SummaryResult]) -> None:
+        self.pending_summary = None
+        if result is not None:
+            self._history = result.apply(self._history)
+            self._running_summary = result.running_summary
+
+    def wait_summary(self) -> None:
+        """Aplica o resumo pendente (normalmente já pronto quando chega a próxima pergunta)."""
+        if self.pending_summary is not None:
+            self._apply_summary(self.pending_summary.result())
+
+    async def await_summary(self) -> None:
+        if self.pending_summary is not None:
+            self._apply_summary(await asyncio.wrap_future(self.pending_summary))
+
+    def conversar(self, text: str, config: Optional[RunnableConfig] = None) -> str:
+        self.wait_summary()
+        with self._traced(config) as config:
+            final = get_graph().invoke(self._initial_state(text), config=config)
+            return self._commit(final)
+
+    async def aconversar(self, text: str, config: Optional[RunnableConfig] = None) -> str:
+        """
+        Versão assíncrona: LLM e tools não bloqueiam o event loop e a
+        recuperação RAG roda no pool de threads, permitindo várias
+        sessões (um agente por sessão) no mesmo processo.
+        """
+        async with self._turn_lock:
+            await self.await_summary()
+            with self._traced(config) as config:
+                final = await get_graph().ainvoke(self._initial_state(text), config=config)
+                return self._commit(final)
+
+    def stream(self, text: str, config: Optional[RunnableConfig] = None) -> Iterator[str]:
+        """
+        Gera os tokens da resposta final à medida que o LLM os emite.
+        A mensagem completa entra no histórico ao fim da iteração.
+        """
+        self.wait_summary()
+        final: Optional[dict] = None
+        streamed: List[str] = []
+        selector = _TokenSelector()
+        with self._traced(config) as config:
+            for mode, payload in get_graph().stream(
+                self._initial_state(text), config=config, stream_mode=["messages", "values"]
+            ):
+                if mode == "values":
+                    final = payload
+                    continue
+                chunk, meta = payload
+                if piece := selector.feed(chunk, meta):
+                    streamed.append(piece)
+                    yield piece
+
+            tail = self._interrupted(final, streamed)
+            answer = self._commit(final)
+        if not streamed:
+            # Acerto de cache, erro ou resposta sem "Final Answer:" – entrega de uma vez
+            yield answer
+        elif tail:
+            yield tail
+
+    async def astream(self, text: str, config: Optional[RunnableConfig] = None) -> AsyncIterator[str]:
+        """Versão assíncrona de `stream`."""
+        async with self._turn_lock:
+            await self.await_summary()
+            final: Optional[dict] = None
+            streamed: List[str] = []
+            selector = _TokenSelector()
+            with self._traced(config) as config:
+                async for mode, payload in get_graph().astream(
+                    self._initial_state(text), config=config, stream_mode=["messages", "values"]
+                ):
+                    if mode == "values":
+                        final = payload
+                        continue
+                    chunk, meta = payload
+                    if piece := selector.feed(chunk, meta):
+                        streamed.append(piece)
+                        yield piece
+
+                tail = self._interrupted(final, streamed)
+                answer = self._commit(final)
+            if not streamed:
+                yield answer
+            elif tail:
+                yield tail
+
+    def warmup(self, background: bool = True) -> threading.Thread | None:
+        return warmup(background=background, tenant=self.tenant)
+
     def get_status(self) -> dict:
+        """Não força nenhuma inicialização: só reporta o que já está pronto."""
+        rag_service = rag.get_rag_registry().peek(self.tenant)
         return {
-            "llm_model": llm.model_name,
+            "llm_model": llm_model_name(),
+            "llm_ready": "llm" in _lazy_objs,
+            "llm_stats": llm.get_stats() if hasattr(llm := _lazy_objs.get("llm"), "get_stats") else None,
+            "graph_ready": "graph" in _lazy_objs,
+            "tenant": self.tenant,
+            "rag_state": rag.rag_state(self.tenant),
+            "rag_tenants": rag.get_rag_registry().get_stats(),
             "rag_available": rag_service.is_available() if rag_service else False,
             "has_memory": self._running_summary is not None,
+            "summary_pending": self.pending_summary is not None and not self.pending_summary.done(),
+            "history_messages": len(self._history),
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "semantic_cache": cache.get_stats() if (cache := peek_response_cache(self.tenant)) else None,
             "tools": [t.name for t in TOOLS],
+            "last_turn": self.last_turn,
+            "metrics": get_registry().snapshot() if metrics_enabled() else None,
         }
@@ -0,0 +1,148 @@
+"""
+Perguntas em lote (avaliações offline / noturnas):
+• Perguntas independentes, sem histórico compartilhado
+• Todas as consultas embedadas numa chamada ao encoder e recuperadas em bloco
+• Chamadas ao LLM com concorrência limitada; 429 e falhas transitórias do
+  modelo ficam com o ResilientChatModel (fila, tentativas, fallback)
+• Perguntas com tools: novas tentativas com backoff exponencial + jitter
+  quando o agente falha por erro transitório que não é limite de taxa
+• Resposta + tempos por pergunta e totais do lote
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import SystemMessage
+
+from core import rag
+from core.llm import backoff_delay, is_rate_limited, is_transient, retry_after
+from core.metrics import TraceRecorder, get_registry, metrics_enabled
+from core.vectorstores import Where
+
+
+@dataclass
+class BatchAnswer:
+    question: str
+    answer: str = ""
+    error: Optional[str] = None
+    attempts: int = 0
+    rag_hits: int = 0
+    tools_used: List[str] = field(default_factory=list)
+    llm_ms: float = 0.0
+
+
+@dataclass
+class BatchReport:
+    answers: List[BatchAnswer]
+    timings: Dict[str, float]
+
+    @property
+    def failed(self) -> List[BatchAnswer]:
+        return [a for a in self.answers if a.error is not None]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"answers": [asdict(a) for a in self.answers], "timings": self.timings}
+
+
+# ---------- Lote ----------
+async def aanswer_batch(
+    questions: Sequence[str],
+    concurrency: int | None = None,
+    max_retries: int | None = None,
+    tools: bool = False,
+    mode: str | None = None,
+    where: Where = None,
+    tenant: str | None = None,
+) -> BatchReport:
+    """
+    Responde `questions` de forma independente. A recuperação é feita em
+    bloco antes das chamadas ao LLM; estas rodam com no máximo `concurrency`
+    em voo (BATCH_CONCURRENCY). Com `tools=True`, perguntas que o roteador
+    marca como de ferramenta passam pelo agente ReAct, com até `max_retries`
+    novas tentativas (BATCH_MAX_RETRIES). `tenant` escolhe a
+    base RAG e a persona (padrão: RAG_DEFAULT_TENANT).
+    """
+    from core import agent
+
+    concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", 8))
+    max_retries = int(os.getenv("BATCH_MAX_RETRIES", 4)) if max_retries is None else max_retries
+    questions = list(questions)
+    answers = [BatchAnswer(question=q) for q in questions]
+    start = time.perf_counter()
+
+    # 1) Recuperação em bloco (um lote no encoder + busca vetorial única)
+    rag_service = await agent.run_blocking(rag.get_rag_service, tenant)
+    if rag_service is not None and questions:
+        contexts = await agent.run_blocking(rag_service.get_contexts, questions, None, mode, where)
+    else:
+        contexts = [("", 0)] * len(questions)
+    retrieval_s = time.perf_counter() - start
+
+    # 2) LLM com concorrência limitada
+    llm = agent.get_llm()
+    persona = SystemMessage(content=agent.persona(tenant))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(item: BatchAnswer, ctx: str, hits: int) -> None:
+        item.rag_hits = hits
+        message = agent.format_user_message(item.question, ctx)
+        use_tools = tools and agent.needs_tools(item.question)
+        error: Optional[BaseException] = None
+        async with semaphore:
+            # Trace aberto só depois da fila: mede a chamada, não a espera
+            recorder = TraceRecorder("batch") if metrics_enabled() else None
+            config: Dict[str, Any] = {"metadata": {"langgraph_node": "batch"}}
+            if recorder is not None:
+                config["callbacks"] = [recorder]
+            t0 = time.perf_counter()
+            # O LLM já tenta de novo internamente: repetir aqui multiplicaria as
+            # chamadas contra uma API limitada. Só o agente (tools) é repetido.
+            for attempt in range(max_retries + 1 if use_tools else 1):
+                item.attempts = attempt + 1
+                try:
+                    if use_tools:
+                        item.answer, item.tools_used = await agent.aagent_call(agent.agent_input([persona, message]), config)
+                    else:
+                        reply = await llm.ainvoke([persona, message], config=config)
+                        item.answer = reply.content.strip()
+                    error = None
+                    break
+                except Exception as exc:  # noqa: BLE001
+                    error = exc
+                    if attempt >= max_retries or not is_transient(exc) or is_rate_limited(exc):
+                        break
+                    await asyncio.sleep(retry_after(exc) or backoff_delay(attempt))
+            item.llm_ms = round((time.perf_counter() - t0) * 1000, 3)
+
+        if error is not None:
+            item.error = f"{type(error).__name__}: {error}"
+            item.answer = agent._error_message(error, agent.AGENT_ERROR_MSG if use_tools else agent.LLM_ERROR_MSG)
+        if recorder is not None:
+            get_registry().record(recorder.finish(error))
+
+    await asyncio.gather(*(run_one(item, ctx, hits) for item, (ctx, hits) in zip(answers, contexts)))
+
+    total_s = time.perf_counter() - start
+    llm_ms = [a.llm_ms for a in answers]
+    return BatchReport(
+        answers=answers,
+        timings={
+            "perguntas": len(answers),
+            "falhas": sum(a.error is not None for a in answers),
+            "tentativas_extras": sum(max(0, a.attempts - 1) for a in answers),
+            "recuperacao_s": round(retrieval_s, 3),
+            "llm_s": round(total_s - retrieval_s, 3),
+            "total_s": round(total_s, 3),
+            "llm_medio_ms": round(sum(llm_ms) / len(llm_ms), 3) if llm_ms else 0.0,
+            "perguntas_por_s": round(len(answers) / total_s, 2) if total_s > 0 else 0.0,
+        },
+    )
+
+
+def answer_batch(questions: Sequence[str], **kwargs: Any) -> BatchReport:
+    """Versão síncrona de `aanswer_batch` (não use dentro de um event loop)."""
+    return asyncio.run(aanswer_batch(questions, **kwargs))
@@ -0,0 +1,104 @@
+"""
+Índice de palavras‑chave (BM25) em memória:
+• Tokenização sem acentos, preservando termos como "c++", "node.js", "v8"
+• Índice invertido termo → (doc, tf) e ranqueamento Okapi BM25
+• Fusão de rankings por Reciprocal Rank Fusion (RRF)
+"""
+
+from __future__ import annotations
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+_TOKEN = re.compile(r"\w[\w+#.\-]*")
+_STOPWORDS = frozenset(
+    "a o as os e de da do das dos em no na nos nas um uma uns umas para por com sem "
+    "que se ao aos à às é ou como mais mas qual quais ele ela seu sua seus suas the of and to in"
+    .split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    tokens = (t.rstrip(".-") for t in _TOKEN.findall(text))
+    return [t for t in tokens if t and t not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._keys: List[Hashable] = []
+        self._docs: List[Document] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._idf: Dict[str, float] = {}
+        self._avgdl = 0.0
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[Hashable, Document]], **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        for key, doc in items:
+            index._add(key, doc)
+        index._finalize()
+        return index
+
+    def _add(self, key: Hashable, doc: Document) -> None:
+        doc_idx = len(self._docs)
+        terms = Counter(tokenize(doc.page_content))
+        self._keys.append(key)
+        self._docs.append(doc)
+        self._lengths.append(sum(terms.values()))
+        for term, tf in terms.items():
+            self._postings[term].append((doc_idx, tf))
+
+    def _finalize(self) -> None:
+        n = len(self._docs)
+        self._avgdl = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self._postings.items()
+        }
+
+    def search(self, query: str, k: int = 6) -> List[Tuple[Hashable, Document, float]]:
+        if not self._docs:
+            return []
+        scores: Dict[int, float] = defaultdict(float)
+        k1, b, avgdl = self.k1, self.b, self._avgdl or 1.0
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = self._idf[term]
+            for doc_idx, tf in posting:
+                norm = k1 * (1 - b + b * self._lengths[doc_idx] / avgdl)
+                scores[doc_idx] += idf * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self._keys[i], self._docs[i], score) for i, score in best]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Tuple[Hashable, Document]]],
+    k: int = 6,
+    rrf_k: int = 60,
+    weights: Sequence[float] | None = None,
+) -> List[Tuple[Document, float]]:
+    """Combina listas ranqueadas de (chave, doc): score = Σ wᵢ / (rrf_k + posição)."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Hashable, float] = defaultdict(float)
+    docs: Dict[Hashable, Document] = {}
+    for weight, ranking in zip(weights, rankings):
+        for rank, (key, doc) in enumerate(ranking, start=1):
+            scores[key] += weight / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+    return [(docs[key], score) for key, score in best]
@@ -0,0 +1,117 @@
+"""
+Cache semântico de respostas:
+• Guarda (embedding da pergunta → resposta) das últimas interações
+• Busca por similaridade de cosseno acima de um limiar configurável
+• Expiração por TTL + despejo LRU, com estatísticas de acerto
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray
+    question: str
+    answer: str
+    created_at: float
+    hits: int = 0
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600, max_entries: int = 512) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # Matriz (n × d) reconstruída só quando o conteúdo muda
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+        self._stats = {"hits": 0, "misses": 0, "expirados": 0, "despejados": 0}
+
+    # ------------------------------------------------------------------ #
+    # API pública
+    # ------------------------------------------------------------------ #
+    def lookup(self, vector: Sequence[float]) -> Optional[str]:
+        query = self._normalize(vector)
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self._stats["misses"] += 1
+                return None
+
+            matrix = self._get_matrix()
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+
+            entry_id = self._matrix_ids[best]
+            entry = self._entries[entry_id]
+            entry.hits += 1
+            self._entries.move_to_end(entry_id)
+            self._stats["hits"] += 1
+            return entry.answer
+
+    def store(self, vector: Sequence[float], question: str, answer: str) -> None:
+        with self._lock:
+            self._entries[self._next_id] = _Entry(
+                vector=self._normalize(vector),
+                question=question,
+                answer=answer,
+                created_at=time.monotonic(),
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["despejados"] += 1
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["entradas"] = len(self._entries)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 3) if total else 0.0
+        stats["limiar"] = self.threshold
+        return stats
+
+    # ------------------------------------------------------------------ #
+    # Internos (chamados com o lock adquirido)
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm else arr
+
+    def _expire(self) -> None:
+        if self.ttl <= 0:
+            return
+        limit = time.monotonic() - self.ttl
+        expired = [eid for eid, e in self._entries.items() if e.created_at < limit]
+        for eid in expired:
+            del self._entries[eid]
+        if expired:
+            self._stats["expirados"] += len(expired)
+            self._matrix = None
+
+    def _get_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = np.stack([self._entries[eid].vector for eid in self._matrix_ids])
+        return self._matrix
@@ -0,0 +1,143 @@
+"""
+Montagem do contexto RAG por orçamento de tokens:
+• Conta tokens com tiktoken (fallback aproximado se o encoding faltar)
+• Funde chunks adjacentes/sobrepostos do mesmo arquivo via `start_index`/`end_index`
+• Remove quase‑duplicatas (Jaccard de shingles)
+• Preenche o orçamento de forma gulosa por score, sem parar no 1º que não cabe
+"""
+
+from __future__ import annotations
+import os
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from core.loaders import section_prefix
+
+_encoding: Any = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding() -> Any:
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding(os.getenv("TIKTOKEN_ENCODING", "cl100k_base"))
+                except Exception:  # noqa: BLE001 – sem rede/arquivo do encoding
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    if enc:
+        return len(enc.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4) if text else 0
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        max_tokens: int = 400,
+        dedup_threshold: float = 0.85,
+        separator: str = "\n\n",
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.separator = separator
+
+    def build(self, scored: Sequence[Tuple[Document, float]], max_tokens: Optional[int] = None) -> str:
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        pieces = self._dedupe(self._merge_overlaps(scored))
+        pieces.sort(key=lambda item: item[1], reverse=True)
+
+        sep_tokens = count_tokens(self.separator)
+        parts: List[str] = []
+        used = 0
+        for text, _ in pieces:
+            cost = count_tokens(text) + (sep_tokens if parts else 0)
+            if used + cost > budget:
+                continue  # um chunk menor adiante ainda pode caber
+            parts.append(text)
+            used += cost
+        return self.separator.join(parts)
+
+    # ------------------------------------------------------------------ #
+    # Etapas
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _merge_overlaps(scored: Sequence[Tuple[Document, float]]) -> List[Tuple[str, float]]:
+        """
+        Une trechos contíguos do mesmo documento — mesmo arquivo, seção e
+        linha (CSV/JSONL) — pelos índices `start_index`/`end_index` dos
+        metadados; os demais passam direto. O caminho de títulos de uma seção
+        markdown sai de cada trecho e volta uma vez à frente do bloco unido.
+        """
+        loose: List[Tuple[str, float]] = []
+        spans: dict = {}
+        for doc, score in scored:
+            text = doc.page_content.strip()
+            if not text:
+                continue
+            start = doc.metadata.get("start_index")
+            if start is None or start < 0:
+                loose.append((text, score))
+                continue
+            end = doc.metadata.get("end_index")
+            if end is None:                    # índices antigos: só o início
+                end = start + len(doc.page_content)
+            meta = doc.metadata
+            content = doc.page_content
+            prefix = section_prefix(meta.get("section"))
+            if prefix and content.startswith(prefix):
+                content = content[len(prefix):]
+            group = (meta.get("source"), meta.get("section"), meta.get("row"))
+            spans.setdefault(group, []).append((start, end, content, score))
+
+        merged: List[Tuple[str, float]] = []
+        for (_, section, _), items in spans.items():
+            heading = section_prefix(section)
+            items.sort(key=lambda item: item[0])
+            _, cur_end, cur_text, cur_score = items[0]
+            for start, end, text, score in items[1:]:
+                overlap = cur_end - start
+                at = len(cur_text) - overlap          # onde `text` começa em cur_text
+                if overlap >= 0 and end <= cur_end and cur_text[at:at + len(text)] == text:
+                    cur_score = max(cur_score, score)        # contido no anterior: descarta
+                    continue
+                if overlap >= 0 and cur_text[at:] == text[:overlap]:
+                    cur_text += text[overlap:]
+                    cur_end = end
+                    cur_score = max(cur_score, score)
+                    continue
+                merged.append((heading + cur_text.strip(), cur_score))
+                _, cur_end, cur_text, cur_score = start, end, text, score
+            merged.append((heading + cur_text.strip(), cur_score))
+        return merged + loose
+
+    def _dedupe(self, pieces: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        kept: List[Tuple[str, float, frozenset]] = []
+        for text, score in sorted(pieces, key=lambda item: item[1], reverse=True):
+            shingles = _shingles(text)
+            if any(_jaccard(shingles, other) >= self.dedup_threshold for _, _, other in kept):
+                continue
+            kept.append((text, score, shingles))
+        return [(text, score) for text, score, _ in kept]
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = text.lower().split()
+    if len(words) < size:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,284 @@
+"""
+Cache persistente de embeddings:
+• Chave = sha256(modelo + tipo + texto normalizado)
+• LRU em memória na frente de um SQLite em disco (vetores float32)
+• Usado tanto para documentos (ingestão) quanto para consultas
+• Modelo base carregado sob demanda e compartilhado no processo
+• Runtime do modelo (EMBED_RUNTIME): torch fp32, onnx ou onnx-int8
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+EMBED_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+EMBED_RUNTIMES = ("torch", "onnx", "onnx-int8")
+
+# Pesos int8 publicados no repositório do modelo, por conjunto de instruções
+_ONNX_INT8_FILES = {
+    "arm64": "onnx/model_qint8_arm64.onnx",
+    "avx2": "onnx/model_quint8_avx2.onnx",
+    "avx512": "onnx/model_qint8_avx512.onnx",
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+}
+
+_WS = re.compile(r"\s+")
+_SQL_BATCH = 500  # limite de parâmetros por SELECT ... IN (...)
+
+_base_lock = threading.Lock()
+_base_model: Optional[Embeddings] = None
+
+
+def embed_runtime() -> str:
+    runtime = os.getenv("EMBED_RUNTIME", "torch")
+    if runtime not in EMBED_RUNTIMES:
+        raise ValueError(f"EMBED_RUNTIME inválido: {runtime!r} (use {', '.join(EMBED_RUNTIMES)})")
+    return runtime
+
+
+def _int8_arch() -> str:
+    arch = os.getenv("EMBED_ONNX_ARCH", "avx2")
+    if arch not in _ONNX_INT8_FILES:
+        raise ValueError(f"EMBED_ONNX_ARCH inválido: {arch!r} (use {', '.join(_ONNX_INT8_FILES)})")
+    return arch
+
+
+def embed_model_id(runtime: str | None = None) -> str:
+    """
+    Modelo + variante de runtime. Vetores de variantes diferentes não se
+    misturam: o id entra na chave do cache e no manifesto do índice.
+    """
+    runtime = runtime or embed_runtime()
+    if runtime == "torch":
+        return EMBED_MODEL_NAME
+    if runtime == "onnx":
+        return f"{EMBED_MODEL_NAME}@onnx"
+    return f"{EMBED_MODEL_NAME}@onnx-int8-{_int8_arch()}"
+
+
+def _onnx_model_kwargs(file_name: str) -> Dict:
+    return {
+        "device": "cpu",
+        "backend": "onnx",
+        "model_kwargs": {"file_name": file_name, "provider": "CPUExecutionProvider"},
+    }
+
+
+def _export_int8(arch: str) -> Path:
+    """Quantiza localmente (int8 dinâmico) quando o repositório não traz o arquivo."""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    target = Path(os.getenv("EMBED_ONNX_DIR", Path.home() / ".cache" / "onnx-embeddings"))
+    target = target / EMBED_MODEL_NAME.replace("/", "__")
+    if not (target / _ONNX_INT8_FILES[arch]).exists():
+        print(f"⚙️  Exportando {EMBED_MODEL_NAME} para ONNX int8 ({arch})…")
+        model = SentenceTransformer(EMBED_MODEL_NAME, backend="onnx", device="cpu")
+        model.save(str(target))
+        export_dynamic_quantized_onnx_model(model, arch, str(target))
+    return target
+
+
+def load_embeddings(runtime: str | None = None) -> Embeddings:
+    """Instancia o MiniLM no runtime pedido (sem compartilhar; veja `get_base_embeddings`)."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    runtime = runtime or embed_runtime()
+    encode_kwargs = {"normalize_embeddings": True}
+    if runtime == "torch":
+        return HuggingFaceEmbeddings(
+            model_name=EMBED_MODEL_NAME,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs=encode_kwargs,
+        )
+    if runtime == "onnx":
+        return HuggingFaceEmbeddings(
+            model_name=EMBED_MODEL_NAME,
+            model_kwargs=_onnx_model_kwargs("onnx/model.onnx"),
+            encode_kwargs=encode_kwargs,
+        )
+
+    arch = _int8_arch()
+    try:
+        return HuggingFaceEmbeddings(
+            model_name=EMBED_MODEL_NAME,
+            model_kwargs=_onnx_model_kwargs(_ONNX_INT8_FILES[arch]),
+            encode_kwargs=encode_kwargs,
+        )
+    except (OSError, ValueError) as exc:
+        print(f"⚠️  Pesos int8 ({arch}) indisponíveis no repositório: {exc}")
+    return HuggingFaceEmbeddings(
+        model_name=str(_export_int8(arch)),
+        model_kwargs=_onnx_model_kwargs(_ONNX_INT8_FILES[arch]),
+        encode_kwargs=encode_kwargs,
+    )
+
+
+def get_base_embeddings() -> Embeddings:
+    """Carrega o MiniLM na primeira chamada; chamadas seguintes reutilizam a instância."""
+    global _base_model
+    if _base_model is None:
+        with _base_lock:
+            if _base_model is None:
+                _base_model = load_embeddings()
+    return _base_model
+
+
+def is_model_loaded() -> bool:
+    return _base_model is not None
+
+
+def normalize_text(text: str) -> str:
+    """NFC + espaços colapsados: variações triviais caem na mesma chave."""
+    return _WS.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    """Envolve um `Embeddings` qualquer com cache LRU + SQLite."""
+
+    def __init__(
+        self,
+        base: Embeddings,
+        model_name: str,
+        cache_path: Optional[Path] = None,
+        lru_size: int = 2048,
+        symmetric: bool = True,
+    ) -> None:
+        self.base = base
+        self.model_name = model_name
+        self.lru_size = lru_size
+        # Modelo simétrico (MiniLM): consulta e documento são codificados igual,
+        # então várias consultas podem ir num único lote do encoder
+        self.symmetric = symmetric
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits_memoria": 0, "hits_disco": 0, "misses": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if cache_path is not None:
+            cache_path = Path(cache_path)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    # ------------------------------------------------------------------ #
+    # API Embeddings
+    # ------------------------------------------------------------------ #
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, kind="doc")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], kind="query")[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Várias consultas de uma vez (mesma chave de cache de `embed_query`)."""
+        return self._embed(texts, kind="query", batched=self.symmetric)
+
+    # ------------------------------------------------------------------ #
+    # Internos
+    # ------------------------------------------------------------------ #
+    def _key(self, text: str, kind: str) -> str:
+        raw = f"{self.model_name}\0{kind}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _embed(self, texts: List[str], kind: str, batched: bool = False) -> List[List[float]]:
+        keys = [self._key(t, kind) for t in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+            self._stats["hits_memoria"] += sum(1 for k in keys if k in found)
+
+            pending = [k for k in dict.fromkeys(keys) if k not in found]
+            from_disk = self._db_get(pending)
+            self._stats["hits_disco"] += sum(1 for k in keys if k in from_disk)
+            for key, vec in from_disk.items():
+                self._lru_put(key, vec)
+            found.update(from_disk)
+
+        # Textos ainda sem vetor: codifica uma única vez cada
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            if kind == "query" and not (batched and len(missing) > 1):
+                vectors = [self.base.embed_query(t) for t in missing.values()]
+            else:
+                vectors = self.base.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            with self._lock:
+                self._stats["misses"] += sum(1 for k in keys if k in computed)
+                for key, vec in computed.items():
+                    self._lru_put(key, vec)
+                self._db_put(computed)
+            found.update(computed)
+
+        return [found[k] for k in keys]
+
+    def _lru_put(self, key: str, vec: List[float]) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _db_get(self, keys: List[str]) -> Dict[str, List[float]]:
+        if self._db is None or not keys:
+            return {}
+        out: Dict[str, List[float]] = {}
+        for i in range(0, len(keys), _SQL_BATCH):
+            batch = keys[i:i + _SQL_BATCH]
+            marks = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+            ).fetchall()
+            for key, blob in rows:
+                vec = array("f")
+                vec.frombytes(blob)
+                out[key] = vec.tolist()
+        return out
+
+    def _db_put(self, items: Dict[str, List[float]]) -> None:
+        if self._db is None or not items:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(k, array("f", v).tobytes()) for k, v in items.items()],
+        )
+        self._db.commit()
+
+    # ------------------------------------------------------------------ #
+    # Utilidades
+    # ------------------------------------------------------------------ #
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["em_memoria"] = len(self._lru)
+        total = stats["hits_memoria"] + stats["hits_disco"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits_memoria"] + stats["hits_disco"]) / total, 3) if total else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
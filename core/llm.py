@@ -0,0 +1,578 @@
+"""
+Cliente do LLM com controle de carga (Groq via `init_chat_model`):
+• Limite de taxa local por token bucket (requisições e tokens por minuto):
+  sob carga as chamadas esperam na fila em vez de estourar em 429
+• Conexões HTTP keep-alive compartilhadas (pool httpx)
+• Novas tentativas com backoff exponencial + jitter em 429 / falhas
+  transitórias, respeitando o Retry-After do servidor
+• Hedging opcional: uma segunda requisição se a primeira passar do limiar
+  de latência (vale a que terminar antes)
+• Fallback para um modelo secundário quando o principal esgota as tentativas
+"""
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from core.context import count_tokens
+
+log = logging.getLogger(__name__)
+
+
+# ---------- Erros de limite de taxa ----------
+def _status(exc: BaseException) -> Optional[int]:
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return _status(exc) == 429 or "ratelimit" in type(exc).__name__.lower()
+
+
+def is_transient(exc: BaseException) -> bool:
+    status = _status(exc)
+    if is_rate_limited(exc) or (isinstance(status, int) and status >= 500):
+        return True
+    name = type(exc).__name__.lower()
+    return isinstance(exc, (TimeoutError, ConnectionError)) or "timeout" in name or "connection" in name
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Segundos pedidos pelo servidor (cabeçalho Retry-After), se houver."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Backoff exponencial com jitter completo."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# ---------- Limite de taxa ----------
+class TokenBucket:
+    """Balde de fichas: repõe `per_minute` fichas por minuto, rajada de até `capacity`."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Debita `amount` já (o saldo pode ficar negativo) e devolve quantos
+        segundos esperar até a reserva ficar coberta. Quem chega depois
+        espera mais: a fila é por ordem de chegada.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def try_take(self, amount: float) -> bool:
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def credit(self, amount: float) -> None:
+        """Devolve (amount > 0) ou cobra a mais (amount < 0) depois do uso real."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """Requisições/min + tokens/min (0 desliga cada limite) e pausa global após 429."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0) -> None:
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._paused_until = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        delay = self._paused_until - time.monotonic()
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(tokens))
+        return max(0.0, delay)
+
+    def try_reserve(self, tokens: int) -> bool:
+        """Reserva só se houver folga agora (usado pelo hedging)."""
+        if time.monotonic() < self._paused_until:
+            return False
+        if self.requests is not None and not self.requests.try_take(1):
+            return False
+        if self.tokens is not None and not self.tokens.try_take(tokens):
+            if self.requests is not None:
+                self.requests.credit(1)
+            return False
+        return True
+
+    def release(self, tokens: int) -> None:
+        """Desfaz uma reserva que não virou requisição."""
+        if self.requests is not None:
+            self.requests.credit(1)
+        if self.tokens is not None:
+            self.tokens.credit(tokens)
+
+    def refund(self, tokens: int) -> None:
+        """Tentativa que falhou: a requisição conta, os tokens reservados voltam."""
+        if self.tokens is not None:
+            self.tokens.credit(tokens)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        if self.tokens is not None and actual is not None:
+            self.tokens.credit(estimated - actual)
+
+    def pause(self, seconds: float) -> None:
+        """Após um 429, segura todas as chamadas (não só a que falhou)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+# ---------- Conexões HTTP ----------
+_http_lock = threading.Lock()
+_http_clients: Dict[str, Any] = {}
+
+
+def _http_limits() -> Any:
+    import httpx
+
+    return httpx.Limits(
+        max_connections=int(os.getenv("GROQ_HTTP_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(os.getenv("GROQ_HTTP_KEEPALIVE", 10)),
+        keepalive_expiry=float(os.getenv("GROQ_HTTP_KEEPALIVE_EXPIRY", 60)),
+    )
+
+
+class _LoopLocalTransport:
+    """
+    Transporte httpx com um pool de conexões por event loop: conexões
+    assíncronas ficam presas ao loop que as abriu, e o ChatGroq guarda um
+    único AsyncClient por toda a vida do processo (vários `asyncio.run`).
+    """
+
+    def __init__(self, limits: Any) -> None:
+        self._limits = limits
+        self._lock = threading.Lock()
+        self._transports: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+
+    def _current(self) -> Any:
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self._limits)
+            return transport
+
+    async def handle_async_request(self, request: Any) -> Any:
+        return await self._current().handle_async_request(request)
+
+    async def __aenter__(self) -> "_LoopLocalTransport":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        # Só o pool do loop corrente: os dos outros loops somem com eles
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def get_http_clients() -> tuple[Any, Any]:
+    """
+    Par (sync, async) de clientes httpx compartilhado por todos os modelos
+    Groq. O assíncrono mantém um pool por event loop (_LoopLocalTransport).
+    """
+    with _http_lock:
+        if not _http_clients:
+            import httpx
+
+            timeout = httpx.Timeout(float(os.getenv("GROQ_TIMEOUT", 60)), connect=5.0)
+            _http_clients["sync"] = httpx.Client(limits=_http_limits(), timeout=timeout)
+            _http_clients["async"] = httpx.AsyncClient(
+                transport=_LoopLocalTransport(_http_limits()), timeout=timeout
+            )
+        return _http_clients["sync"], _http_clients["async"]
+
+
+# ---------- Hedging ----------
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _http_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv("GROQ_HEDGE_THREADS", 8)),
+                thread_name_prefix="llm-hedge",
+            )
+        return _hedge_pool
+
+
+def _submit(fn: Any, *args: Any, **kwargs: Any) -> Any:
+    ctx = contextvars.copy_context()          # callbacks/tracing seguem a chamada
+    return _get_hedge_pool().submit(ctx.run, fn, *args, **kwargs)
+
+
+def _usage_tokens(result: ChatResult) -> Optional[int]:
+    usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+    return usage.get("total_tokens") if usage else None
+
+
+# ---------- Modelo resiliente ----------
+class ResilientChatModel(BaseChatModel):
+    """
+    Envolve um chat model (o `primary`) com fila por limite de taxa, novas
+    tentativas, hedging e fallback. Para o LangChain é um chat model comum:
+    funciona com o ReAct, `bind(...)`, streaming e callbacks.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    primary: BaseChatModel
+    fallback: Optional[BaseChatModel] = None
+    limiter: RateLimiter = Field(default_factory=RateLimiter)
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_cap: float = 20.0
+    hedge_after: float = 0.0       # s; 0 desliga
+    max_queue_wait: float = 10.0   # s na fila antes de ir direto ao fallback
+    default_max_tokens: int = 1024
+
+    _stats: Dict[str, float] = PrivateAttr(default_factory=dict)
+    _stats_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"resilient-{self.primary._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.primary._identifying_params
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any) -> Any:
+        return self.primary._get_ls_params(stop=stop, **kwargs)
+
+    # ------------------------------------------------------------------ #
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] = self._stats.get(key, 0) + value
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = {k: round(v, 3) if isinstance(v, float) else v for k, v in self._stats.items()}
+        if isinstance(self.fallback, ResilientChatModel):
+            stats["fallback"] = self.fallback.get_stats()
+        return stats
+
+    def _estimate(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> int:
+        """Tokens reservados: prompt + teto de saída (acertado depois com o uso real)."""
+        prompt = sum(count_tokens(str(m.content)) for m in messages)
+        max_out = kwargs.get("max_tokens") or getattr(self.primary, "max_tokens", None) or self.default_max_tokens
+        return prompt + int(max_out)
+
+    def _reserve(self, estimate: int) -> Optional[float]:
+        """Segundos de fila; None = fila longa demais e há fallback para atender já."""
+        delay = self.limiter.reserve(estimate)
+        if delay > self.max_queue_wait and self.fallback is not None:
+            self.limiter.release(estimate)
+            return None
+        if delay > 0:
+            self._count("fila_s", delay)
+        return delay
+
+    def _retry_delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Espera antes da próxima tentativa; None = desistir deste modelo."""
+        if is_rate_limited(exc):
+            self._count("rate_limited")
+        if attempt >= self.max_retries or not is_transient(exc):
+            return None
+        delay = retry_after(exc) or backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+        if is_rate_limited(exc):
+            self.limiter.pause(delay)
+        self._count("retries")
+        return delay
+
+    def _give_up(self, exc: BaseException) -> bool:
+        """True = propaga o erro; False = segue para o fallback."""
+        if self.fallback is None:
+            self._count("erros")
+            return True
+        log.warning("LLM principal falhou (%s); usando fallback.", type(exc).__name__)
+        self._count("fallbacks")
+        return False
+
+    # ------------------------------------------------------------------ #
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._count("chamadas")
+        estimate = self._estimate(messages, kwargs)
+        attempt = 0
+        while True:
+            delay = self._reserve(estimate)
+            if delay is None:
+                self._count("fallbacks")
+                break
+            time.sleep(delay)
+            try:
+                result = self._call(messages, stop, run_manager, estimate, kwargs)
+                self.limiter.settle(estimate, _usage_tokens(result))
+                return result
+            except Exception as exc:  # noqa: BLE001
+                self.limiter.refund(estimate)
+                delay = self._retry_delay(exc, attempt)
+                if delay is None:
+                    if self._give_up(exc):
+                        raise
+                    break
+                time.sleep(delay)
+                attempt += 1
+        return self.fallback._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _call(self, messages, stop, run_manager, estimate: int, kwargs: Dict[str, Any]) -> ChatResult:
+        if self.hedge_after <= 0:
+            return self.primary._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        first = _submit(self.primary._generate, messages, stop=stop, run_manager=run_manager, **kwargs)
+        try:
+            return first.result(timeout=self.hedge_after)
+        except FutureTimeout:
+            pass
+        if not self.limiter.try_reserve(estimate):
+            return first.result()
+        self._count("hedges")
+        # A cópia não recebe o run_manager: um só conjunto de callbacks por chamada
+        second = _submit(self.primary._generate, messages, stop=stop, **kwargs)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_vitorias")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._count("chamadas")
+        estimate = self._estimate(messages, kwargs)
+        attempt = 0
+        while True:
+            delay = self._reserve(estimate)
+            if delay is None:
+                self._count("fallbacks")
+                break
+            await asyncio.sleep(delay)
+            try:
+                result = await self._acall(messages, stop, run_manager, estimate, kwargs)
+                self.limiter.settle(estimate, _usage_tokens(result))
+                return result
+            except Exception as exc:  # noqa: BLE001
+                self.limiter.refund(estimate)
+                delay = self._retry_delay(exc, attempt)
+                if delay is None:
+                    if self._give_up(exc):
+                        raise
+                    break
+                await asyncio.sleep(delay)
+                attempt += 1
+        return await self.fallback._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _acall(self, messages, stop, run_manager, estimate: int, kwargs: Dict[str, Any]) -> ChatResult:
+        if self.hedge_after <= 0:
+            return await self.primary._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        first = asyncio.ensure_future(
+            self.primary._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        )
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if done or not self.limiter.try_reserve(estimate):
+                return await first
+            self._count("hedges")
+            second = asyncio.ensure_future(self.primary._agenerate(messages, stop=stop, **kwargs))
+            pending.add(second)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_vitorias")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    # ------------------------------------------------------------------ #
+    # Streaming: nova tentativa/fallback só antes do primeiro chunk; depois
+    # disso o texto já foi entregue e o erro sobe. Sem hedging.
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._count("chamadas")
+        estimate = self._estimate(messages, kwargs)
+        attempt = 0
+        while True:
+            delay = self._reserve(estimate)
+            if delay is None:
+                self._count("fallbacks")
+                break
+            time.sleep(delay)
+            started = False
+            try:
+                for chunk in self.primary._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as exc:  # noqa: BLE001
+                if not started:
+                    self.limiter.refund(estimate)
+                delay = None if started else self._retry_delay(exc, attempt)
+                if delay is None:
+                    if started or self._give_up(exc):
+                        raise
+                    break
+                time.sleep(delay)
+                attempt += 1
+        yield from self.fallback._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._count("chamadas")
+        estimate = self._estimate(messages, kwargs)
+        attempt = 0
+        while True:
+            delay = self._reserve(estimate)
+            if delay is None:
+                self._count("fallbacks")
+                break
+            await asyncio.sleep(delay)
+            started = False
+            try:
+                async for chunk in self.primary._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as exc:  # noqa: BLE001
+                if not started:
+                    self.limiter.refund(estimate)
+                delay = None if started else self._retry_delay(exc, attempt)
+                if delay is None:
+                    if started or self._give_up(exc):
+                        raise
+                    break
+                await asyncio.sleep(delay)
+                attempt += 1
+        async for chunk in self.fallback._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            yield chunk
+
+
+# ---------- Construção ----------
+def _build_chat_model(model_name: str) -> BaseChatModel:
+    from langchain.chat_models import init_chat_model
+
+    kwargs: Dict[str, Any] = {
+        "temperature": float(os.getenv("GROQ_TEMPERATURE", 0.7)),
+        "max_tokens": int(os.getenv("GROQ_MAX_TOKENS", 1024)),
+    }
+    if model_name.startswith("groq:"):
+        http_client, http_async_client = get_http_clients()
+        kwargs.update(
+            groq_api_key=os.environ["GROQ_API_KEY"],
+            max_retries=0,                    # novas tentativas ficam com o ResilientChatModel
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+    return init_chat_model(model_name, **kwargs)
+
+
+def _resilient(model_name: str, prefix: str, fallback: Optional[BaseChatModel] = None) -> ResilientChatModel:
+    return ResilientChatModel(
+        primary=_build_chat_model(model_name),
+        fallback=fallback,
+        limiter=RateLimiter(
+            rpm=float(os.getenv(f"{prefix}_RPM", 0)),
+            tpm=float(os.getenv(f"{prefix}_TPM", 0)),
+        ),
+        max_retries=int(os.getenv("GROQ_MAX_RETRIES", 3)),
+        backoff_base=float(os.getenv("GROQ_BACKOFF_BASE", 0.5)),
+        backoff_cap=float(os.getenv("GROQ_BACKOFF_CAP", 20)),
+        hedge_after=float(os.getenv("GROQ_HEDGE_AFTER", 0)),
+        max_queue_wait=float(os.getenv("GROQ_MAX_QUEUE_WAIT", 10)),
+        default_max_tokens=int(os.getenv("GROQ_MAX_TOKENS", 1024)),
+    )
+
+
+def build_llm(model_name: str) -> ResilientChatModel:
+    """
+    Modelo principal com limites GROQ_RPM/GROQ_TPM. Com GROQ_FALLBACK_MODEL,
+    o secundário tem limites próprios (GROQ_FALLBACK_RPM/GROQ_FALLBACK_TPM):
+    no Groq a cota é por modelo. Sem essas variáveis não há limite local —
+    defina-as com a cota real da conta para ativar a fila.
+    """
+    fallback_name = os.getenv("GROQ_FALLBACK_MODEL")
+    fallback = _resilient(fallback_name, "GROQ_FALLBACK") if fallback_name else None
+    return _resilient(model_name, "GROQ", fallback)
@@ -0,0 +1,298 @@
+"""
+Carga de documentos por formato, em streaming (arquivo → chunks):
+• CSV: uma linha por chunk; FAQ (pergunta/resposta) vira um par Q/A
+• JSONL: um registro por chunk (campo de texto ou par Q/A)
+• Markdown: um chunk por seção (cabeçalhos #…###), com o caminho de
+  títulos no início do texto (entra no embedding e no BM25) e em `section`
+• TXT e demais: parágrafos agrupados até RAG_CHUNK_SIZE
+Trechos maiores que RAG_CHUNK_SIZE são subdivididos pelo splitter genérico.
+Metadados: source (nome do arquivo), type, section / row, start_index e
+end_index. Em TXT o chunk é um trecho literal do arquivo; em MD também,
+depois do prefixo "<títulos>\n\n" (ver `section_prefix`). Nos dois os
+índices são deslocamentos no arquivo; em CSV/JSONL, no texto do registro
+(`row`).
+Vários arquivos são lidos em paralelo, mas entregues na ordem.
+"""
+
+from __future__ import annotations
+import csv
+import json
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+# Muda quando o formato dos chunks muda: força reindexação (assinatura do índice)
+CHUNKER_VERSION = "formatos-v3"
+
+QUESTION_KEYS = ("pergunta", "question", "q")
+ANSWER_KEYS = ("resposta", "answer", "a")
+TEXT_KEYS = ("text", "texto", "content", "conteudo", "page_content")
+MAX_META_CHARS = 200       # colunas curtas (ex.: categoria) viram metadados filtráveis
+
+
+def chunk_size() -> int:
+    return int(os.getenv("RAG_CHUNK_SIZE", 800))
+
+
+def chunk_overlap() -> int:
+    return int(os.getenv("RAG_CHUNK_OVERLAP", 100))
+
+
+def _split_long(text: str) -> List[Tuple[int, str]]:
+    """(deslocamento, trecho) — só para textos acima de RAG_CHUNK_SIZE."""
+    if len(text) <= chunk_size():
+        return [(0, text)]
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size(),
+        chunk_overlap=chunk_overlap(),
+        separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
+        add_start_index=True,
+    )
+    return [(d.metadata["start_index"], d.page_content) for d in splitter.create_documents([text])]
+
+
+def _span(start: int, piece: str) -> Dict[str, int]:
+    return {"start_index": start, "end_index": start + len(piece)}
+
+
+def section_prefix(section: Optional[str]) -> str:
+    """Prefixo do texto de um chunk markdown; os índices cobrem o que vem depois."""
+    return f"{section}\n\n" if section else ""
+
+
+def _raw_chunks(raw: str, start: int, meta: Dict[str, Any], prefix: str = "") -> Iterator[Document]:
+    """
+    `raw` é um trecho literal do arquivo a partir de `start`: os índices são
+    calculados antes de tirar os espaços das bordas, então batem com o arquivo.
+    `prefix` vai na frente do texto, fora dos índices.
+    """
+    text = raw.strip()
+    if not text:
+        return
+    start += len(raw) - len(raw.lstrip())
+    for sub, piece in _split_long(text):
+        yield Document(page_content=prefix + piece, metadata={**meta, **_span(start + sub, piece)})
+
+
+def _scalar_metadata(record: Dict[str, Any], skip: Sequence[str]) -> Dict[str, Any]:
+    """Campos curtos e escalares (o vetor‑store não aceita listas/None)."""
+    meta: Dict[str, Any] = {}
+    for key, value in record.items():
+        if key is None or key.lower() in skip or value is None or value == "":
+            continue
+        if isinstance(value, (bool, int, float)) or (isinstance(value, str) and len(value) <= MAX_META_CHARS):
+            meta[key] = value
+    return meta
+
+
+def _find(record: Dict[str, Any], keys: Sequence[str]) -> Optional[str]:
+    lowered = {str(k).lower(): k for k in record if k is not None}
+    for key in keys:
+        if key in lowered and record[lowered[key]] not in (None, ""):
+            return lowered[key]
+    return None
+
+
+def _record_chunks(record: Dict[str, Any], source: str, kind: str, row: int) -> Iterator[Document]:
+    """Linha de CSV / registro JSONL → chunk(s)."""
+    q_key, a_key = _find(record, QUESTION_KEYS), _find(record, ANSWER_KEYS)
+    if q_key and a_key:
+        text = f"Pergunta: {record[q_key]}\nResposta: {record[a_key]}"
+        kind = "faq"
+        used = (q_key.lower(), a_key.lower())
+    elif text_key := _find(record, TEXT_KEYS):
+        text = str(record[text_key])
+        used = (text_key.lower(),)
+    else:
+        text = "\n".join(f"{k}: {v}" for k, v in record.items() if k is not None and v not in (None, ""))
+        used = ()
+    if not text.strip():
+        return
+    meta = {**_scalar_metadata(record, used), "source": source, "type": kind, "row": row}
+    for offset, piece in _split_long(text):
+        yield Document(page_content=piece, metadata={**meta, **_span(offset, piece)})
+
+
+# ---------- Formatos ----------
+def iter_csv(path: Path) -> Iterator[Document]:
+    with open(path, encoding="utf-8", newline="") as fh:
+        for row, record in enumerate(csv.DictReader(fh)):
+            yield from _record_chunks(record, path.name, "csv", row)
+
+
+def iter_jsonl(path: Path) -> Iterator[Document]:
+    with open(path, encoding="utf-8") as fh:
+        for row, line in enumerate(fh):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                record = {"text": json.dumps(record, ensure_ascii=False) if not isinstance(record, str) else record}
+            yield from _record_chunks(record, path.name, "jsonl", row)
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def iter_markdown(path: Path, split_level: Optional[int] = None) -> Iterator[Document]:
+    """Uma seção por vez: nunca segura mais que a seção corrente na memória."""
+    split_level = split_level or int(os.getenv("RAG_MD_SPLIT_LEVEL", 3))
+    headings: List[Tuple[int, str]] = []          # pilha (nível, título)
+    body: List[str] = []
+    section_start = offset = 0
+    in_fence = False
+
+    def emit() -> Iterator[Document]:
+        # Caminho de títulos no texto (consultas que citam a seção casam com
+        # ela); os índices cobrem só o corpo literal que vem depois
+        section = " > ".join(title for _, title in headings)
+        meta = {"source": path.name, "type": "markdown", "section": section}
+        yield from _raw_chunks("".join(body), section_start, meta, section_prefix(section))
+
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if _FENCE.match(line):
+                in_fence = not in_fence
+            match = None if in_fence else _HEADING.match(line)
+            if match and len(match.group(1)) <= split_level:
+                yield from emit()
+                level = len(match.group(1))
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, match.group(2)))
+                body = []
+                section_start = offset + len(line)
+            else:
+                body.append(line)
+            offset += len(line)
+    yield from emit()
+
+
+def _paragraphs(lines: Iterator[str]) -> Iterator[Tuple[int, str]]:
+    """
+    (deslocamento, trecho bruto) — cada parágrafo com as linhas em branco que
+    o seguem: parágrafos consecutivos concatenados reproduzem o arquivo.
+    """
+    current: List[str] = []
+    start = offset = 0
+    trailing_blank = False
+    for line in lines:
+        if line.strip():
+            if current and trailing_blank:
+                yield start, "".join(current)
+                current = []
+            if not current:
+                start = offset
+            trailing_blank = False
+            current.append(line)
+        elif current:
+            current.append(line)
+            trailing_blank = True
+        offset += len(line)
+    if current:
+        yield start, "".join(current)
+
+
+def iter_text(path: Path) -> Iterator[Document]:
+    """Parágrafos agrupados até RAG_CHUNK_SIZE (parágrafo maior é subdividido)."""
+    limit = chunk_size()
+    meta = {"source": path.name, "type": "text"}
+    group: List[str] = []
+    group_start = size = 0
+    with open(path, encoding="utf-8") as fh:
+        for start, raw in _paragraphs(fh):
+            if group and size + len(raw.rstrip()) > limit:
+                yield from _raw_chunks("".join(group), group_start, meta)
+                group, size = [], 0
+            if not group:
+                group_start = start
+            group.append(raw)
+            size += len(raw)
+    if group:
+        yield from _raw_chunks("".join(group), group_start, meta)
+
+
+LOADERS: Dict[str, Callable[[Path], Iterator[Document]]] = {
+    ".csv": iter_csv,
+    ".jsonl": iter_jsonl,
+    ".ndjson": iter_jsonl,
+    ".md": iter_markdown,
+    ".markdown": iter_markdown,
+}
+
+
+def iter_chunks(path: Path) -> Iterator[Document]:
+    """Chunks de um arquivo, escolhendo o loader pela extensão (padrão: texto)."""
+    path = Path(path)
+    return LOADERS.get(path.suffix.lower(), iter_text)(path)
+
+
+# ---------- Vários arquivos em paralelo ----------
+_DONE = object()
+
+
+def _put(q: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def iter_files(
+    files: Sequence[Path],
+    workers: Optional[int] = None,
+    buffer: int = 256,
+) -> Iterator[Tuple[Path, Iterator[Document]]]:
+    """
+    (arquivo, chunks) na ordem de `files`, com até `workers` arquivos sendo
+    lidos/divididos ao mesmo tempo (RAG_LOADER_WORKERS). Cada arquivo tem
+    uma fila limitada a `buffer` chunks: a memória não cresce com o corpus.
+    Consuma os chunks de um arquivo antes de avançar para o próximo.
+    """
+    workers = workers or int(os.getenv("RAG_LOADER_WORKERS", 4))
+    if workers <= 1 or len(files) <= 1:
+        for path in files:
+            yield path, iter_chunks(path)
+        return
+
+    stop = threading.Event()
+    queues: List["queue.Queue[Any]"] = [queue.Queue(maxsize=buffer) for _ in files]
+
+    def produce(path: Path, q: "queue.Queue[Any]") -> None:
+        try:
+            for doc in iter_chunks(path):
+                if not _put(q, doc, stop):
+                    return
+        except BaseException as exc:  # noqa: BLE001 — repassada ao consumidor
+            _put(q, exc, stop)
+            return
+        _put(q, _DONE, stop)
+
+    def drain(q: "queue.Queue[Any]") -> Iterator[Document]:
+        while (item := q.get()) is not _DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    # Arquivos entram no pool em ordem: quando o consumidor chega ao arquivo i,
+    # o produtor dele já começou (ou terminou) — não há espera circular.
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-load") as pool:
+        for path, q in zip(files, queues):
+            pool.submit(produce, path, q)
+        try:
+            for path, q in zip(files, queues):
+                yield path, drain(q)
+        finally:
+            stop.set()
@@ -4,11 +4,27 @@ Mantém uma janela de N mensagens para dar contexto ao LLM.
 """
 
 import os
-from langchain.memory import ConversationBufferWindowMemory
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
 WINDOW_K = int(os.getenv("MEMORY_WINDOW_SIZE", 10))
 
-window_memory = ConversationBufferWindowMemory(
-    k=WINDOW_K,
-    return_messages=True,
-)
+
+def trim_history(messages: List[BaseMessage], max_messages: int = 2 * WINDOW_K) -> List[BaseMessage]:
+    """
+    Janela de conversa (as últimas WINDOW_K trocas) sobre um histórico
+    bruto: preserva a SystemMessage inicial e as últimas `max_messages`
+    mensagens, começando sempre numa pergunta do usuário.
+    """
+    head = messages[:1] if messages and isinstance(messages[0], SystemMessage) else []
+    body = messages[len(head):]
+    if len(body) <= max_messages:
+        return messages
+
+    tail = body[-max_messages:]
+    for i, msg in enumerate(tail):
+        if isinstance(msg, HumanMessage):
+            tail = tail[i:]
+            break
+    return head + tail
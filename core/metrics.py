@@ -0,0 +1,437 @@
+"""
+Instrumentação do pipeline (por nó e por turno):
+• Callback do LangChain que registra spans dos nós do LangGraph, chamadas ao
+  LLM (tokens de prompt/completion), tools e acertos de recuperação
+• Agregados no processo (contagens, tempo, histogramas)
+• Exportação em texto Prometheus e spans compatíveis com OpenTelemetry
+  (OTLP/JSON; ou direto no SDK, se `opentelemetry` estiver instalado)
+"""
+
+from __future__ import annotations
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+
+# Limites (s) dos histogramas de latência
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Saídas de nó copiadas como atributos do span
+_NODE_ATTRS = ("rag_hits", "cache_hit", "prompt_tokens")
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("AGENT_METRICS", "1") != "0"
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str                                  # turn | node | llm | tool
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    node: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    _t0: float = 0.0
+    duration_s: float = 0.0
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        self.duration_s = time.perf_counter() - self._t0
+        self.end_ns = self.start_ns + int(self.duration_s * 1e9)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+
+@dataclass
+class TurnTrace:
+    trace_id: str
+    name: str
+    spans: List[Span]
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo legível de um turno: tempo por nó, LLM, tokens, tools e recuperação."""
+        nodes: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans[1:]:
+            if span.node is None:
+                continue
+            stats = nodes.setdefault(span.node, {"ms": 0.0})
+            if span.kind == "node":
+                stats["ms"] = round(stats["ms"] + span.duration_s * 1000, 3)
+                for key in ("rag_hits", "cache_hit"):
+                    if key in span.attributes:
+                        stats[key] = span.attributes[key]
+            elif span.kind == "llm":
+                stats["llm_calls"] = stats.get("llm_calls", 0) + 1
+                for key in ("prompt_tokens", "completion_tokens"):
+                    stats[key] = stats.get(key, 0) + span.attributes.get(key, 0)
+            elif span.kind == "tool":
+                stats.setdefault("tools", []).append(span.name)
+        return {
+            "trace_id": self.trace_id,
+            "nome": self.name,
+            "total_ms": round(self.root.duration_s * 1000, 3),
+            "erro": self.root.error,
+            "nos": nodes,
+        }
+
+
+# -----------------------------------------------------------------------------
+# Coleta (um recorder por turno)
+# -----------------------------------------------------------------------------
+class TraceRecorder(BaseCallbackHandler):
+    """
+    Recebe os callbacks de um turno e monta a árvore de spans. Nós do grafo
+    são reconhecidos pelo metadata `langgraph_node`; chains intermediárias
+    (AgentExecutor, LLMChain…) herdam o span do ancestral mais próximo.
+    """
+
+    run_inline = True  # sem hop para executor nos callbacks assíncronos
+
+    def __init__(self, name: str = "turn") -> None:
+        self.trace_id = secrets.token_hex(16)
+        self._lock = threading.Lock()
+        self._root = self._new_span(name, "turn", None)
+        self._spans: List[Span] = [self._root]
+        self._open: Dict[UUID, Span] = {}
+        self._owner: Dict[UUID, str] = {}          # run_id → span_id do dono
+        self._finished: Optional[TurnTrace] = None
+
+    @staticmethod
+    def _new_span(name: str, kind: str, parent_id: Optional[str], node: Optional[str] = None) -> Span:
+        return Span(
+            name=name, kind=kind, span_id=secrets.token_hex(8), parent_id=parent_id,
+            start_ns=time.time_ns(), node=node, _t0=time.perf_counter(),
+        )
+
+    def _parent_of(self, parent_run_id: Optional[UUID]) -> str:
+        if parent_run_id is None:
+            return self._root.span_id
+        return self._owner.get(parent_run_id, self._root.span_id)
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str,
+               node: Optional[str], **attrs: Any) -> None:
+        with self._lock:
+            span = self._new_span(name, kind, self._parent_of(parent_run_id), node)
+            span.attributes.update(attrs)
+            self._spans.append(span)
+            self._open[run_id] = span
+            self._owner[run_id] = span.span_id
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attrs: Any) -> Optional[Span]:
+        with self._lock:
+            self._owner.pop(run_id, None)
+            span = self._open.pop(run_id, None)
+            if span is not None:
+                span.attributes.update(attrs)
+                span.close(error)
+            return span
+
+    # ---- chains / nós -------------------------------------------------------
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._start(run_id, parent_run_id, node, "node", node)
+        else:
+            with self._lock:
+                self._owner[run_id] = self._parent_of(parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        attrs = {}
+        if isinstance(outputs, dict):
+            attrs = {k: outputs[k] for k in _NODE_ATTRS if isinstance(outputs.get(k), (int, bool))}
+        self._end(run_id, **attrs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error)
+
+    # ---- LLM ----------------------------------------------------------------
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs) -> None:
+        self._llm_start(run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs) -> None:
+        self._llm_start(run_id, parent_run_id, metadata, kwargs)
+
+    def _llm_start(self, run_id, parent_run_id, metadata, kwargs) -> None:
+        meta = metadata or {}
+        model = meta.get("ls_model_name") or kwargs.get("name") or "llm"
+        self._start(run_id, parent_run_id, "llm", "llm", meta.get("langgraph_node", "fora_do_grafo"), model=model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        self._end(run_id, **_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error)
+
+    # ---- tools --------------------------------------------------------------
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._start(run_id, parent_run_id, name, "tool", (metadata or {}).get("langgraph_node"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error)
+
+    # ---- fim do turno -------------------------------------------------------
+    def finish(self, error: Optional[BaseException] = None) -> TurnTrace:
+        """Fecha o span raiz (idempotente) e devolve o trace do turno."""
+        with self._lock:
+            if self._finished is None:
+                self._root.close(error)
+                for span in self._open.values():    # runs interrompidos
+                    span.close()
+                self._open.clear()
+                self._finished = TurnTrace(self.trace_id, self._root.name, list(self._spans))
+            return self._finished
+
+
+def _token_usage(response: Any) -> Dict[str, int]:
+    """Tokens de um LLMResult: `usage_metadata` da mensagem ou `llm_output.token_usage`."""
+    prompt = completion = 0
+    for generations in getattr(response, "generations", []) or []:
+        for gen in generations:
+            usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not (prompt or completion):
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        prompt = usage.get("prompt_tokens", 0)
+        completion = usage.get("completion_tokens", 0)
+    return {"prompt_tokens": prompt, "completion_tokens": completion}
+
+
+def attach(config: Optional[RunnableConfig], handler: BaseCallbackHandler) -> RunnableConfig:
+    """Acrescenta `handler` aos callbacks de `config` sem descartar os existentes."""
+    merged: Dict[str, Any] = dict(config or {})
+    callbacks = merged.get("callbacks")
+    if callbacks is None:
+        merged["callbacks"] = [handler]
+    elif isinstance(callbacks, list):
+        merged["callbacks"] = [*callbacks, handler]
+    else:  # BaseCallbackManager
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+        merged["callbacks"] = callbacks
+    return merged  # type: ignore[return-value]
+
+
+# -----------------------------------------------------------------------------
+# Agregação no processo
+# -----------------------------------------------------------------------------
+class _Histogram:
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+
+class MetricsRegistry:
+    def __init__(self, keep_traces: int = 100) -> None:
+        self._lock = threading.Lock()
+        self._turns: Dict[str, _Histogram] = {}            # nome do trace → duração
+        self._nodes: Dict[str, _Histogram] = {}
+        self._llm: Dict[str, Dict[str, int]] = {}           # nó → calls/tokens
+        self._tools: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._retrieval = {"consultas": 0, "hits": 0}
+        self._cache = {"hits": 0, "misses": 0}
+        self.traces: Deque[TurnTrace] = deque(maxlen=keep_traces)
+
+    def record(self, trace: TurnTrace) -> None:
+        with self._lock:
+            self.traces.append(trace)
+            self._turns.setdefault(trace.name, _Histogram()).observe(trace.root.duration_s)
+            if trace.root.error:
+                self._errors[trace.name] = self._errors.get(trace.name, 0) + 1
+            for span in trace.spans[1:]:
+                if span.kind == "node":
+                    self._nodes.setdefault(span.name, _Histogram()).observe(span.duration_s)
+                    if "rag_hits" in span.attributes:
+                        self._retrieval["consultas"] += 1
+                        self._retrieval["hits"] += int(span.attributes["rag_hits"])
+                    if "cache_hit" in span.attributes:
+                        self._cache["hits" if span.attributes["cache_hit"] else "misses"] += 1
+                elif span.kind == "llm":
+                    stats = self._llm.setdefault(span.node or "fora_do_grafo", {
+                        "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "errors": 0,
+                    })
+                    stats["calls"] += 1
+                    stats["prompt_tokens"] += span.attributes.get("prompt_tokens", 0)
+                    stats["completion_tokens"] += span.attributes.get("completion_tokens", 0)
+                    stats["errors"] += span.error is not None
+                elif span.kind == "tool":
+                    self._tools[span.name] = self._tools.get(span.name, 0) + 1
+
+    def reset(self) -> None:
+        self.__init__(keep_traces=self.traces.maxlen or 100)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Agregados para `get_status()`."""
+        def hist(h: _Histogram) -> Dict[str, Any]:
+            return {
+                "n": h.count,
+                "media_ms": round(h.total / h.count * 1000, 3) if h.count else 0.0,
+                "max_ms": round(h.max * 1000, 3),
+            }
+
+        with self._lock:
+            return {
+                "turnos": {name: hist(h) for name, h in self._turns.items()},
+                "erros": dict(self._errors),
+                "nos": {name: hist(h) for name, h in self._nodes.items()},
+                "llm": {node: dict(stats) for node, stats in self._llm.items()},
+                "tools": dict(self._tools),
+                "recuperacao": dict(self._retrieval),
+                "cache": dict(self._cache),
+            }
+
+    # ------------------------------------------------------------------ #
+    # Exportação
+    # ------------------------------------------------------------------ #
+    def to_prometheus(self, prefix: str = "agent") -> str:
+        """Formato de exposição texto do Prometheus (0.0.4)."""
+        lines: List[str] = []
+
+        def histogram(name: str, help_: str, label: str, data: Dict[str, _Histogram]) -> None:
+            lines.extend([f"# HELP {prefix}_{name} {help_}", f"# TYPE {prefix}_{name} histogram"])
+            for key, h in sorted(data.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_{name}_bucket{{{label}="{key}",le="+Inf"}} {h.count}')
+                lines.append(f'{prefix}_{name}_sum{{{label}="{key}"}} {h.total:.6f}')
+                lines.append(f'{prefix}_{name}_count{{{label}="{key}"}} {h.count}')
+
+        def counter(name: str, help_: str, samples: List[tuple]) -> None:
+            lines.extend([f"# HELP {prefix}_{name} {help_}", f"# TYPE {prefix}_{name} counter"])
+            for labels, value in samples:
+                rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{prefix}_{name}{{{rendered}}} {value}" if rendered else f"{prefix}_{name} {value}")
+
+        with self._lock:
+            histogram("turn_duration_seconds", "Duração total do turno.", "trace", self._turns)
+            histogram("node_duration_seconds", "Duração de cada nó do grafo.", "node", self._nodes)
+            counter("turn_errors_total", "Turnos encerrados com erro.",
+                    [((("trace", k),), v) for k, v in sorted(self._errors.items())])
+            counter("llm_calls_total", "Chamadas ao LLM por nó.",
+                    [((("node", n),), s["calls"]) for n, s in sorted(self._llm.items())])
+            counter("llm_errors_total", "Chamadas ao LLM com erro por nó.",
+                    [((("node", n),), s["errors"]) for n, s in sorted(self._llm.items())])
+            counter("llm_tokens_total", "Tokens enviados/recebidos do LLM por nó.",
+                    [((("node", n), ("kind", kind)), s[f"{kind}_tokens"])
+                     for n, s in sorted(self._llm.items()) for kind in ("prompt", "completion")])
+            counter("tool_calls_total", "Invocações de tools.",
+                    [((("tool", t),), v) for t, v in sorted(self._tools.items())])
+            counter("retrieval_queries_total", "Consultas ao RAG.", [((), self._retrieval["consultas"])])
+            counter("retrieval_hits_total", "Chunks recuperados pelo RAG.", [((), self._retrieval["hits"])])
+            counter("semantic_cache_lookups_total", "Consultas ao cache semântico.",
+                    [((("result", "hit"),), self._cache["hits"]), ((("result", "miss"),), self._cache["misses"])])
+        return "\n".join(lines) + "\n"
+
+    def export_spans(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Traces recentes no formato OTLP/JSON (`resourceSpans`)."""
+        with self._lock:
+            traces = list(self.traces)[-limit:] if limit else list(self.traces)
+        spans = [_otlp_span(trace.trace_id, span) for trace in traces for span in trace.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", "portfolio-agent")]},
+                "scopeSpans": [{"scope": {"name": "core.metrics"}, "spans": spans}],
+            }]
+        }
+
+    def export_otel(self, tracer: Any = None, limit: Optional[int] = None) -> int:
+        """
+        Reemite os traces recentes por um tracer do OpenTelemetry SDK
+        (dependência opcional). Devolve quantos spans foram enviados.
+        """
+        from opentelemetry import trace as otel_trace
+
+        tracer = tracer or otel_trace.get_tracer("core.metrics")
+        with self._lock:
+            traces = list(self.traces)[-limit:] if limit else list(self.traces)
+
+        sent = 0
+        for trace in traces:
+            contexts: Dict[str, Any] = {}
+            for span in trace.spans:          # pais sempre antes dos filhos
+                parent = contexts.get(span.parent_id)
+                otel_span = tracer.start_span(
+                    f"{span.kind}:{span.name}",
+                    context=otel_trace.set_span_in_context(parent) if parent is not None else None,
+                    start_time=span.start_ns,
+                    attributes={"node": span.node or "", **_plain_attrs(span.attributes)},
+                )
+                if span.error:
+                    otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+                otel_span.end(end_time=span.end_ns or span.start_ns)
+                contexts[span.span_id] = otel_span
+                sent += 1
+        return sent
+
+
+def _plain_attrs(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in attrs.items() if isinstance(v, (str, bool, int, float))}
+
+
+def _otlp_attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(trace_id: str, span: Span) -> Dict[str, Any]:
+    attrs = {"kind": span.kind, **({"node": span.node} if span.node else {}), **_plain_attrs(span.attributes)}
+    data: Dict[str, Any] = {
+        "traceId": trace_id,
+        "spanId": span.span_id,
+        "name": f"{span.kind}:{span.name}",
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": [_otlp_attr(k, v) for k, v in attrs.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    return data
+
+
+_registry = MetricsRegistry(keep_traces=int(os.getenv("AGENT_TRACE_KEEP", 100)))
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
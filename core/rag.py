@@ -1,27 +1,73 @@
 """
 Serviço RAG (Retrieval‑Augmented Generation):
-• Carrega documentos (CSV, MD, TXT)
+• Carrega documentos por formato em streaming (CSV/JSONL por linha, MD por seção, TXT)
 • Gera embeddings multilíngues com MiniLM
-• Persiste vetor‑store com Chroma
-• Fornece busca semântica e contexto concatenado
+• Persiste vetor‑store com Chroma ou índice NumPy em memory‑map (RAG_VECTOR_BACKEND)
+• Ingestão incremental via manifesto de hashes (arquivo → chunks)
+• Busca semântica, por palavras‑chave (BM25) ou híbrida (RRF)
+• Fornece contexto concatenado para o prompt
+• Várias bases (uma por tenant/persona) no mesmo processo, com o MiniLM
+  carregado uma única vez (RAGRegistry)
 """
 
 from __future__ import annotations
-import os    
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 
-# Imports tardios para evitar custo em import global
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_community.document_loaders import TextLoader, CSVLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.bm25 import BM25Index, reciprocal_rank_fusion
+from core.context import ContextBuilder
+from core.embeddings import (
+    CachedEmbeddings, embed_model_id, embed_runtime, get_base_embeddings, is_model_loaded,
+)
+from core.loaders import CHUNKER_VERSION, iter_files
+from core.vectorstores import VectorBackend, Where, matches, open_backend
+
+# Chroma e splitter são importados tardiamente (custo de import alto)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+RETRIEVAL_MODES = ("vector", "keyword", "hybrid")
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
 
 
 class RAGService:
-    def __init__(self, data_dir: Path, persist_dir: Path) -> None:
+    def __init__(
+        self,
+        data_dir: Path,
+        persist_dir: Path,
+        cache_dir: Path | None = None,
+        base_embeddings: Embeddings | None = None,
+    ) -> None:
         self.data_dir = Path(data_dir)
         self.persist_dir = Path(persist_dir)
+        # Fora de persist_dir para sobreviver a `ingest_rag.py --full`
+        self.cache_dir = Path(cache_dir) if cache_dir else self.persist_dir.parent / ".cache"
+        self.last_ingest: Dict[str, Any] | None = None
+        self.retrieval_mode = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+        self.vector_backend = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+        self.embed_model_id = embed_model_id()
+        # Índice BM25 montado sob demanda a partir dos chunks do vetor‑store
+        self._keyword_index: BM25Index | None = None
+        self._keyword_lock = threading.Lock()
+        self.context_builder = ContextBuilder(max_tokens=int(os.getenv("RAG_CONTEXT_TOKENS", 400)))
 
         print("🏗️  Inicializando RAG Service…")
         print(f"📁 Data:    {self.data_dir}")
@@ -30,23 +76,35 @@ class RAGService:
         if not self.data_dir.exists():
             raise FileNotFoundError(f"Diretório de dados não existe: {self.data_dir}")
 
-        # Embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True},
+        # Embeddings (com cache LRU + SQLite por hash do texto)
+        self.embeddings = CachedEmbeddings(
+            base_embeddings or get_base_embeddings(),
+            model_name=self.embed_model_id,
+            cache_path=(
+                self.cache_dir / "embeddings.sqlite3"
+                if os.getenv("RAG_EMBED_CACHE", "1") != "0" else None
+            ),
+            lru_size=int(os.getenv("RAG_EMBED_CACHE_LRU", 2048)),
         )
-        print("✅  Embeddings configurados (MiniLM)")
+        print(f"✅  Embeddings configurados (MiniLM · {embed_runtime()} + cache)")
 
         # Vetor‑store
-        if self.persist_dir.exists() and any(self.persist_dir.iterdir()):
+        self.vector_store: VectorBackend | None = None
+        stored = self._stored_signature()
+        if stored not in (None, self._index_signature()):
+            current = self._index_signature()
+            print(
+                f"⚠️  Vetor‑store salvo com {stored['backend']} + {stored['embeddings']} "
+                f"(chunks {stored['chunker']}), recriando com {current['backend']} + "
+                f"{current['embeddings']} (chunks {current['chunker']})…"
+            )
+            self.vector_store = self._open_vector_store()
+            self._reset_vector_store()
+        elif self.persist_dir.exists() and any(self.persist_dir.iterdir()):
             print("📂  Carregando vetor‑store existente…")
             try:
-                self.vector_store = Chroma(
-                    persist_directory=str(self.persist_dir),
-                    embedding_function=self.embeddings,
-                )
-                print("✅  Vetor‑store carregado")
+                self.vector_store = self._open_vector_store(create=False)
+                print(f"✅  Vetor‑store carregado ({self.vector_store.name})")
                 return
             except Exception as exc:  # noqa: BLE001
                 print(f"⚠️  Falha ao carregar vetor‑store: {exc}, recriando…")
@@ -57,105 +115,680 @@ class RAGService:
     # Criação do vetor‑store
     # --------------------------------------------------------------------- #
     def _create_vector_store(self) -> None:
-        documents = self._load_documents()
-        chunks = self._split_documents(documents)
+        manifest: Dict[str, Any] = {"version": MANIFEST_VERSION, "files": {}}
 
-        self.vector_store = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embeddings,
-            persist_directory=str(self.persist_dir),
-        )
+        def all_chunks() -> Iterator[Tuple[str, Document]]:
+            for file_path, chunks in self._iter_file_chunks(self._data_files()):
+                seen: Dict[str, int] = {}
+                entries: Dict[str, Any] = {}
+                manifest["files"][file_path.name] = {"sha256": self._file_hash(file_path), "chunks": entries}
+                for chunk in chunks:
+                    cid = self._chunk_id(file_path.name, chunk, seen)
+                    entries[cid] = self._position(chunk)
+                    yield cid, chunk
+                print(f"  • {file_path.name}: {len(entries)} chunks")
 
-        # ▶️  Persistir apenas se o método existir (compatibilidade versões)
-        if hasattr(self.vector_store, "persist"):
-            self.vector_store.persist()
+        self.vector_store = self._open_vector_store()
+        report = self._index_stream(all_chunks())
+        if not report["chunks"]:
+            raise RuntimeError("Nenhum documento válido encontrado para o RAG.")
 
-        print(f"✅  Vetor‑store criado ({len(chunks)} chunks)")
+        self.vector_store.persist()
+        self._save_manifest(manifest)
+        print(f"✅  Vetor‑store criado ({report['chunks']} chunks)")
 
+    def _open_vector_store(self, create: bool = True) -> VectorBackend:
+        return open_backend(self.vector_backend, self.persist_dir, self.embeddings, create=create)
 
-    def _load_documents(self) -> List:
-        files = list(self.data_dir.glob("*"))
-        print(f"📄  Encontrados {len(files)} arquivos na pasta de dados")
+    # --------------------------------------------------------------------- #
+    # Pipeline de embeddings em lotes
+    # --------------------------------------------------------------------- #
+    def _index_stream(self, pairs: Iterable[Tuple[str, Document]]) -> Dict[str, Any]:
+        """
+        Consome (id, chunk) em streaming, embeda em lotes de tamanho fixo e faz
+        upsert no vetor‑store lote a lote. O embedding do lote N+1 roda em paralelo
+        ao upsert do lote N; no máximo dois lotes ficam em memória.
+        """
+        batch_size = int(os.getenv("RAG_INGEST_BATCH", 64))
+        self._configure_workers(int(os.getenv("RAG_INGEST_WORKERS", os.cpu_count() or 1)))
 
-        documents: List = []
-        for file_path in files:
-            if not file_path.is_file():
-                continue
+        start = time.perf_counter()
+        done = 0
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-embed") as pool:
+            pending: Tuple[List[Tuple[str, Document]], Future] | None = None
+            for batch in _batched(pairs, batch_size):
+                future = pool.submit(self.embeddings.embed_documents, [d.page_content for _, d in batch])
+                if pending is not None:
+                    done += self._upsert_batch(*pending)
+                    self._report_progress(done, start)
+                pending = (batch, future)
+            if pending is not None:
+                done += self._upsert_batch(*pending)
+                self._report_progress(done, start)
 
-            loader_cls = CSVLoader if file_path.suffix.lower() == ".csv" else TextLoader
-            loader = loader_cls(str(file_path), encoding="utf-8")
-            docs = loader.load()
-            documents.extend(docs)
-            print(f"  • {file_path.name}: {len(docs)} docs")
+        elapsed = time.perf_counter() - start
+        report = {
+            "chunks": done,
+            "segundos": round(elapsed, 3),
+            "chunks_por_segundo": round(done / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        self.last_ingest = report
+        return report
 
-        if not documents:
-            raise RuntimeError("Nenhum documento válido encontrado para o RAG.")
-        return documents
+    def _upsert_batch(self, batch: List[Tuple[str, Document]], vectors: Future) -> int:
+        self.vector_store.upsert(
+            ids=[cid for cid, _ in batch],
+            embeddings=vectors.result(),
+            documents=[d.page_content for _, d in batch],
+            metadatas=[d.metadata for _, d in batch],
+        )
+        return len(batch)
+
+    @staticmethod
+    def _report_progress(done: int, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        print(f"  ⏳ {done} chunks indexados · {rate:.1f} chunks/s")
 
     @staticmethod
-    def _split_documents(documents: List) -> List:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
-            add_start_index=True,
+    def _configure_workers(workers: int) -> None:
+        """Define quantos núcleos o PyTorch usa para codificar (se disponível)."""
+        try:
+            import torch
+        except ImportError:
+            return
+        torch.set_num_threads(max(1, workers))
+
+    # --------------------------------------------------------------------- #
+    # Ingestão incremental
+    # --------------------------------------------------------------------- #
+    def sync(self) -> Dict[str, Any]:
+        """
+        Sincroniza o vetor‑store com a pasta de dados sem recriá‑lo:
+        só chunks novos/alterados são embedados, chunks de arquivos removidos
+        são apagados e os demais permanecem intocados.
+        """
+        manifest = self._load_manifest()
+        if manifest is None:
+            print("⚠️  Manifesto ausente ou inválido, recriando vetor‑store…")
+            self._reset_vector_store()
+            self._create_vector_store()
+            manifest = self._load_manifest() or {"files": {}}
+            total = sum(len(f["chunks"]) for f in manifest["files"].values())
+            return {"adicionados": total, "removidos": 0, "inalterados": 0,
+                    "arquivos_alterados": sorted(manifest["files"]), "arquivos_removidos": []}
+
+        old_files: Dict[str, Any] = manifest["files"]
+        new_files: Dict[str, Any] = {}
+        stats = {"adicionados": 0, "removidos": 0, "inalterados": 0,
+                 "arquivos_alterados": [], "arquivos_removidos": []}
+
+        changed: Dict[str, Tuple[str, Dict[str, Any] | None]] = {}
+        for file_path in self._data_files():
+            digest = self._file_hash(file_path)
+            previous = old_files.get(file_path.name)
+            if previous and previous["sha256"] == digest:
+                new_files[file_path.name] = previous
+                stats["inalterados"] += len(previous["chunks"])
+            else:
+                changed[file_path.name] = (digest, previous)
+
+        def changed_chunks() -> Iterator[Tuple[str, Document]]:
+            files = [self.data_dir / name for name in changed]
+            for file_path, chunks in self._iter_file_chunks(files, announce=False):
+                name = file_path.name
+                digest, previous = changed[name]
+                old_chunks: Dict[str, Any] = previous["chunks"] if previous else {}
+                seen: Dict[str, int] = {}
+                entries: Dict[str, Any] = {}
+                moved: List[Document] = []
+                moved_ids: List[str] = []
+                fresh = 0
+                for chunk in chunks:
+                    cid = self._chunk_id(name, chunk, seen)
+                    entries[cid] = self._position(chunk)
+                    if cid not in old_chunks:
+                        fresh += 1
+                        yield cid, chunk
+                    elif old_chunks[cid] != entries[cid]:
+                        moved_ids.append(cid)
+                        moved.append(chunk)
+
+                stale = [cid for cid in old_chunks if cid not in entries]
+                if stale:
+                    self.vector_store.delete(ids=stale)
+                if moved:
+                    # Conteúdo idêntico, só a posição mudou: atualiza metadados sem re‑embedar
+                    self.vector_store.update_metadata(ids=moved_ids, metadatas=[c.metadata for c in moved])
+
+                new_files[name] = {"sha256": digest, "chunks": entries}
+                stats["adicionados"] += fresh
+                stats["removidos"] += len(stale)
+                stats["inalterados"] += len(entries) - fresh
+                stats["arquivos_alterados"].append(name)
+                print(f"  • {name}: +{fresh} / -{len(stale)} chunks")
+
+        stats["ingestao"] = self._index_stream(changed_chunks())
+
+        for name in sorted(set(old_files) - set(new_files)):
+            stale = list(old_files[name]["chunks"])
+            if stale:
+                self.vector_store.delete(ids=stale)
+            stats["removidos"] += len(stale)
+            stats["arquivos_removidos"].append(name)
+            print(f"  • {name}: removido (-{len(stale)} chunks)")
+
+        self.vector_store.persist()
+        self._save_manifest({"version": MANIFEST_VERSION, "files": new_files})
+        print(
+            f"✅  Sincronizado: +{stats['adicionados']} / -{stats['removidos']} chunks "
+            f"({stats['inalterados']} inalterados)"
         )
-        chunks = splitter.split_documents(documents)
-        print(f"🧩  {len(chunks)} chunks gerados")
-        return chunks
+        return stats
+
+    def _reset_vector_store(self) -> None:
+        if getattr(self, "vector_store", None) is not None:
+            self.vector_store.reset()
+        self.vector_store = None
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.persist_dir / MANIFEST_NAME
+
+    def _load_manifest(self) -> Dict[str, Any] | None:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        if self._signature_of(manifest) != self._index_signature():
+            return None  # outro backend/modelo de embeddings: precisa ser recriado
+        return manifest
+
+    def _index_signature(self) -> Dict[str, str]:
+        return {"backend": self.vector_backend, "embeddings": self.embed_model_id, "chunker": CHUNKER_VERSION}
+
+    @staticmethod
+    def _signature_of(manifest: Dict[str, Any]) -> Dict[str, str]:
+        # Manifestos antigos não registravam backend/modelo/chunker: Chroma + MiniLM torch + splitter único
+        return {
+            "backend": manifest.get("backend", "chroma"),
+            "embeddings": manifest.get("embeddings", embed_model_id("torch")),
+            "chunker": manifest.get("chunker", "caracteres-v0"),
+        }
+
+    def _stored_signature(self) -> Dict[str, str] | None:
+        """Backend + modelo que gravaram o índice atual (None se não há manifesto)."""
+        try:
+            return self._signature_of(json.loads(self.manifest_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return None
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        self._keyword_index = None  # chunks mudaram: BM25 é remontado na próxima busca
+        manifest.update(self._index_signature())
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    @staticmethod
+    def _file_hash(file_path: Path) -> str:
+        h = hashlib.sha256()
+        with open(file_path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 16), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    @staticmethod
+    def _chunk_id(source: str, chunk: Document, seen: Dict[str, int]) -> str:
+        """ID estável: hash(arquivo + conteúdo) + ordinal para chunks repetidos no arquivo."""
+        digest = hashlib.sha256(f"{source}\0{chunk.page_content}".encode("utf-8")).hexdigest()[:32]
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        return f"{digest}-{n}"
+
+    @staticmethod
+    def _position(chunk: Document) -> Any:
+        """Posição do chunk no arquivo (linha + deslocamento para CSV/JSONL)."""
+        start = chunk.metadata.get("start_index")
+        row = chunk.metadata.get("row")
+        return start if row is None else [row, start]
+
+    # --------------------------------------------------------------------- #
+    # Carga e divisão
+    # --------------------------------------------------------------------- #
+    def _data_files(self) -> List[Path]:
+        return sorted(f for f in self.data_dir.glob("*") if f.is_file())
+
+    def _iter_file_chunks(
+        self, files: List[Path], announce: bool = True
+    ) -> Iterator[Tuple[Path, Iterator[Document]]]:
+        """
+        (arquivo, chunks) em streaming, um arquivo por vez na ordem dada;
+        os próximos já vão sendo lidos em paralelo (RAG_LOADER_WORKERS).
+        """
+        if announce:
+            print(f"📄  Encontrados {len(files)} arquivos na pasta de dados")
+        return iter_files(files)
 
     # --------------------------------------------------------------------- #
     # API pública
     # --------------------------------------------------------------------- #
-    def search(self, query: str, k: int = 4) -> List[str]:
-        results = self.vector_store.similarity_search(query, k=k)
-        return [doc.page_content for doc in results]
-
-    def get_context(self, query: str, max_chars: int = 1_500) -> str:
-        results = self.vector_store.similarity_search(query, k=6)
-        context_parts: list[str] = []
-        curr = 0
-        for doc in results:
-            txt = doc.page_content.strip()
-            if not txt:
-                continue
-            if curr + len(txt) > max_chars:
-                break
-            context_parts.append(txt)
-            curr += len(txt)
-        return "\n\n".join(context_parts)
+    def search(self, query: str, k: int = 4, mode: str | None = None, where: Where = None) -> List[str]:
+        return [doc.page_content for doc in self.retrieve(query, k=k, mode=mode, where=where)]
+
+    def get_context(
+        self, query: str, max_tokens: int | None = None, mode: str | None = None, where: Where = None
+    ) -> str:
+        """
+        Contexto para o prompt limitado por tokens (padrão RAG_CONTEXT_TOKENS):
+        funde sobreposições, remove quase‑duplicatas e prioriza por score.
+        """
+        return self.get_context_with_hits(query, max_tokens, mode, where)[0]
+
+    def get_context_with_hits(
+        self, query: str, max_tokens: int | None = None, mode: str | None = None, where: Where = None
+    ) -> Tuple[str, int]:
+        """Como `get_context`, devolvendo também quantos chunks foram recuperados."""
+        scored = self.retrieve_scored(query, k=6, mode=mode, where=where)
+        return self.context_builder.build(scored, max_tokens=max_tokens), len(scored)
+
+    def retrieve(self, query: str, k: int = 6, mode: str | None = None, where: Where = None) -> List[Document]:
+        return [doc for doc, _ in self.retrieve_scored(query, k=k, mode=mode, where=where)]
+
+    def retrieve_scored(
+        self, query: str, k: int = 6, mode: str | None = None, where: Where = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        mode = "vector"  → só similaridade no vetor‑store
+               "keyword" → só BM25 em memória
+               "hybrid"  → ambos fundidos por RRF (padrão: RAG_RETRIEVAL_MODE)
+        where = filtro de metadados, ex.: {"source": "rag/igor/data/faq.csv"}
+        Scores só são comparáveis dentro da mesma chamada.
+        """
+        mode = self._resolve_mode(mode)
+        if mode == "keyword":
+            return self._combine(mode, query, [], k, where)
+        vector = self.embeddings.embed_query(query)
+        vector_hits = self.vector_store.search(vector, k=self._vector_k(mode, k), where=where)
+        return self._combine(mode, query, vector_hits, k, where)
+
+    def retrieve_scored_many(
+        self, queries: List[str], k: int = 6, mode: str | None = None, where: Where = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        `retrieve_scored` em lote: consultas embedadas numa chamada ao encoder
+        e busca vetorial de todas de uma vez no backend.
+        """
+        mode = self._resolve_mode(mode)
+        if mode == "keyword":
+            return [self._combine(mode, q, [], k, where) for q in queries]
+        vectors = self.embeddings.embed_queries(list(queries))
+        all_hits = self.vector_store.search_many(vectors, k=self._vector_k(mode, k), where=where)
+        return [self._combine(mode, q, hits, k, where) for q, hits in zip(queries, all_hits)]
+
+    def get_contexts(
+        self, queries: List[str], max_tokens: int | None = None, mode: str | None = None, where: Where = None
+    ) -> List[Tuple[str, int]]:
+        """`get_context_with_hits` em lote (ver `retrieve_scored_many`)."""
+        return [
+            (self.context_builder.build(scored, max_tokens=max_tokens), len(scored))
+            for scored in self.retrieve_scored_many(queries, k=6, mode=mode, where=where)
+        ]
+
+    def _resolve_mode(self, mode: str | None) -> str:
+        mode = mode or self.retrieval_mode
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Modo de busca inválido: {mode!r} (use {', '.join(RETRIEVAL_MODES)})")
+        return mode
+
+    @staticmethod
+    def _vector_k(mode: str, k: int) -> int:
+        # Híbrido: RAG_HYBRID_VECTOR_K é um piso de candidatos para a fusão com o
+        # BM25; o lado vetorial nunca traz menos que os k pedidos
+        return k if mode == "vector" else max(k, int(os.getenv("RAG_HYBRID_VECTOR_K", 4)))
+
+    def _combine(
+        self, mode: str, query: str, vector_hits: List[Tuple[Document, float]], k: int, where: Where
+    ) -> List[Tuple[Document, float]]:
+        if mode == "vector":
+            return vector_hits
+        if mode == "keyword":
+            return [(doc, score) for _, doc, score in self._keyword_search(query, k, where)]
+        keyword_hits = self._keyword_search(query, k, where)
+        return reciprocal_rank_fusion(
+            [
+                [(doc.id or doc.page_content, doc) for doc, _ in vector_hits],
+                [(key, doc) for key, doc, _ in keyword_hits],
+            ],
+            k=k,
+        )
+
+    def _keyword_search(self, query: str, k: int, where: Where) -> List[Tuple[Any, Document, float]]:
+        index = self._get_keyword_index()
+        if not where:
+            return index.search(query, k=k)
+        hits = index.search(query, k=len(index))
+        return [hit for hit in hits if matches(hit[1].metadata, where)][:k]
+
+    def _get_keyword_index(self) -> BM25Index:
+        index = self._keyword_index
+        if index is None:
+            with self._keyword_lock:
+                index = self._keyword_index
+                if index is None:
+                    index = BM25Index.build(
+                        (cid, Document(page_content=txt, metadata=meta or {}, id=cid))
+                        for cid, txt, meta in self.vector_store.get_all()
+                    )
+                    self._keyword_index = index
+        return index
 
     # ------------------------------------------------------------------ #
     # Utilidades
     # ------------------------------------------------------------------ #
+    def close(self) -> None:
+        """Grava pendências do vetor‑store e solta cache SQLite e índice BM25."""
+        if self.vector_store is not None:
+            self.vector_store.persist()
+        self.embeddings.close()
+        self._keyword_index = None
+
     def is_available(self) -> bool:
         return hasattr(self, "vector_store") and self.vector_store is not None
 
     def get_status(self) -> Dict[str, Any]:
         data_files = [f.name for f in self.data_dir.glob("*") if f.is_file()]
         vector_files = [f.name for f in self.persist_dir.glob("*")] if self.persist_dir.exists() else []
+        manifest = self._load_manifest()
         return {
             "disponivel": self.is_available(),
-            "embeddings": "MiniLM",
-            "vector_store": "Chroma",
+            "embeddings": self.embed_model_id,
+            "cache_embeddings": self.embeddings.get_stats(),
+            "ultima_ingestao": self.last_ingest,
+            "vector_store": self.vector_store.name if self.vector_store is not None else None,
+            "modo_busca": self.retrieval_mode,
+            "indice_bm25": len(self._keyword_index) if self._keyword_index is not None else None,
             "data_dir": str(self.data_dir),
             "persist_dir": str(self.persist_dir),
             "arquivos_dados": data_files,
             "arquivos_vetores": len(vector_files),
+            "chunks_indexados": (
+                sum(len(f["chunks"]) for f in manifest["files"].values()) if manifest else None
+            ),
         }
 
 
 # -----------------------------------------------------------------------------
-# Instância global (somente se permitido)
+# Bases por tenant (persona) com um único modelo de embeddings
 # -----------------------------------------------------------------------------
-if os.getenv("DISABLE_RAG_AUTOLOAD") != "1":
-    DATA_DIR = Path("rag/igor/data")
-    PERSIST_DIR = Path("rag/igor/vectors")
-    try:
-        rag_service = RAGService(data_dir=DATA_DIR, persist_dir=PERSIST_DIR)
-    except Exception as exc:  # noqa: BLE001
-        print(f"⚠️  Falha ao iniciar RAG global: {exc}")
-        rag_service = None
-else:
-    # Modo ingestão – não carrega automaticamente
-    rag_service = None
\ No newline at end of file
+_TENANT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def rag_root() -> Path:
+    return Path(os.getenv("RAG_ROOT", "rag"))
+
+
+def default_tenant() -> str:
+    return os.getenv("RAG_DEFAULT_TENANT", "igor")
+
+
+def tenant_id(tenant: str | None = None) -> str:
+    """Valida o id (vira nome de diretório); None → RAG_DEFAULT_TENANT."""
+    tenant = tenant or default_tenant()
+    if not _TENANT_ID.match(tenant):
+        raise ValueError(f"Tenant inválido: {tenant!r}")
+    return tenant
+
+
+# Compatibilidade: caminhos da base padrão
+DATA_DIR = rag_root() / default_tenant() / "data"
+PERSIST_DIR = rag_root() / default_tenant() / "vectors"
+
+
+@dataclass
+class _Slot:
+    service: RAGService | None = None
+    error: Exception | None = None
+    last_used: float = 0.0
+    pinned: bool = False                  # definida por `set` (ex.: benchmark): não sai
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class RAGRegistry:
+    """
+    Bases RAG por tenant em `root/<tenant>/{data,vectors}`:
+    • Um único modelo de embeddings carregado, compartilhado por todas
+      (cada base mantém só o próprio cache SQLite e vetor‑store)
+    • Cada base abre no primeiro uso; tenants diferentes abrem em paralelo
+    • No máximo `max_open` bases em memória (LRU) e despejo das ociosas há
+      mais de `idle_ttl` segundos (0 = sem TTL); despejar grava pendências
+      do vetor‑store e fecha o cache — o próximo uso reabre do disco
+    """
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        max_open: int = 8,
+        idle_ttl: float = 0,
+        base_embeddings: Embeddings | None = None,
+    ) -> None:
+        self.root = Path(root) if root is not None else rag_root()
+        self.max_open = max(1, max_open)
+        self.idle_ttl = idle_ttl
+        self._base_embeddings = base_embeddings
+        self._slots: "OrderedDict[str, _Slot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "aberturas": 0, "falhas": 0, "despejos": 0}
+
+    def paths(self, tenant: str | None = None) -> Tuple[Path, Path]:
+        base = self.root / tenant_id(tenant)
+        return base / "data", base / "vectors"
+
+    def tenants(self) -> List[str]:
+        """Tenants com base em disco (`root/<tenant>/data`), abertos ou não."""
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            d.name for d in self.root.iterdir()
+            if _TENANT_ID.match(d.name) and (d / "data").is_dir()
+        )
+
+    def base_embeddings(self) -> Embeddings:
+        return self._base_embeddings if self._base_embeddings is not None else get_base_embeddings()
+
+    # ------------------------------------------------------------------ #
+    # Acesso
+    # ------------------------------------------------------------------ #
+    def get(self, tenant: str | None = None) -> RAGService | None:
+        """
+        Base do tenant, aberta no primeiro uso (chamadas concorrentes do mesmo
+        tenant aguardam a mesma abertura). Falhas ficam registradas e viram
+        None até o tenant ser despejado.
+        """
+        tenant = tenant_id(tenant)
+        with self._lock:
+            slot = self._slots.get(tenant)
+            if slot is None:
+                if os.getenv("DISABLE_RAG_AUTOLOAD") == "1":
+                    # Modo ingestão – não carrega automaticamente
+                    return None
+                slot = self._slots[tenant] = _Slot()
+            self._slots.move_to_end(tenant)
+            slot.last_used = time.monotonic()
+            if slot.service is not None:
+                self._stats["hits"] += 1
+
+        if slot.service is None and slot.error is None:
+            # Abre fora do lock do registro: os outros tenants seguem atendidos
+            with slot.lock:
+                if slot.service is None and slot.error is None:
+                    self._open(tenant, slot)
+            with self._lock:
+                orphan = self._slots.get(tenant) is not slot
+            if orphan:
+                # `evict`/`set` tirou o tenant durante a abertura: esta cópia
+                # não tem dono; fecha e usa (ou reabre) a registrada
+                if slot.service is not None:
+                    slot.service.close()
+                return self.get(tenant)
+        self._evict()
+        return slot.service
+
+    def peek(self, tenant: str | None = None) -> RAGService | None:
+        """Base já aberta do tenant, sem abrir, mexer na ordem LRU nem nas estatísticas."""
+        slot = self._slots.get(tenant_id(tenant))
+        return slot.service if slot is not None else None
+
+    def _open(self, tenant: str, slot: _Slot) -> None:
+        data_dir, persist_dir = self.paths(tenant)
+        try:
+            slot.service = RAGService(data_dir, persist_dir, base_embeddings=self.base_embeddings())
+        except Exception as exc:  # noqa: BLE001
+            print(f"⚠️  Falha ao iniciar RAG de {tenant}: {exc}")
+            slot.error = exc
+        with self._lock:
+            self._stats["aberturas" if slot.error is None else "falhas"] += 1
+
+    def set(self, tenant: str | None, service: RAGService | None) -> None:
+        """Fixa uma base pronta para o tenant (não é despejada); None a remove."""
+        tenant = tenant_id(tenant)
+        self._evict(only=tenant)
+        if service is not None:
+            with self._lock:
+                self._slots[tenant] = _Slot(service=service, last_used=time.monotonic(), pinned=True)
+
+    # ------------------------------------------------------------------ #
+    # Despejo
+    # ------------------------------------------------------------------ #
+    def _evict(self, only: str | None = None) -> int:
+        now = time.monotonic()
+        victims: List[Tuple[str, _Slot]] = []
+        with self._lock:
+            for tenant, slot in list(self._slots.items()):      # do menos para o mais recente
+                if only is not None:
+                    evict = tenant == only
+                elif slot.pinned or (slot.service is None and slot.error is None):
+                    continue                                     # fixa ou ainda abrindo
+                else:
+                    idle = self.idle_ttl > 0 and now - slot.last_used > self.idle_ttl
+                    evict = idle or len(self._slots) > self.max_open
+                if evict:
+                    del self._slots[tenant]
+                    victims.append((tenant, slot))
+            self._stats["despejos"] += sum(1 for _, s in victims if s.service is not None and not s.pinned)
+
+        # Quem já tem a referência termina a consulta normalmente
+        for tenant, slot in victims:
+            if slot.service is not None and not slot.pinned:
+                try:
+                    slot.service.close()
+                except Exception as exc:  # noqa: BLE001
+                    print(f"⚠️  Falha ao fechar RAG de {tenant}: {exc}")
+        return len(victims)
+
+    def evict(self, tenant: str | None = None) -> bool:
+        """Tira um tenant da memória (ex.: depois de reingerir a base dele)."""
+        return self._evict(only=tenant_id(tenant)) > 0
+
+    def evict_idle(self) -> int:
+        """Aplica TTL e teto agora; devolve quantos tenants saíram."""
+        return self._evict()
+
+    def close(self) -> None:
+        with self._lock:
+            tenants = list(self._slots)
+        for tenant in tenants:
+            self._evict(only=tenant)
+
+    # ------------------------------------------------------------------ #
+    # Estado
+    # ------------------------------------------------------------------ #
+    def state(self, tenant: str | None = None) -> str:
+        slot = self._slots.get(tenant_id(tenant))
+        if slot is not None and slot.service is not None:
+            return "pronto"
+        if slot is None and os.getenv("DISABLE_RAG_AUTOLOAD") == "1":
+            return "desativado"
+        if slot is None:
+            return "pendente"
+        return "falhou" if slot.error is not None else "carregando"
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["abertos"] = [t for t, s in self._slots.items() if s.service is not None]
+        stats["max_abertos"] = self.max_open
+        stats["ttl_ocioso_s"] = self.idle_ttl
+        stats["modelo_carregado"] = self._base_embeddings is not None or is_model_loaded()
+        return stats
+
+
+# -----------------------------------------------------------------------------
+# Registro global sob demanda (somente se permitido)
+# -----------------------------------------------------------------------------
+_registry: RAGRegistry | None = None
+_registry_lock = threading.Lock()
+_warmup_threads: Dict[str, threading.Thread] = {}
+
+
+def get_rag_registry() -> RAGRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = RAGRegistry(
+                max_open=int(os.getenv("RAG_MAX_TENANTS", 8)),
+                idle_ttl=float(os.getenv("RAG_TENANT_IDLE_S", 0)),
+            )
+        return _registry
+
+
+def get_rag_service(tenant: str | None = None) -> RAGService | None:
+    """
+    RAG do tenant (padrão: RAG_DEFAULT_TENANT), criado no primeiro uso
+    (thread‑safe). Falhas ficam registradas e viram None.
+    """
+    return get_rag_registry().get(tenant)
+
+
+def set_rag_service(service: RAGService | None, tenant: str | None = None) -> None:
+    """Substitui o RAG de um tenant (ex.: corpus sintético em benchmarks)."""
+    get_rag_registry().set(tenant, service)
+
+
+def warmup(background: bool = True, tenant: str | None = None) -> threading.Thread | None:
+    """Carrega modelo + vetor‑store do tenant antes da primeira pergunta."""
+    tenant = tenant_id(tenant)
+
+    def _run() -> None:
+        service = get_rag_service(tenant)
+        if service is not None:
+            # Primeira inferência do PyTorch é lenta: aquece fora do cache
+            service.embeddings.base.embed_query("aquecimento")
+
+    if not background:
+        _run()
+        return None
+    with _registry_lock:
+        # Um aquecimento por tenant; terminado, o próximo pedido roda de novo
+        # (o tenant pode ter sido despejado nesse meio‑tempo)
+        thread = _warmup_threads.get(tenant)
+        if thread is None or not thread.is_alive():
+            thread = _warmup_threads[tenant] = threading.Thread(
+                target=_run, name=f"rag-warmup-{tenant}", daemon=True
+            )
+            thread.start()
+    return thread
+
+
+def rag_state(tenant: str | None = None) -> str:
+    return get_rag_registry().state(tenant)
+
+
+def __getattr__(name: str) -> Any:
+    # Compatibilidade: `from core.rag import rag_service` dispara a carga
+    if name == "rag_service":
+        return get_rag_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
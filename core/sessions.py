@@ -0,0 +1,426 @@
+"""
+Sessões de conversa (várias pessoas no mesmo processo):
+• Histórico + resumo corrente por session_id, presos ao tenant (base RAG /
+  persona) com que a sessão começou
+• Armazenamento plugável: memória (LRU + TTL) ou SQLite em disco
+• Janela máxima de mensagens por sessão e despejo de sessões ociosas
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+from core.memory import WINDOW_K, trim_history
+
+
+@dataclass
+class SessionData:
+    history: List[BaseMessage] = field(default_factory=list)
+    running_summary: Any = None
+    tenant: Optional[str] = None          # core.rag.tenant_id; None = padrão
+
+
+# -----------------------------------------------------------------------------
+# Armazenamentos
+# -----------------------------------------------------------------------------
+class SessionStore:
+    """Interface mínima de um armazenamento de sessões."""
+
+    def get(self, session_id: str) -> Optional[SessionData]:
+        raise NotImplementedError
+
+    def put(self, session_id: str, data: SessionData) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def evict_idle(self) -> int:
+        """Remove sessões ociosas além do TTL; devolve quantas saíram."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """LRU em memória com TTL de inatividade e teto de sessões."""
+
+    def __init__(self, max_sessions: int = 10_000, ttl: float = 1800) -> None:
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple[float, SessionData]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[SessionData]:
+        with self._lock:
+            item = self._items.get(session_id)
+            if item is None:
+                return None
+            if self.ttl > 0 and time.monotonic() - item[0] > self.ttl:
+                del self._items[session_id]
+                return None
+            self._items.move_to_end(session_id)
+            return item[1]
+
+    def put(self, session_id: str, data: SessionData) -> None:
+        with self._lock:
+            self._items[session_id] = (time.monotonic(), data)
+            self._items.move_to_end(session_id)
+            while len(self._items) > self.max_sessions:
+                self._items.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._items.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        if self.ttl <= 0:
+            return 0
+        limit = time.monotonic() - self.ttl
+        with self._lock:
+            # Ordem LRU: as mais antigas ficam no início
+            stale = []
+            for sid, (touched, _) in self._items.items():
+                if touched >= limit:
+                    break
+                stale.append(sid)
+            for sid in stale:
+                del self._items[sid]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessões persistidas em SQLite (sobrevivem a reinícios do worker)."""
+
+    EVICT_EVERY = 200  # escritas entre varreduras de sessões ociosas
+
+    def __init__(self, path: Path, ttl: float = 1800) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, history TEXT NOT NULL, summary TEXT, updated_at REAL NOT NULL,"
+            " tenant TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(sessions)")}
+        if "tenant" not in columns:        # bancos criados antes dos tenants
+            self._db.execute("ALTER TABLE sessions ADD COLUMN tenant TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, session_id: str) -> Optional[SessionData]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT history, summary, updated_at, tenant FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        history, summary, updated_at, tenant = row
+        if self.ttl > 0 and time.time() - updated_at > self.ttl:
+            self.delete(session_id)
+            return None
+        return SessionData(
+            history=messages_from_dict(json.loads(history)),
+            running_summary=_summary_from_json(summary),
+            tenant=tenant,
+        )
+
+    def put(self, session_id: str, data: SessionData) -> None:
+        payload = json.dumps(messages_to_dict(data.history), ensure_ascii=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, history, summary, updated_at, tenant)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (session_id, payload, _summary_to_json(data.running_summary), time.time(), data.tenant),
+            )
+            self._db.commit()
+            self._writes += 1
+            sweep = self._writes % self.EVICT_EVERY == 0
+        if sweep:
+            self.evict_idle()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+
+    def evict_idle(self) -> int:
+        if self.ttl <= 0:
+            return 0
+        with self._lock:
+            cur = self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+        return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def _summary_to_json(summary: Any) -> Optional[str]:
+    if summary is None:
+        return None
+    return json.dumps({
+        "summary": summary.summary,
+        "summarized_message_ids": sorted(summary.summarized_message_ids),
+        "last_summarized_message_id": summary.last_summarized_message_id,
+    }, ensure_ascii=False)
+
+
+def _summary_from_json(raw: Optional[str]) -> Any:
+    if not raw:
+        return None
+    from langmem.short_term import RunningSummary
+
+    data = json.loads(raw)
+    data["summarized_message_ids"] = set(data["summarized_message_ids"])
+    return RunningSummary(**data)
+
+
+def build_session_store() -> SessionStore:
+    """Escolhe o armazenamento via SESSION_STORE=memory|sqlite."""
+    ttl = float(os.getenv("SESSION_TTL", 1800))
+    if os.getenv("SESSION_STORE", "memory") == "sqlite":
+        return SQLiteSessionStore(Path(os.getenv("SESSION_DB", "sessions.sqlite3")), ttl=ttl)
+    return MemorySessionStore(max_sessions=int(os.getenv("SESSION_MAX", 10_000)), ttl=ttl)
+
+
+# -----------------------------------------------------------------------------
+# Gerenciador
+# -----------------------------------------------------------------------------
+_DONE = object()                           # fim da fila de tokens de `stream`/`astream`
+
+
+class SessionManager:
+    """
+    Um `ConversationalAgent` efêmero por turno, alimentado pelo histórico da
+    sessão; turnos da mesma sessão são serializados, sessões distintas não.
+    Cada sessão fica no tenant do primeiro turno (`tenant` da chamada, senão
+    o do gerenciador, senão RAG_DEFAULT_TENANT).
+    """
+
+    def __init__(
+        self,
+        store: Optional[SessionStore] = None,
+        max_messages: int = 2 * WINDOW_K,
+        tenant: Optional[str] = None,
+    ) -> None:
+        self.store = store if store is not None else build_session_store()
+        self.max_messages = max_messages
+        self.tenant = tenant
+        # session_id → [lock, usuários]; a entrada some quando ninguém usa.
+        # Um único threading.Lock por sessão serve os caminhos síncrono e
+        # assíncrono: `conversar` e `aconversar` da mesma sessão se excluem.
+        # Chamadas assíncronas antes fazem fila num asyncio.Lock da sessão.
+        self._locks: Dict[str, list] = {}
+        self._alocks: Dict[str, list] = {}
+        self._guard = threading.Lock()
+        # Resumos em segundo plano: entregues ao agente do próximo turno
+        self._pending: Dict[str, Future] = {}
+        # Turnos de `astream` em andamento (referência forte até terminarem)
+        self._turns: set = set()
+
+    # ------------------------------------------------------------------ #
+    # API pública
+    # ------------------------------------------------------------------ #
+    def conversar(self, session_id: str, text: str, tenant: Optional[str] = None) -> str:
+        with self._session_lock(session_id):
+            agent = self._load(session_id, tenant)
+            answer = agent.conversar(text)
+            self._save(session_id, agent)
+            return answer
+
+    async def aconversar(self, session_id: str, text: str, tenant: Optional[str] = None) -> str:
+        async with self._asession_lock(session_id):
+            # Armazenamento (SQLite) fora do event loop
+            agent = await asyncio.to_thread(self._load, session_id, tenant)
+            answer = await agent.aconversar(text)
+            await asyncio.to_thread(self._save, session_id, agent)
+            return answer
+
+    def stream(self, session_id: str, text: str, tenant: Optional[str] = None) -> Iterator[str]:
+        """
+        O turno roda numa thread que segura o lock da sessão e passa os
+        tokens por uma fila: o gerador nunca fica parado num `yield` com o
+        lock, e um consumidor que abandona a iteração não trava a sessão
+        (o turno termina e é salvo mesmo assim).
+        """
+        tokens: queue.SimpleQueue = queue.SimpleQueue()
+
+        def run() -> None:
+            try:
+                with self._session_lock(session_id):
+                    agent = self._load(session_id, tenant)
+                    for token in agent.stream(text):
+                        tokens.put(token)
+                    self._save(session_id, agent)
+            except BaseException as exc:  # noqa: BLE001
+                tokens.put(exc)
+            else:
+                tokens.put(_DONE)
+
+        threading.Thread(target=run, name=f"session-{session_id}", daemon=True).start()
+        while (item := tokens.get()) is not _DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def astream(self, session_id: str, text: str, tenant: Optional[str] = None) -> AsyncIterator[str]:
+        """Versão assíncrona de `stream`: o turno roda numa task própria."""
+        tokens: asyncio.Queue = asyncio.Queue()
+
+        async def run() -> None:
+            try:
+                async with self._asession_lock(session_id):
+                    agent = await asyncio.to_thread(self._load, session_id, tenant)
+                    async for token in agent.astream(text):
+                        tokens.put_nowait(token)
+                    await asyncio.to_thread(self._save, session_id, agent)
+            except BaseException as exc:  # noqa: BLE001
+                tokens.put_nowait(exc)
+                if isinstance(exc, asyncio.CancelledError):
+                    raise
+            else:
+                tokens.put_nowait(_DONE)
+
+        task = asyncio.ensure_future(run())
+        self._turns.add(task)
+        task.add_done_callback(self._turns.discard)
+        while (item := await tokens.get()) is not _DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def reset(self, session_id: str) -> None:
+        self.store.delete(session_id)
+
+    def evict_idle(self) -> int:
+        evicted = self.store.evict_idle()
+        with self._guard:
+            done = [sid for sid, fut in self._pending.items() if fut.done()]
+        for sid in done:
+            if self.store.get(sid) is None:
+                self._pending.pop(sid, None)
+        return evicted
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "store": type(self.store).__name__,
+            "sessions": len(self.store),
+            "max_messages": self.max_messages,
+            "resumos_pendentes": len(self._pending),
+        }
+
+    # ------------------------------------------------------------------ #
+    # Internos
+    # ------------------------------------------------------------------ #
+    def _load(self, session_id: str, tenant: Optional[str] = None):
+        from core import rag
+        from core.agent import ConversationalAgent
+
+        data = self.store.get(session_id) or SessionData()
+        tenant = rag.tenant_id(tenant or data.tenant or self.tenant)
+        if data.tenant is not None and data.tenant != tenant:
+            # Histórico de uma persona nunca vai para o prompt de outra
+            raise ValueError(f"Sessão {session_id!r} pertence ao tenant {data.tenant!r}, não a {tenant!r}")
+        agent = ConversationalAgent(
+            history=data.history, running_summary=data.running_summary, tenant=tenant
+        )
+        # O agente aplica o resumo do turno anterior antes de responder
+        agent.pending_summary = self._pending.pop(session_id, None)
+        return agent
+
+    def _trim(self, agent) -> List[BaseMessage]:
+        """
+        Janela de `max_messages`, mas só descarta o que o resumo corrente já
+        cobre: mensagens ainda não resumidas ficam até o resumo pendente
+        (aplicado no próximo turno) incorporá-las.
+        """
+        summary = agent._running_summary
+        covered = summary.summarized_message_ids if summary is not None else set()
+        window = {id(m) for m in trim_history(agent._history, self.max_messages)}
+        return [m for m in agent._history if id(m) in window or m.id not in covered]
+
+    def _save(self, session_id: str, agent) -> None:
+        # Resumo já pronto entra antes do corte
+        if agent.pending_summary is not None and agent.pending_summary.done():
+            agent.wait_summary()
+        history = self._trim(agent)
+        self.store.put(session_id, SessionData(
+            history=history, running_summary=agent._running_summary, tenant=agent.tenant,
+        ))
+        if agent.pending_summary is not None:
+            self._pending[session_id] = agent.pending_summary
+
+    def _checkout(self, table: Dict[str, list], session_id: str, factory) -> Any:
+        with self._guard:
+            entry = table.get(session_id)
+            if entry is None:
+                entry = table[session_id] = [factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _release(self, table: Dict[str, list], session_id: str) -> None:
+        with self._guard:
+            entry = table[session_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del table[session_id]
+
+    @contextmanager
+    def _session_lock(self, session_id: str) -> Iterator[None]:
+        lock = self._checkout(self._locks, session_id, threading.Lock)
+        try:
+            with lock:
+                yield
+        finally:
+            self._release(self._locks, session_id)
+
+    @asynccontextmanager
+    async def _asession_lock(self, session_id: str) -> AsyncIterator[None]:
+        """
+        O mesmo lock de `_session_lock`, sem bloquear o event loop. Chamadas
+        assíncronas da sessão esperam num asyncio.Lock; a da vez espera o
+        threading.Lock (só disputado com chamadas síncronas) numa thread do
+        pool. Se a tarefa for cancelada nessa espera, o lock é devolvido
+        assim que a thread o obtiver.
+        """
+        alock = self._checkout(self._alocks, session_id, asyncio.Lock)
+        lock = self._checkout(self._locks, session_id, threading.Lock)
+        try:
+            async with alock:
+                acquired = asyncio.get_running_loop().run_in_executor(None, lock.acquire)
+                try:
+                    await asyncio.shield(acquired)
+                except asyncio.CancelledError:
+                    acquired.add_done_callback(lambda _: lock.release())
+                    raise
+                try:
+                    yield
+                finally:
+                    lock.release()
+        finally:
+            self._release(self._locks, session_id)
+            self._release(self._alocks, session_id)
@@ -0,0 +1,339 @@
+"""
+Backends de vetor‑store do RAG (selecionados por RAG_VECTOR_BACKEND):
+• chroma → Chroma persistente (SQLite + HNSW), padrão
+• numpy  → matriz float32 contígua em memory‑map + top‑k por produto
+            escalar normalizado (argpartition); ideal para corpora pequenos
+Ambos aceitam filtros simples de metadados: {"campo": valor | [valores]}.
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+VECTOR_BACKENDS = ("chroma", "numpy")
+
+Where = Optional[Dict[str, Any]]
+
+
+def matches(metadata: Dict[str, Any], where: Where) -> bool:
+    """Igualdade por campo; lista/tupla/conjunto = pertence a."""
+    if not where:
+        return True
+    for key, expected in where.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set, frozenset)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class VectorBackend:
+    """Interface mínima usada pelo RAGService."""
+
+    name = "base"
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]) -> None:
+        raise NotImplementedError
+
+    def search(self, vector: Sequence[float], k: int = 4, where: Where = None) -> List[Tuple[Document, float]]:
+        """(doc, score) do mais para o menos similar; maior score = mais próximo."""
+        raise NotImplementedError
+
+    def search_many(
+        self, vectors: Sequence[Sequence[float]], k: int = 4, where: Where = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """`search` para várias consultas; backends sobrescrevem com uma chamada só."""
+        return [self.search(vector, k=k, where=where) for vector in vectors]
+
+    def get_all(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """(id, texto, metadados) de todos os chunks."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Apaga todo o conteúdo (e os arquivos) do índice."""
+        raise NotImplementedError
+
+    def persist(self) -> None:
+        """Grava alterações pendentes em disco (no‑op se o backend já persiste sozinho)."""
+
+
+# -----------------------------------------------------------------------------
+# Chroma
+# -----------------------------------------------------------------------------
+class ChromaVectorBackend(VectorBackend):
+    name = "chroma"
+
+    def __init__(self, persist_dir: Path, embeddings: Embeddings) -> None:
+        from langchain_chroma import Chroma
+
+        self.store = Chroma(persist_directory=str(persist_dir), embedding_function=embeddings)
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        self.store._collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def update_metadata(self, ids, metadatas) -> None:
+        self.store._collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids) -> None:
+        if ids:
+            self.store.delete(ids=ids)
+
+    def search(self, vector, k=4, where=None) -> List[Tuple[Document, float]]:
+        pairs = self.store.similarity_search_by_vector_with_relevance_scores(
+            list(vector), k=k, filter=self._chroma_where(where)
+        )
+        relevance = self.store._select_relevance_score_fn()
+        return [(doc, relevance(distance)) for doc, distance in pairs]
+
+    def search_many(self, vectors, k=4, where=None) -> List[List[Tuple[Document, float]]]:
+        if not vectors:
+            return []
+        result = self.store._collection.query(
+            query_embeddings=[list(v) for v in vectors],
+            n_results=k,
+            where=self._chroma_where(where),
+            include=["documents", "metadatas", "distances"],
+        )
+        relevance = self.store._select_relevance_score_fn()
+        return [
+            [
+                (Document(page_content=text, metadata=meta or {}, id=cid), relevance(distance))
+                for cid, text, meta, distance in zip(ids, texts, metas, distances)
+            ]
+            for ids, texts, metas, distances in zip(
+                result["ids"], result["documents"], result["metadatas"], result["distances"]
+            )
+        ]
+
+    @staticmethod
+    def _chroma_where(where: Where) -> Optional[Dict[str, Any]]:
+        if not where:
+            return None
+        clauses = [
+            {key: {"$in": list(value)} if isinstance(value, (list, tuple, set, frozenset)) else value}
+            for key, value in where.items()
+        ]
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def get_all(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        stored = self.store.get(include=["documents", "metadatas"])
+        for cid, text, meta in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+            yield cid, text, meta or {}
+
+    def count(self) -> int:
+        return self.store._collection.count()
+
+    def reset(self) -> None:
+        self.store.delete_collection()
+
+    def persist(self) -> None:
+        # ▶️  Persistir apenas se o método existir (compatibilidade versões)
+        if hasattr(self.store, "persist"):
+            self.store.persist()
+
+
+# -----------------------------------------------------------------------------
+# NumPy (força bruta vetorizada)
+# -----------------------------------------------------------------------------
+class NumpyVectorBackend(VectorBackend):
+    """
+    Vetores normalizados numa matriz (n × d) float32; o arquivo é aberto por
+    memory‑map (carga instantânea, páginas sob demanda). Alterações ficam em
+    memória e são compactadas/gravadas em `persist()`.
+    """
+
+    name = "numpy"
+    MATRIX_FILE = "numpy_vectors.f32"
+    STORE_FILE = "numpy_store.json"
+
+    def __init__(self, persist_dir: Path, create: bool = True) -> None:
+        self.persist_dir = Path(persist_dir)
+        self._lock = threading.RLock()
+        self._dim = 0
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._ids: List[Optional[str]] = []       # None = linha apagada (até compactar)
+        self._texts: List[str] = []
+        self._metas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._pending: List[np.ndarray] = []      # lotes novos ainda não empilhados
+        self._view: Optional[Tuple] = None        # cópia imutável lida pelas buscas
+        self._dirty = False
+
+        if (self.persist_dir / self.STORE_FILE).exists():
+            self._load()
+        elif not create:
+            raise FileNotFoundError(f"Índice NumPy não encontrado em {self.persist_dir}")
+
+    # ---- persistência -------------------------------------------------------
+    def _load(self) -> None:
+        store = json.loads((self.persist_dir / self.STORE_FILE).read_text(encoding="utf-8"))
+        n, dim = len(store["ids"]), store["dim"]
+        matrix_path = self.persist_dir / self.MATRIX_FILE
+        if matrix_path.stat().st_size != n * dim * 4:
+            raise ValueError("Índice NumPy inconsistente (matriz × metadados)")
+        self._dim = dim
+        self._matrix = (
+            np.memmap(matrix_path, dtype=np.float32, mode="r", shape=(n, dim))
+            if n else np.zeros((0, dim), dtype=np.float32)
+        )
+        self._ids = list(store["ids"])
+        self._texts = store["documents"]
+        self._metas = store["metadatas"]
+        self._rows = {cid: i for i, cid in enumerate(self._ids)}
+        self._view = None
+
+    def persist(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self._compact()
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            matrix_path = self.persist_dir / self.MATRIX_FILE
+            store_path = self.persist_dir / self.STORE_FILE
+            tmp_matrix = matrix_path.with_suffix(".tmp")
+            tmp_store = store_path.with_suffix(".tmp")
+            np.ascontiguousarray(self._matrix, dtype=np.float32).tofile(tmp_matrix)
+            tmp_store.write_text(json.dumps({
+                "dim": self._dim,
+                "ids": self._ids,
+                "documents": self._texts,
+                "metadatas": self._metas,
+            }, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_matrix, matrix_path)
+            os.replace(tmp_store, store_path)
+            self._dirty = False
+            self._load()  # volta ao memory‑map (libera a cópia em RAM)
+
+    def reset(self) -> None:
+        with self._lock:
+            for name in (self.MATRIX_FILE, self.STORE_FILE):
+                (self.persist_dir / name).unlink(missing_ok=True)
+            self.__init__(self.persist_dir, create=True)
+
+    # ---- escrita ------------------------------------------------------------
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            if not self._dim:
+                self._dim = vectors.shape[1]
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Dimensão {vectors.shape[1]} ≠ {self._dim} do índice")
+            self._drop([cid for cid in ids if cid in self._rows])
+            base = len(self._ids)
+            for offset, (cid, text, meta) in enumerate(zip(ids, documents, metadatas)):
+                self._rows[cid] = base + offset
+                self._ids.append(cid)
+                self._texts.append(text)
+                self._metas.append(dict(meta or {}))
+            self._pending.append(vectors)
+            self._view, self._dirty = None, True
+
+    def update_metadata(self, ids, metadatas) -> None:
+        with self._lock:
+            for cid, meta in zip(ids, metadatas):
+                row = self._rows.get(cid)
+                if row is not None:
+                    self._metas[row] = dict(meta or {})
+            self._view, self._dirty = None, True
+
+    def delete(self, ids) -> None:
+        with self._lock:
+            self._drop(ids)
+
+    def _drop(self, ids: Sequence[str]) -> None:
+        for cid in ids:
+            row = self._rows.pop(cid, None)
+            if row is not None:
+                self._ids[row] = None
+                self._view, self._dirty = None, True
+
+    def _compact(self) -> None:
+        """Empilha lotes pendentes e remove linhas apagadas (com o lock)."""
+        if self._pending:
+            parts = ([self._matrix] if len(self._matrix) else []) + self._pending
+            self._matrix = np.vstack(parts)
+            self._pending = []
+        if len(self._rows) != len(self._ids):
+            keep = [i for i, cid in enumerate(self._ids) if cid is not None]
+            self._matrix = self._matrix[keep]
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metas = [self._metas[i] for i in keep]
+            self._rows = {cid: i for i, cid in enumerate(self._ids)}
+
+    # ---- leitura ------------------------------------------------------------
+    def _snapshot(self) -> Tuple[np.ndarray, List[str], List[str], List[Dict[str, Any]]]:
+        with self._lock:
+            if self._view is None:
+                self._compact()
+                self._view = (self._matrix, list(self._ids), list(self._texts), list(self._metas))
+            return self._view
+
+    def search(self, vector, k=4, where=None) -> List[Tuple[Document, float]]:
+        return self.search_many([vector], k=k, where=where)[0]
+
+    def search_many(self, vectors, k=4, where=None) -> List[List[Tuple[Document, float]]]:
+        """Todas as consultas numa multiplicação (m × d)·(d × n) + argpartition por linha."""
+        matrix, ids, texts, metas = self._snapshot()
+        if not len(ids) or k <= 0 or not len(vectors):
+            return [[] for _ in vectors]
+        queries = _normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        scores = queries @ matrix.T
+        if where:
+            allowed = np.fromiter((matches(m, where) for m in metas), dtype=bool, count=len(metas))
+            scores[:, ~allowed] = -np.inf
+            k = min(k, int(allowed.sum()))
+            if not k:
+                return [[] for _ in vectors]
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rows = np.arange(len(queries))[:, None]
+        top = np.take_along_axis(top, np.argsort(-scores[rows, top], axis=1), axis=1)
+        return [
+            [
+                (Document(page_content=texts[i], metadata=dict(metas[i]), id=ids[i]), float(scores[q, i]))
+                for i in top[q]
+            ]
+            for q in range(len(queries))
+        ]
+
+    def get_all(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        _, ids, texts, metas = self._snapshot()
+        yield from zip(ids, texts, metas)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def open_backend(name: str, persist_dir: Path, embeddings: Embeddings, create: bool = True) -> VectorBackend:
+    if name == "chroma":
+        return ChromaVectorBackend(persist_dir, embeddings)
+    if name == "numpy":
+        return NumpyVectorBackend(persist_dir, create=create)
+    raise ValueError(f"Backend de vetores inválido: {name!r} (use {', '.join(VECTOR_BACKENDS)})")
@@ -18,6 +18,7 @@ from core.agent import ConversationalAgent  # noqa: E402
 def main() -> None:
     print("Agente mínimo LangGraph 0.3")
     agent = ConversationalAgent()
+    agent.warmup()  # carrega LLM/RAG em segundo plano enquanto o usuário digita
     print(f"Modelo: {agent.get_status()['llm_model']}")
     print()
 
@@ -25,8 +26,10 @@ def main() -> None:
         user_input = input("Você: ").strip()
         if user_input.lower() in {"sair", "exit", "quit", "q"}:
             break
-        resposta = agent.conversar(user_input)
-        print(f"Alam: {resposta}\n")
+        print("Alam: ", end="", flush=True)
+        for token in agent.stream(user_input):
+            print(token, end="", flush=True)
+        print("\n")
 
 if __name__ == "__main__":
     main()
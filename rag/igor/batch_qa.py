@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Execute:  python rag/igor/batch_qa.py [perguntas.csv|.txt] [--out respostas.jsonl]
+• Padrão: todas as perguntas de rag/igor/data/faq_recrutadores.csv
+• CSV precisa da coluna "pergunta"; .txt = uma pergunta por linha
+• Grava uma linha JSON por pergunta (com a resposta esperada, se houver)
+  e imprime os tempos do lote
+"""
+
+from __future__ import annotations
+import argparse, csv, json, os, sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]          # raiz do projeto
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)                                       # agent/prompt.md é relativo à raiz
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+from core.batch import answer_batch  # noqa: E402
+
+FAQ_CSV = Path(__file__).parent / "data" / "faq_recrutadores.csv"
+
+
+def read_questions(path: Path) -> List[Dict[str, str]]:
+    if path.suffix.lower() == ".csv":
+        with open(path, encoding="utf-8", newline="") as fh:
+            return [row for row in csv.DictReader(fh) if row.get("pergunta")]
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [{"pergunta": line.strip()} for line in lines if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perguntas em lote")
+    parser.add_argument("questions", nargs="?", type=Path, default=FAQ_CSV)
+    parser.add_argument("--out", type=Path, default=Path("batch_respostas.jsonl"))
+    parser.add_argument("--concurrency", type=int, help="chamadas ao LLM em paralelo")
+    parser.add_argument("--tools", action="store_true", help="permite tools nas perguntas que pedirem")
+    args = parser.parse_args()
+
+    rows = read_questions(args.questions)
+    print(f"== {len(rows)} perguntas ==")
+    report = answer_batch([r["pergunta"] for r in rows], concurrency=args.concurrency, tools=args.tools)
+
+    with open(args.out, "w", encoding="utf-8") as fh:
+        for row, item in zip(rows, report.answers):
+            record = {
+                "pergunta": item.question,
+                "resposta": item.answer,
+                "esperado": row.get("resposta"),
+                "erro": item.error,
+                "tentativas": item.attempts,
+                "chunks": item.rag_hits,
+                "llm_ms": item.llm_ms,
+            }
+            fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    print(json.dumps(report.timings, ensure_ascii=False, indent=2))
+    print(f"✅  Respostas salvas em {args.out}")
+    if report.failed:
+        print(f"⚠️  {len(report.failed)} perguntas falharam.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,46 @@
 #!/usr/bin/env python3
 """
-Execute:  python rag/igor/ingest_rag.py
-• Remove vetor‑store antigo
-• Carrega todos os .md .csv .txt em rag/igor/data
-• Cria vetor‑store Chroma persistente
+Execute:  python rag/igor/ingest_rag.py [--full] [--tenant ID]
+• Padrão (incremental): compara o manifesto de hashes com rag/<tenant>/data,
+  embeda só chunks novos/alterados e apaga os de arquivos removidos
+• --full: remove o vetor‑store antigo e recria tudo do zero
+• --tenant: base a ingerir (padrão: RAG_DEFAULT_TENANT, "igor"); os
+  caminhos seguem o layout do RAGRegistry (RAG_ROOT/<tenant>/{data,vectors})
 """
 
 from __future__ import annotations
-import os, shutil, sys
+import argparse, os, shutil, sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[2]          # raiz do projeto
 sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)                                       # RAG_ROOT é relativo à raiz
 
 # Evita que core.rag carregue a Chroma enquanto deletamos
 os.environ["DISABLE_RAG_AUTOLOAD"] = "1"
 
-from core.rag import RAGService  # noqa: E402
-
-DATA_DIR   = Path(__file__).parent / "data"
-PERSIST_DIR = Path(__file__).parent / "vectors"
+from core.rag import RAGRegistry, RAGService, tenant_id  # noqa: E402
 
 def main() -> None:
-    print("== Ingestão RAG ==")
-    if PERSIST_DIR.exists():
-        shutil.rmtree(PERSIST_DIR)
+    parser = argparse.ArgumentParser(description="Ingestão RAG")
+    parser.add_argument("--full", action="store_true", help="recria o vetor‑store do zero")
+    parser.add_argument("--tenant", help="base a ingerir (padrão: RAG_DEFAULT_TENANT)")
+    args = parser.parse_args()
+
+    tenant = tenant_id(args.tenant)
+    data_dir, persist_dir = RAGRegistry().paths(tenant)
+    print(f"== Ingestão RAG ({tenant}) ==")
+    if args.full and persist_dir.exists():
+        shutil.rmtree(persist_dir)
         print("🗑️  Vetor‑store antigo removido.")
 
-    rag = RAGService(data_dir=DATA_DIR, persist_dir=PERSIST_DIR)
+    rag = RAGService(data_dir=data_dir, persist_dir=persist_dir)
+    if not args.full:
+        rag.sync()
+
     if rag.is_available():
         st = rag.get_status()
-        print(f"✅  Vetor‑store criado com {st['arquivos_vetores']} arquivos.")
+        print(f"✅  Vetor‑store pronto: {st['chunks_indexados']} chunks, {st['arquivos_vetores']} arquivos.")
     else:
         print("❌  Falha ao criar vetor‑store.")
 
@@ -0,0 +1,118 @@
+import math
+
+import pytest
+
+from tools.calculator import CalcError, calculate, compile_expression, evaluate, evaluate_many, format_number
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("2 + 3", 5),
+        ("10 - 4", 6),
+        ("6 * 7", 42),
+        ("7 / 2", 3.5),
+        ("7 // 2", 3),
+        ("7 % 4", 3),
+        ("2 ** 10", 1024),
+        ("2 ^ 10", 1024),
+        ("1 << 4", 16),
+        ("256 >> 4", 16),
+        ("-5 + +2", -3),
+        ("3 × 4 ÷ 2 − 1", 5),
+        ("2 + 2 * (3 - 1)", 6),
+        ("√16", 4),
+        ("√(9) + 1", 4),
+        ("2 * √2.25", 3),
+        ("factorial(5)", 120),
+        ("comb(5, 2)", 10),
+        ("max(1, 9, 3) - min(4, 2)", 7),
+    ],
+)
+def test_allowed_operators_and_functions(expression, expected):
+    assert evaluate(expression) == expected
+
+
+def test_constants_and_variables():
+    assert evaluate("2 * pi") == pytest.approx(math.tau)
+    assert evaluate("x * y + 1", {"x": 3, "y": 4}) == 13
+    assert compile_expression("x + y * z").names == {"x", "y", "z"}
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("(1).__class__", "sintaxe não permitida: Attribute"),
+        ("math.pi", "sintaxe não permitida: Attribute"),
+        ("[1, 2][0]", "sintaxe não permitida: Subscript"),
+        ("lambda: 1", "sintaxe não permitida: Lambda"),
+        ("__import__('os')", "função não permitida: __import__"),
+        ("eval('1')", "função não permitida: eval"),
+        ("open('x')", "função não permitida: open"),
+        ("math.sqrt(4)", "função não permitida: math.sqrt"),
+        ("round(1.5, ndigits=0)", "função não permitida: round"),
+        ("'a' * 3", "constante não permitida: 'a'"),
+        ("True + 1", "constante não permitida: True"),
+        ("1 < 2", "sintaxe não permitida: Compare"),
+    ],
+)
+def test_rejected_nodes(expression, message):
+    with pytest.raises(CalcError, match=f"^{message}"):
+        evaluate(expression)
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("9**9**9", "expoente acima do limite"),
+        ("2 ** 100000", "expoente acima do limite"),
+        ("10 ** 9999", "resultado grande demais"),
+        ("1 << 100000", "resultado grande demais"),
+        ("factorial(100000)", "factorial: argumento acima de 1000"),
+        ("comb(10**6, 3)", "comb: argumento acima de 10000"),
+        ("perm(50000, 2)", "perm: argumento acima de 10000"),
+        ("factorial(999) * factorial(999) * factorial(999) * factorial(999)", "resultado grande demais"),
+    ],
+)
+def test_expensive_expressions_fail_fast(expression, message):
+    with pytest.raises(CalcError, match=message):
+        evaluate(expression)
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("1 / 0", "divisão por zero"),
+        ("sqrt(-1)", "valor fora do domínio da função"),
+        ("(-8) ** 0.5", "resultado complexo"),
+        ("x + 1", "variável sem valor: x"),
+        ("2 +", "sintaxe inválida"),
+        ("1 + " * 300 + "1", "expressão longa demais"),
+        ("+".join(["1"] * 120), "expressão complexa demais"),
+    ],
+)
+def test_error_messages(expression, message):
+    with pytest.raises(CalcError, match=message):
+        evaluate(expression)
+
+
+def test_calculate_with_bindings():
+    assert calculate("x ** 2 + 1; x = [1, 2, 3]") == [2, 5, 10]
+    assert calculate("a * x; x = [1, 2]; a = 10") == [10, 20]
+    assert calculate("'2 + 2'") == 4
+    with pytest.raises(CalcError, match="listas com tamanhos diferentes"):
+        calculate("x + y; x = [1, 2]; y = [1]")
+    with pytest.raises(CalcError, match="atribuição inválida"):
+        calculate("x; 1 = 2")
+
+
+def test_evaluate_many_reports_failing_item():
+    assert evaluate_many("1 / x", [1, 2, 4]) == [1, 0.5, 0.25]
+    with pytest.raises(CalcError, match=r"divisão por zero \(item 1: 0\)"):
+        evaluate_many("1 / x", [1, 0])
+
+
+def test_format_number():
+    assert format_number(4.0) == "4"
+    assert format_number(1 / 3) == "0.333333333333"
+    assert format_number(10**20) == "100000000000000000000"
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from core.loaders import iter_chunks, section_prefix
+
+MARKDOWN = """# Igor Macedo
+
+Desenvolvedor backend.
+
+## Experiência
+
+### Empresa A
+Python, LangChain e RAG.
+
+```python
+# não é um título
+print("oi")
+```
+
+### Empresa B
+
+Go e Kubernetes.
+
+## Educação
+
+Ciência da Computação.
+"""
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "120")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "20")
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_markdown_chunks_keep_heading_path(tmp_path):
+    path = _write(tmp_path, "cv.md", MARKDOWN)
+    docs = list(iter_chunks(path))
+    sections = [d.metadata["section"] for d in docs]
+    assert sections == [
+        "Igor Macedo",
+        "Igor Macedo > Experiência > Empresa A",
+        "Igor Macedo > Experiência > Empresa B",
+        "Igor Macedo > Educação",
+    ]
+    assert docs[-1].page_content == "Igor Macedo > Educação\n\nCiência da Computação."
+    assert "# não é um título" in docs[1].page_content          # dentro de bloco de código
+
+
+def test_markdown_offsets_cover_body_after_prefix(tmp_path):
+    path = _write(tmp_path, "cv.md", MARKDOWN + "\n## Longa\n\n" + "palavra " * 60)
+    text = path.read_text(encoding="utf-8")
+    docs = list(iter_chunks(path))
+    assert sum(d.metadata["section"].endswith("Longa") for d in docs) > 1   # subdividida
+    for doc in docs:
+        prefix = section_prefix(doc.metadata["section"])
+        assert doc.page_content.startswith(prefix)
+        assert text[doc.metadata["start_index"]:doc.metadata["end_index"]] == doc.page_content[len(prefix):]
+
+
+def test_text_chunks_are_file_slices(tmp_path):
+    paragraphs = [f"Parágrafo {i}: " + "texto corrido " * (3 + 4 * (i % 3)) for i in range(8)]
+    path = _write(tmp_path, "notas.txt", "\n\n\n".join(paragraphs) + "\n")
+    text = path.read_text(encoding="utf-8")
+    docs = list(iter_chunks(path))
+    assert len(docs) > 1
+    for doc in docs:
+        assert doc.metadata["type"] == "text"
+        assert text[doc.metadata["start_index"]:doc.metadata["end_index"]] == doc.page_content
+    assert all(p.strip() in text for p in paragraphs)
+
+
+def test_csv_offsets_are_relative_to_the_record(tmp_path):
+    long_text = "linha longa de descrição " * 12
+    path = _write(
+        tmp_path,
+        "faq.csv",
+        "pergunta,resposta,categoria\n"
+        "Onde mora?,Em São Paulo.,pessoal\n"
+        f'Descreva,"{long_text}",trabalho\n',
+    )
+    docs = list(iter_chunks(path))
+    first = docs[0]
+    assert first.metadata == {
+        "categoria": "pessoal", "source": "faq.csv", "type": "faq", "row": 0,
+        "start_index": 0, "end_index": len(first.page_content),
+    }
+    assert first.page_content == "Pergunta: Onde mora?\nResposta: Em São Paulo."
+
+    record_text = f"Pergunta: Descreva\nResposta: {long_text}"
+    rest = docs[1:]
+    assert len(rest) > 1 and {d.metadata["row"] for d in rest} == {1}
+    for doc in rest:
+        assert record_text[doc.metadata["start_index"]:doc.metadata["end_index"]] == doc.page_content
+
+
+def test_jsonl_offsets_are_relative_to_the_record(tmp_path):
+    records = [{"text": "curto", "tag": "a"}, {"texto": "registro longo " * 15}, [1, 2]]
+    path = _write(tmp_path, "dados.jsonl", "\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n")
+    docs = list(iter_chunks(path))
+    assert docs[0].page_content == "curto" and docs[0].metadata["tag"] == "a"
+    for doc in docs:
+        record = records[doc.metadata["row"]]
+        source = record.get("text") or record["texto"] if isinstance(record, dict) else json.dumps(record)
+        assert source[doc.metadata["start_index"]:doc.metadata["end_index"]] == doc.page_content
+    assert {d.metadata["row"] for d in docs} == {0, 1, 2}
+
+
+def test_context_merges_adjacent_markdown_chunks_under_one_heading(tmp_path):
+    pytest.importorskip("tiktoken")
+    from core.context import ContextBuilder
+
+    path = _write(tmp_path, "cv.md", "## Longa\n\n" + " ".join(f"p{i}" for i in range(80)))
+    text = path.read_text(encoding="utf-8")
+    docs = list(iter_chunks(path))
+    assert len(docs) > 1
+    context = ContextBuilder(max_tokens=10_000).build([(d, 1.0) for d in docs])
+    assert context.count("Longa") == 1
+    assert context == "Longa\n\n" + text[len("## Longa\n\n"):].strip()
@@ -0,0 +1,49 @@
+import io
+
+import pytest
+
+pytest.importorskip("reportlab")
+pypdf = pytest.importorskip("pypdf")
+
+from tools.pdf_generator.writers import write_pdf  # noqa: E402
+
+
+def _pdf(lines, **kwargs):
+    buffer = io.BytesIO()
+    stats = write_pdf(iter(lines), buffer, **kwargs)
+    return stats, pypdf.PdfReader(io.BytesIO(buffer.getvalue()))
+
+
+def test_output_parses_with_text_and_metadata():
+    stats, reader = _pdf(["Currículo", "Educação e ação — 10 €"], title="Currículo")
+    assert stats == {"linhas": 2, "paginas": 1}
+    assert len(reader.pages) == 1
+    assert reader.metadata.title == "Currículo"
+    text = reader.pages[0].extract_text()
+    assert "Educação e ação — 10 €" in text
+
+
+def test_one_page_per_show_page():
+    stats, reader = _pdf([f"linha {i}" for i in range(200)])
+    assert stats["paginas"] == len(reader.pages) > 1
+    assert "linha 0" in reader.pages[0].extract_text()
+    assert "linha 199" in reader.pages[-1].extract_text()
+
+
+def test_long_line_is_wrapped_not_cut():
+    word = "palavra"
+    stats, reader = _pdf([" ".join([word] * 200)])
+    assert stats["linhas"] > 1
+    assert reader.pages[0].extract_text().count(word) == 200
+
+
+def test_empty_input_still_has_a_page():
+    stats, reader = _pdf([])
+    assert stats == {"linhas": 0, "paginas": 1}
+    assert len(reader.pages) == 1
+
+
+def test_unencodable_text_is_refused(monkeypatch):
+    monkeypatch.delenv("PDF_FONT_PATH", raising=False)
+    with pytest.raises(ValueError, match=r"U\+4E2D.*PDF_FONT_PATH"):
+        write_pdf(iter(["ok", "中文"]), io.BytesIO())
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from tools import web_search  # noqa: E402
+from tools.web_search import SearchCache, SearchResult, WebSearchTool  # noqa: E402
+
+FIXTURE_HTML = """
+<html><body>
+  <div class="result results_links">
+    <h2 class="result__title">
+      <a class="result__a" href="//duckduckgo.com/l/?uddg=https%3A%2F%2Fpython.org%2F&amp;rut=x">
+        Welcome to <b>Python</b>.org
+      </a>
+    </h2>
+    <a class="result__snippet" href="#">The official home of the <b>Python</b> Programming Language.</a>
+  </div>
+  <div class="result result--ad">
+    <a class="result__a" href="https://duckduckgo.com/y.js?ad_provider=x">Anúncio</a>
+    <a class="result__snippet" href="#">Patrocinado</a>
+  </div>
+  <div class="result">
+    <a class="result__a" href="https://docs.python.org/3/">Documentação &amp; tutoriais</a>
+    <div class="result__snippet">Referência   da linguagem</div>
+  </div>
+  <div class="result">
+    <a class="result__a" href="https://python.org/">Duplicado</a>
+  </div>
+</body></html>
+"""
+
+EXPECTED = [
+    SearchResult("Welcome to Python.org", "https://python.org/", "The official home of the Python Programming Language."),
+    SearchResult("Documentação & tutoriais", "https://docs.python.org/3/", "Referência da linguagem"),
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    queries: list = []
+
+    def do_GET(self):  # noqa: N802
+        self.queries.append(parse_qs(urlparse(self.path).query).get("q", [""])[0])
+        body = FIXTURE_HTML.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    _Handler.queries = []
+    monkeypatch.setenv("WEB_SEARCH_URL", f"http://127.0.0.1:{httpd.server_port}/html/")
+    monkeypatch.setattr(web_search, "_cache", SearchCache(ttl=60))
+    yield _Handler.queries
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_parse_results_from_fixture():
+    assert web_search.parse_results(FIXTURE_HTML) == EXPECTED
+    assert web_search.parse_results(FIXTURE_HTML, limit=1) == EXPECTED[:1]
+
+
+def test_search_parses_and_caches(server):
+    tool = WebSearchTool()
+    assert tool.search("Python  docs") == EXPECTED
+    assert tool.search("python docs") == EXPECTED           # mesma consulta normalizada
+    assert server == ["Python  docs"]
+    assert web_search.get_search_cache().get_stats() == {"hits": 1, "misses": 1, "entradas": 1}
+    assert tool.run("python docs").startswith("1. Welcome to Python.org — https://python.org/")
+
+
+def test_cache_expires_after_ttl(server, monkeypatch):
+    tool = WebSearchTool()
+    tool.search("python")
+    now = web_search.time.monotonic()
+    monkeypatch.setattr(web_search.time, "monotonic", lambda: now + 61)
+    tool.search("python")
+    assert server == ["python", "python"]
+
+
+def test_asearch_closes_client_with_loop(server):
+    tool = WebSearchTool()
+
+    async def run():
+        results = await tool.asearch("async python")
+        return results, await web_search.get_async_client()
+
+    results, client = asyncio.run(run())
+    assert results == EXPECTED
+    assert client.is_closed                                  # fechado no fim do asyncio.run
+    assert asyncio.run(tool.asearch("async python")) == EXPECTED   # cache, sem rede
+    assert server == ["async python"]
+
+
+def test_http_error_becomes_tool_error(monkeypatch):
+    monkeypatch.setenv("WEB_SEARCH_URL", "http://127.0.0.1:9/")
+    monkeypatch.setattr(web_search, "_cache", SearchCache())
+    assert WebSearchTool().run("qualquer").startswith("Falha na busca web")
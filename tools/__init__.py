@@ -1,8 +1,19 @@
 """
 Reexporta ferramentas públicas para import fácil:
-    from tools import EchoTool, CalculatorTool, DateTimeTool
+    from tools import EchoTool, CalculatorTool, DateTimeTool, WebSearchTool
+    from tools import PDFGeneratorTool, CSVGeneratorTool, TXTGeneratorTool
 """
 
 from .basic_tools import EchoTool, CalculatorTool, DateTimeTool
+from .web_search import WebSearchTool
+from .pdf_generator import PDFGeneratorTool, CSVGeneratorTool, TXTGeneratorTool
 
-__all__ = ["EchoTool", "CalculatorTool", "DateTimeTool"]
+__all__ = [
+    "EchoTool",
+    "CalculatorTool",
+    "DateTimeTool",
+    "WebSearchTool",
+    "PDFGeneratorTool",
+    "CSVGeneratorTool",
+    "TXTGeneratorTool",
+]
@@ -4,6 +4,7 @@ Todas síncronas e sem dependências externas.
 """
 
 from langchain.tools import tool
+from .calculator import CalcError, calculate, format_number
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
@@ -17,14 +18,18 @@ def EchoTool(text: str) -> str:
 @tool
 def CalculatorTool(expression: str) -> str:
     """
-    Avalia expressões aritméticas simples.
-    Ex.: "2 + 2 * (3 - 1)"
+    Avalia expressões aritméticas: + - * / // % ** (ou ^), parênteses,
+    pi, e e funções como sqrt, log, sin, cos, round, min, max, factorial.
+    Ex.: "2 + 2 * (3 - 1)", "sqrt(2) ^ 2"
+    Para vários valores: "x ** 2 + 1; x = [1, 2, 3]"
     """
     try:
-        result = eval(expression, {"__builtins__": {}})
-        return str(result)
-    except Exception as exc:  # noqa: BLE001
+        result = calculate(expression)
+    except CalcError as exc:
         return f"Erro na expressão: {exc}"
+    if isinstance(result, list):
+        return "[" + ", ".join(format_number(v) for v in result) + "]"
+    return format_number(result)
 
 
 @tool
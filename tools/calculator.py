@@ -0,0 +1,336 @@
+"""
+Avaliador aritmético seguro para a CalculatorTool (substitui o `eval`):
+• Só aceita números, variáveis, operadores aritméticos e funções de uma
+  lista fechada (math) — nada de atributos, índices, lambdas ou builtins
+• Limites de custo: tamanho da expressão, nº de nós, expoente, bits de
+  inteiros (9**9**9 falha na hora em vez de travar o worker) e tempo total
+• Expressões compiladas em closures e guardadas em cache (LRU)
+• Avaliação vetorizada: a mesma expressão sobre listas de valores
+"""
+
+from __future__ import annotations
+import ast
+import functools
+import math
+import operator
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence, Union
+
+Number = Union[int, float]
+
+MAX_EXPR_CHARS = int(os.getenv("CALC_MAX_CHARS", 500))
+MAX_NODES = int(os.getenv("CALC_MAX_NODES", 200))
+MAX_EXPONENT = int(os.getenv("CALC_MAX_EXPONENT", 10_000))
+MAX_INT_BITS = int(os.getenv("CALC_MAX_INT_BITS", 10_000))        # ~3000 dígitos
+MAX_VALUES = int(os.getenv("CALC_MAX_VALUES", 10_000))
+TIMEOUT_S = float(os.getenv("CALC_TIMEOUT_MS", 50)) / 1000
+BATCH_TIMEOUT_S = float(os.getenv("CALC_BATCH_TIMEOUT_MS", 1000)) / 1000
+
+
+class CalcError(ValueError):
+    """Expressão inválida, não permitida ou cara demais."""
+
+
+# ---------- Operações com limite ----------
+def _check_int(value: Any) -> Any:
+    if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+        raise CalcError("resultado grande demais")
+    return value
+
+
+def _mul(a: Number, b: Number) -> Number:
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() > MAX_INT_BITS:
+        raise CalcError("resultado grande demais")
+    return a * b
+
+
+def _pow(a: Number, b: Number) -> Number:
+    if isinstance(b, (int, float)) and abs(b) > MAX_EXPONENT:
+        raise CalcError(f"expoente acima do limite ({MAX_EXPONENT})")
+    if isinstance(a, int) and isinstance(b, int) and b > 0 and a.bit_length() * b > MAX_INT_BITS:
+        raise CalcError("resultado grande demais")
+    result = a ** b
+    if isinstance(result, complex):
+        raise CalcError("resultado complexo (raiz de número negativo?)")
+    return result
+
+
+def _lshift(a: int, b: int) -> int:
+    if b > MAX_INT_BITS:
+        raise CalcError("resultado grande demais")
+    return a << b
+
+
+def _bounded(limit: int, fn: Callable[..., Number]) -> Callable[..., Number]:
+    """Funções combinatórias: argumentos limitados antes de calcular."""
+
+    @functools.wraps(fn)
+    def wrapper(*args: Number) -> Number:
+        if any(abs(a) > limit for a in args):
+            raise CalcError(f"{fn.__name__}: argumento acima de {limit}")
+        return fn(*args)
+
+    return wrapper
+
+
+_BINARY_OPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _pow,
+    ast.LShift: _lshift,
+    ast.RShift: operator.rshift,
+}
+_UNARY_OPS: Dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+FUNCTIONS: Dict[str, Callable[..., Number]] = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "pow": _pow,
+    "sqrt": math.sqrt,
+    "raiz": math.sqrt,
+    "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x),
+    "exp": math.exp,
+    "log": math.log,
+    "ln": math.log,
+    "log10": math.log10,
+    "log2": math.log2,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "atan2": math.atan2,
+    "sinh": math.sinh,
+    "cosh": math.cosh,
+    "tanh": math.tanh,
+    "hypot": math.hypot,
+    "degrees": math.degrees,
+    "radians": math.radians,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "trunc": math.trunc,
+    "gcd": math.gcd,
+    "lcm": math.lcm,
+    "factorial": _bounded(1_000, math.factorial),
+    "comb": _bounded(10_000, math.comb),
+    "perm": _bounded(10_000, math.perm),
+}
+CONSTANTS: Dict[str, float] = {"pi": math.pi, "e": math.e, "tau": math.tau, "inf": math.inf}
+
+# Notação que o LLM / usuário costuma usar
+_REPLACEMENTS = (("×", "*"), ("÷", "/"), ("−", "-"), ("^", "**"), ("√", "sqrt"))
+
+
+_BARE_ROOT = re.compile(r"√\s*(\d+(?:\.\d*)?|\.\d+|[A-Za-z_]\w*(?!\w)(?!\s*\())")
+
+
+def normalize(expression: str) -> str:
+    text = _BARE_ROOT.sub(r"sqrt(\1)", " ".join(expression.split()))   # √16 → sqrt(16)
+    for old, new in _REPLACEMENTS:
+        text = text.replace(old, new)
+    return text
+
+
+# ---------- Compilação ----------
+class _Context:
+    __slots__ = ("variables", "deadline", "steps")
+
+    def __init__(self, variables: Mapping[str, Number], deadline: float) -> None:
+        self.variables = variables
+        self.deadline = deadline
+        self.steps = 0
+
+    def tick(self) -> None:
+        self.steps += 1
+        if not self.steps & 63 and time.perf_counter() > self.deadline:
+            raise CalcError("tempo de cálculo esgotado")
+
+
+Evaluator = Callable[[_Context], Number]
+
+
+def _compile_node(node: ast.AST, names: set) -> Evaluator:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise CalcError(f"constante não permitida: {value!r}")
+        return lambda ctx: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return lambda ctx: value
+        names.add(name)
+
+        def variable(ctx: _Context) -> Number:
+            try:
+                return ctx.variables[name]
+            except KeyError:
+                raise CalcError(f"variável sem valor: {name}") from None
+
+        return variable
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        op = _BINARY_OPS[type(node.op)]
+        left, right = _compile_node(node.left, names), _compile_node(node.right, names)
+
+        def binary(ctx: _Context) -> Number:
+            ctx.tick()
+            return _check_int(op(left(ctx), right(ctx)))
+
+        return binary
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        op = _UNARY_OPS[type(node.op)]
+        operand = _compile_node(node.operand, names)
+        return lambda ctx: op(operand(ctx))
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise CalcError(f"função não permitida: {ast.unparse(node.func)}")
+        fn = FUNCTIONS[node.func.id]
+        args = [_compile_node(arg, names) for arg in node.args]
+
+        def call(ctx: _Context) -> Number:
+            ctx.tick()
+            return _check_int(fn(*(arg(ctx) for arg in args)))
+
+        return call
+
+    raise CalcError(f"sintaxe não permitida: {type(node).__name__}")
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    source: str
+    names: FrozenSet[str]
+    _fn: Evaluator
+
+    def evaluate(self, variables: Optional[Mapping[str, Number]] = None, timeout: float = TIMEOUT_S) -> Number:
+        return _run(self._fn, _Context(variables or {}, time.perf_counter() + timeout))
+
+
+def _run(fn: Evaluator, ctx: _Context) -> Number:
+    try:
+        return fn(ctx)
+    except CalcError:
+        raise
+    except ZeroDivisionError:
+        raise CalcError("divisão por zero") from None
+    except OverflowError:
+        raise CalcError("resultado grande demais") from None
+    except (ValueError, TypeError) as exc:
+        message = "valor fora do domínio da função" if "domain" in str(exc) else str(exc)
+        raise CalcError(message) from None
+
+
+@functools.lru_cache(maxsize=int(os.getenv("CALC_CACHE_SIZE", 512)))
+def compile_expression(expression: str) -> CompiledExpression:
+    """Valida e compila (resultado em cache por texto normalizado)."""
+    source = normalize(expression)
+    if len(source) > MAX_EXPR_CHARS:
+        raise CalcError(f"expressão longa demais (máx. {MAX_EXPR_CHARS} caracteres)")
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as exc:
+        raise CalcError(f"sintaxe inválida: {exc.msg}") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise CalcError("expressão complexa demais")
+    names: set = set()
+    fn = _compile_node(tree.body, names)
+    return CompiledExpression(source, frozenset(names), fn)
+
+
+# ---------- API ----------
+def evaluate(expression: str, variables: Optional[Mapping[str, Number]] = None) -> Number:
+    return compile_expression(expression).evaluate(variables)
+
+
+def evaluate_many(
+    expression: str,
+    rows: Sequence[Union[Number, Mapping[str, Number]]],
+    var: str = "x",
+    timeout: float = BATCH_TIMEOUT_S,
+) -> List[Number]:
+    """
+    Avalia a expressão para cada item de `rows` (números → variável `var`,
+    ou dicionários de variáveis). Compila uma vez; o tempo limite vale para
+    o lote todo.
+    """
+    if len(rows) > MAX_VALUES:
+        raise CalcError(f"valores demais (máx. {MAX_VALUES})")
+    compiled = compile_expression(expression)
+    ctx = _Context({}, time.perf_counter() + timeout)
+    results: List[Number] = []
+    for i, row in enumerate(rows):
+        ctx.variables = row if isinstance(row, Mapping) else {var: row}
+        try:
+            results.append(_run(compiled._fn, ctx))
+        except CalcError as exc:
+            raise CalcError(f"{exc} (item {i}: {row})") from None
+    return results
+
+
+def _parse_bindings(parts: Sequence[str]) -> Dict[str, Union[Number, List[Number]]]:
+    """`x = [1, 2, 3]` / `y = 2 * pi` → valores (listas avaliadas item a item)."""
+    bindings: Dict[str, Union[Number, List[Number]]] = {}
+    for part in parts:
+        name, sep, value = part.partition("=")
+        name = name.strip()
+        if not sep or not name.isidentifier():
+            raise CalcError(f"atribuição inválida: {part.strip()!r} (use nome = valor)")
+        value = normalize(value)
+        if value.startswith("[") and len(value) <= MAX_VALUES * 32:
+            try:
+                node = ast.parse(value, mode="eval").body
+            except SyntaxError as exc:
+                raise CalcError(f"lista inválida: {exc.msg}") from None
+            if isinstance(node, (ast.List, ast.Tuple)):
+                if len(node.elts) > MAX_VALUES:
+                    raise CalcError(f"valores demais (máx. {MAX_VALUES})")
+                bindings[name] = [evaluate(ast.unparse(item)) for item in node.elts]
+                continue
+        bindings[name] = evaluate(value)
+    return bindings
+
+
+def calculate(text: str) -> Union[Number, List[Number]]:
+    """
+    Entrada da tool: `expressão` ou `expressão; x = [1, 2, 3]; y = 2`.
+    Listas (do mesmo tamanho) são percorridas em paralelo; escalares valem
+    para todos os itens.
+    """
+    text = text.strip().strip("\"'`")          # ReAct às vezes manda a entrada entre aspas
+    expression, *parts = [p for p in text.split(";") if p.strip()] or [""]
+    bindings = _parse_bindings(parts)
+    lists = {k: v for k, v in bindings.items() if isinstance(v, list)}
+    if not lists:
+        return compile_expression(expression).evaluate(bindings)
+    sizes = {len(v) for v in lists.values()}
+    if len(sizes) > 1:
+        raise CalcError("listas com tamanhos diferentes")
+    scalars = {k: v for k, v in bindings.items() if not isinstance(v, list)}
+    rows = [{**scalars, **{k: v[i] for k, v in lists.items()}} for i in range(sizes.pop())]
+    return evaluate_many(expression, rows)
+
+
+def format_number(value: Number) -> str:
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.12g}"
+    return str(value)
@@ -1,4 +1,18 @@
 # tools/pdf_generator/__init__.py
-from .pdf_generator import PDFGeneratorTool
+from .pdf_generator import (
+    CSVGeneratorTool,
+    ExportResult,
+    PDFGeneratorTool,
+    TXTGeneratorTool,
+    aexport_document,
+    export_document,
+)
 
-__all__ = ["PDFGeneratorTool"]
+__all__ = [
+    "PDFGeneratorTool",
+    "CSVGeneratorTool",
+    "TXTGeneratorTool",
+    "ExportResult",
+    "export_document",
+    "aexport_document",
+]
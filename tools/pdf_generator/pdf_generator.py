@@ -1,21 +1,184 @@
 # tools/pdf_generator/pdf_generator.py
 """
-Geração de PDF (exemplo simplificado). Modular para manter dependências (reportlab) isoladas.
+Exportação de documentos (PDF, CSV, TXT) para o agente:
+• Texto em streaming: quebra de linha e paginação sem montar o documento
+  inteiro na memória (ver writers.py)
+• Um arquivo único por pedido em EXPORT_DIR (nada de `output.pdf` fixo
+  sendo sobrescrito) ou bytes em memória
+• `_arun` roda num pool dedicado, fora do event loop
+• Cada exportação informa tempo de geração e tamanho
 """
-from langchain.tools import BaseTool
-from reportlab.pdfgen import canvas
 
+from __future__ import annotations
+import asyncio
+import functools
+import io
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
 
-class PDFGeneratorTool(BaseTool):
-    name = "pdf_generator"
-    description = "Gera um PDF simples com texto passado pelo usuário."
+from langchain_core.tools import BaseTool
+
+from .writers import WRITERS, iter_lines
+
+EXPORT_FORMATS = tuple(WRITERS)
+
+
+def export_dir() -> Path:
+    return Path(os.getenv("EXPORT_DIR", "exports"))
+
+
+@dataclass
+class ExportResult:
+    format: str
+    size_bytes: int
+    lines: int
+    seconds: float
+    pages: int = 0
+    path: Optional[Path] = None
+    data: Optional[bytes] = None        # só quando in_memory=True
+
+    def summary(self) -> str:
+        where = f"salvo em {self.path}" if self.path else "gerado em memória"
+        parts = [f"{self.format.upper()} {where}"]
+        parts.append(f"{self.pages} página(s)" if self.format == "pdf" else f"{self.lines} linha(s)")
+        parts.append(f"{self.size_bytes / 1024:.1f} KB")
+        parts.append(f"{self.seconds * 1000:.0f} ms")
+        return " · ".join(parts)
+
+
+def _slug(text: str, max_len: int = 40) -> str:
+    ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_text.lower()).strip("-")[:max_len].rstrip("-")
+
+
+def _title_of(text: str | Iterable[str]) -> str:
+    """Primeira linha não vazia (só para texto já completo)."""
+    if isinstance(text, str):
+        return next((line.strip() for line in iter_lines(text) if line.strip()), "")[:80]
+    return ""
+
+
+def unique_path(fmt: str, title: str = "", out_dir: Optional[Path] = None) -> Path:
+    name = f"{_slug(title) or 'documento'}-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.{fmt}"
+    return (out_dir or export_dir()) / name
+
+
+def export_document(
+    text: str | Iterable[str],
+    fmt: str = "pdf",
+    *,
+    title: Optional[str] = None,
+    out_dir: Optional[Path] = None,
+    in_memory: bool = False,
+) -> ExportResult:
+    """
+    Gera o documento a partir de `text` (string ou iterável de pedaços, ex.:
+    tokens de um stream). Em disco grava num `.part` e renomeia no fim: quem
+    lê nunca vê um arquivo pela metade.
+    """
+    fmt = fmt.lower().lstrip(".")
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato não suportado: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+    title = _title_of(text) if title is None else title
+    writer = WRITERS[fmt]
+    kwargs = {"title": title} if fmt == "pdf" else {}
+    start = time.perf_counter()
+
+    if in_memory:
+        buffer = io.BytesIO()
+        stats = writer(iter_lines(text), buffer, **kwargs)
+        data = buffer.getvalue()
+        return ExportResult(
+            format=fmt,
+            size_bytes=len(data),
+            lines=stats["linhas"],
+            pages=stats.get("paginas", 0),
+            seconds=time.perf_counter() - start,
+            data=data,
+        )
+
+    path = unique_path(fmt, title, out_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".part")
+    try:
+        with open(partial, "wb") as fh:
+            stats = writer(iter_lines(text), fh, **kwargs)
+        os.replace(partial, path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return ExportResult(
+        format=fmt,
+        size_bytes=path.stat().st_size,
+        lines=stats["linhas"],
+        pages=stats.get("paginas", 0),
+        seconds=time.perf_counter() - start,
+        path=path,
+    )
+
+
+# ---------- Pool de exportação ----------
+_pool_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv("EXPORT_WORKERS", 2)),
+                thread_name_prefix="export",
+            )
+        return _pool
+
+
+async def aexport_document(text: str | Iterable[str], fmt: str = "pdf", **kwargs) -> ExportResult:
+    """Versão assíncrona: a geração roda no pool de exportação (EXPORT_WORKERS)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), functools.partial(export_document, text, fmt, **kwargs))
+
+
+# ---------- Ferramentas ----------
+class DocumentExportTool(BaseTool):
+    fmt: str = "pdf"
+    handle_tool_error: bool = True
 
     def _run(self, text: str) -> str:
-        file_name = "output.pdf"
-        c = canvas.Canvas(file_name)
-        c.drawString(72, 720, text)
-        c.save()
-        return f"PDF salvo em {file_name}"
+        return export_document(text, self.fmt).summary()
 
     async def _arun(self, text: str) -> str:
-        raise NotImplementedError("Versão async não implementada.")
+        return (await aexport_document(text, self.fmt)).summary()
+
+
+class PDFGeneratorTool(DocumentExportTool):
+    name: str = "pdf_generator"
+    description: str = (
+        "Gera um arquivo PDF com o texto fornecido (texto longo é quebrado em "
+        "linhas e páginas). A primeira linha vira o título."
+    )
+    fmt: str = "pdf"
+
+
+class CSVGeneratorTool(DocumentExportTool):
+    name: str = "csv_generator"
+    description: str = (
+        "Gera um arquivo CSV com o texto fornecido. Tabelas (CSV, ';', TSV ou "
+        "markdown) viram colunas; texto corrido vira uma linha por linha."
+    )
+    fmt: str = "csv"
+
+
+class TXTGeneratorTool(DocumentExportTool):
+    name: str = "txt_generator"
+    description: str = "Gera um arquivo TXT com o texto fornecido."
+    fmt: str = "txt"
@@ -0,0 +1,239 @@
+# tools/pdf_generator/writers.py
+"""
+Escritores em streaming (PDF, CSV, TXT): recebem um iterador de linhas e
+gravam direto no arquivo/buffer, sem montar o documento inteiro na memória.
+
+O PDF usa o reportlab (extra `pdf`, import só na primeira exportação):
+Helvetica padrão ou a TTF de PDF_FONT_PATH, uma página por `showPage()`.
+"""
+
+from __future__ import annotations
+import csv
+import io
+import os
+from itertools import chain, islice
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# ---------- Linhas ----------
+def iter_lines(source: str | Iterable[str]) -> Iterator[str]:
+    """Quebra texto (ou pedaços de texto, ex.: tokens) em linhas, preguiçosamente."""
+    pending = ""
+    for chunk in [source] if isinstance(source, str) else source:
+        pending += chunk
+        start = 0
+        while (end := pending.find("\n", start)) != -1:
+            yield pending[start:end].rstrip("\r")
+            start = end + 1
+        pending = pending[start:]
+    if pending:
+        yield pending.rstrip("\r")
+
+
+# ---------- Quebra de linha ----------
+def wrap_line(line: str, max_width: float, width_of: Callable[[str], float]) -> List[str]:
+    """Quebra gulosa por palavras (`width_of` mede em pontos); palavra maior que a linha é cortada."""
+    if not line.strip():
+        return [""]
+    space = width_of(" ")
+    out: List[str] = []
+    current: List[str] = []
+    width = 0.0
+    for word in line.split(" "):
+        w = width_of(word)
+        if current and width + space + w <= max_width:
+            current.append(word)
+            width += space + w
+            continue
+        if current:
+            out.append(" ".join(current))
+        while w > max_width:
+            cut = 1
+            while cut < len(word) and width_of(word[:cut + 1]) <= max_width:
+                cut += 1
+            out.append(word[:cut])
+            word = word[cut:]
+            w = width_of(word)
+        current, width = [word], w
+    out.append(" ".join(current))
+    return out
+
+
+# ---------- PDF ----------
+A4 = (595.28, 841.89)
+
+
+def _pdf_font() -> Tuple[str, Callable[[str], bool]]:
+    """
+    Fonte do PDF e o teste de cobertura dos seus glifos. Padrão: Helvetica
+    (WinAnsi/cp1252, sem arquivo). PDF_FONT_PATH aponta uma TTF para texto
+    fora desse conjunto (CJK, emoji, símbolos).
+    """
+    path = os.getenv("PDF_FONT_PATH")
+    if not path:
+        def covers(ch: str) -> bool:
+            try:
+                ch.encode("cp1252")
+                return True
+            except UnicodeEncodeError:
+                return False
+        return "Helvetica", covers
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    name = Path(path).stem
+    if name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(name, path))
+    glyphs = pdfmetrics.getFont(name).face.charToGlyph
+    return name, lambda ch: ord(ch) in glyphs
+
+
+class PdfStreamWriter:
+    """
+    Escreve um PDF (reportlab) página a página em `fh` (binário): as linhas
+    quebradas se acumulam só até encher a página, que é fechada com
+    `showPage()`. Caractere sem glifo na fonte é erro — nada de "?" no lugar.
+    """
+
+    def __init__(
+        self,
+        fh: BinaryIO,
+        title: str = "",
+        font_size: float = 10,
+        page_size: tuple[float, float] = A4,
+        margin: float = 56,
+    ) -> None:
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        from reportlab.pdfgen.canvas import Canvas
+
+        self.font, self._covers = _pdf_font()
+        self.font_size = font_size
+        self.width, self.height = page_size
+        self.margin = margin
+        self.leading = font_size * 1.4
+        self.lines_per_page = max(1, int((self.height - 2 * margin - self.leading) // self.leading))
+        self._width_of = lambda text: stringWidth(text, self.font, font_size)
+        self._canvas = Canvas(fh, pagesize=page_size, pageCompression=1)
+        self._canvas.setTitle(title)
+        self._canvas.setCreator("igor_portifolio_backend")
+        self._page: List[str] = []
+        self.pages = 0
+        self.lines = 0
+        self._source_lines = 0
+
+    def _check(self, line: str) -> None:
+        missing = sorted({ch for ch in line if not self._covers(ch)})
+        if missing:
+            chars = ", ".join(f"{ch!r} (U+{ord(ch):04X})" for ch in missing)
+            raise ValueError(
+                f"Linha {self._source_lines}: caractere(s) sem glifo na fonte {self.font}: {chars}. "
+                "Defina PDF_FONT_PATH com uma fonte TTF que os cubra."
+            )
+
+    def write_line(self, line: str) -> None:
+        self._source_lines += 1
+        line = line.replace("\t", "    ")
+        self._check(line)
+        for piece in wrap_line(line, self.width - 2 * self.margin, self._width_of):
+            self._page.append(piece)
+            self.lines += 1
+            if len(self._page) >= self.lines_per_page:
+                self._flush_page()
+
+    def _flush_page(self) -> None:
+        canvas = self._canvas
+        text = canvas.beginText(self.margin, self.height - self.margin - self.font_size)
+        text.setFont(self.font, self.font_size, self.leading)
+        for line in self._page:
+            text.textLine(line)
+        canvas.drawText(text)
+        self.pages += 1
+        canvas.setFont(self.font, 8)
+        canvas.drawCentredString(self.width / 2, self.margin / 2, str(self.pages))
+        canvas.showPage()
+        self._page = []
+
+    def close(self) -> None:
+        if self._page or not self.pages:
+            self._flush_page()
+        self._canvas.save()
+
+
+def write_pdf(lines: Iterable[str], fh: BinaryIO, title: str = "", font_size: float = 10) -> Dict[str, int]:
+    writer = PdfStreamWriter(fh, title=title, font_size=font_size)
+    for line in lines:
+        writer.write_line(line)
+    writer.close()
+    return {"linhas": writer.lines, "paginas": writer.pages}
+
+
+# ---------- TXT ----------
+def write_txt(lines: Iterable[str], fh: BinaryIO) -> Dict[str, int]:
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="\n")
+    count = 0
+    for line in lines:
+        text.write(line + "\n")
+        count += 1
+    text.flush()
+    text.detach()                       # não fecha o arquivo/buffer do chamador
+    return {"linhas": count}
+
+
+# ---------- CSV ----------
+_DELIMITERS = ",;\t|"
+_SNIFF_LINES = 20
+
+
+def _detect_delimiter(sample: List[str]) -> Optional[str]:
+    """Delimitador presente com a mesma contagem em todas as linhas da amostra."""
+    rows = [line for line in sample if line.strip()]
+    if len(rows) < 2:
+        return None
+    for delim in _DELIMITERS:
+        # Tabela markdown: as bordas "| a | b |" não contam como separador
+        counts = {(line.strip().strip("|") if delim == "|" else line).count(delim) for line in rows}
+        if len(counts) == 1 and counts.pop() > 0:
+            return delim
+    return None
+
+
+def _table_row(line: str, delim: str) -> Optional[List[str]]:
+    if delim == "|":                    # tabela markdown
+        line = line.strip().strip("|")
+        cells = [c.strip() for c in line.split("|")]
+        return None if all(set(c) <= set("-: ") for c in cells) else cells
+    return next(csv.reader([line], delimiter=delim))
+
+
+def write_csv(lines: Iterable[str], fh: BinaryIO) -> Dict[str, int]:
+    """
+    Texto tabular (CSV, ;, TSV ou tabela markdown) vira linhas/colunas;
+    texto corrido vira uma linha por linha de texto (colunas linha, texto).
+    """
+    lines = iter(lines)
+    sample = list(islice(lines, _SNIFF_LINES))
+    delim = _detect_delimiter(sample)
+
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")   # BOM: Excel abre acentos certos
+    writer = csv.writer(text)
+    count = 0
+    if delim is None:
+        writer.writerow(["linha", "texto"])
+    for line in chain(sample, lines):
+        if delim is None:
+            if line.strip():
+                count += 1
+                writer.writerow([count, line])
+            continue
+        row = _table_row(line, delim) if line.strip() else None
+        if row is not None:
+            writer.writerow(row)
+            count += 1
+    text.flush()
+    text.detach()
+    return {"linhas": count}
+
+
+WRITERS = {"pdf": write_pdf, "csv": write_csv, "txt": write_txt}
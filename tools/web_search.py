@@ -1,34 +1,308 @@
 """
-Exemplo de ferramenta que chama um endpoint externo – separada para
-facilitar testes, dependências e futuras extensões.
+Ferramenta de busca na Web (DuckDuckGo HTML) – separada para facilitar
+testes, dependências e futuras extensões:
+• Clientes HTTP keep-alive compartilhados (httpx): um síncrono e um
+  assíncrono por event loop, fechado quando o loop encerra — `_arun` não
+  ocupa thread do pool
+• Parser HTML que extrai (título, URL, trecho) e devolve só isso ao agente,
+  em vez de HTML bruto
+• Cache com TTL + LRU por consulta normalizada
+• Endpoint configurável (WEB_SEARCH_URL) — dá para testar contra um
+  servidor local
 """
 
+from __future__ import annotations
 import os
-import requests
-from langchain.tools import BaseTool, ToolException
+import threading
+import time
+import unicodedata
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlparse
 
+from langchain_core.tools import BaseTool, ToolException
 
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+def search_url() -> str:
+    return os.getenv("WEB_SEARCH_URL", "https://html.duckduckgo.com/html/")
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    title: str
+    url: str
+    snippet: str
+
+
+# ---------- Parser ----------
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _resolve_url(href: str, base: str) -> str:
+    """Links do DuckDuckGo passam por /l/?uddg=<destino>; devolve o destino."""
+    url = urljoin(base, href)
+    parsed = urlparse(url)
+    if parsed.path.endswith("/l/"):
+        target = parse_qs(parsed.query).get("uddg")
+        if target:
+            return target[0]
+    return url
+
+
+class ResultParser(HTMLParser):
+    """Extrai resultados do HTML do DuckDuckGo (classes result__a / result__snippet)."""
+
+    def __init__(self, base_url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.results: List[SearchResult] = []
+        self._title: Optional[List[str]] = None
+        self._snippet: Optional[List[str]] = None
+        self._href = ""
+        self._field: Optional[str] = None     # "title" | "snippet"
+        self._tag = ""
+        self._depth = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._field is not None:
+            if tag == self._tag:
+                self._depth += 1
+            return
+        attributes = dict(attrs)
+        classes = (attributes.get("class") or "").split()
+        if "result__a" in classes:
+            self._flush()
+            self._title, self._href = [], attributes.get("href") or ""
+            self._field, self._tag, self._depth = "title", tag, 1
+        elif "result__snippet" in classes and self._title is not None:
+            self._snippet = []
+            self._field, self._tag, self._depth = "snippet", tag, 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._field is not None and tag == self._tag:
+            self._depth -= 1
+            if self._depth == 0:
+                self._field = None
+
+    def handle_data(self, data: str) -> None:
+        if self._field == "title":
+            self._title.append(data)
+        elif self._field == "snippet":
+            self._snippet.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._title is not None:
+            url = _resolve_url(self._href, self.base_url)
+            title = _clean("".join(self._title))
+            # Anúncios apontam para duckduckgo.com/y.js
+            if title and url and not urlparse(url).netloc.endswith("duckduckgo.com"):
+                self.results.append(SearchResult(title, url, _clean("".join(self._snippet or []))))
+        self._title = self._snippet = None
+
+
+def parse_results(html: str, base_url: str = "https://duckduckgo.com/", limit: int = 5) -> List[SearchResult]:
+    parser = ResultParser(base_url)
+    parser.feed(html)
+    parser.close()
+    seen: set[str] = set()
+    unique = [r for r in parser.results if not (r.url in seen or seen.add(r.url))]
+    return unique[:limit]
+
+
+def format_results(query: str, results: List[SearchResult], snippet_chars: int = 200) -> str:
+    """Texto compacto para o prompt do agente: título, URL e trecho curto."""
+    if not results:
+        return f"Nenhum resultado encontrado para: {query}"
+    lines = []
+    for i, r in enumerate(results, 1):
+        snippet = r.snippet if len(r.snippet) <= snippet_chars else r.snippet[: snippet_chars - 1].rstrip() + "…"
+        lines.append(f"{i}. {r.title} — {r.url}" + (f"\n   {snippet}" if snippet else ""))
+    return "\n".join(lines)
+
+
+# ---------- Cache ----------
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class SearchCache:
+    """TTL + LRU; chave = consulta normalizada."""
+
+    def __init__(self, ttl: float = 900, max_entries: int = 256) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, List[SearchResult]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[List[SearchResult]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, results: List[SearchResult]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entradas": len(self._entries)}
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> SearchCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache(
+                ttl=float(os.getenv("WEB_SEARCH_CACHE_TTL", 900)),
+                max_entries=int(os.getenv("WEB_SEARCH_CACHE_MAX", 256)),
+            )
+        return _cache
+
+
+# ---------- Clientes HTTP ----------
+_client_lock = threading.Lock()
+_sync_client: Any = None
+# AsyncClient fica preso ao loop em que abriu conexões: um por event loop,
+# fechado quando o loop encerra (ver `_close_with_loop`)
+_async_clients: "weakref.WeakKeyDictionary[Any, Tuple[Any, Any]]" = weakref.WeakKeyDictionary()
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "headers": {"User-Agent": USER_AGENT},
+        "timeout": httpx.Timeout(float(os.getenv("WEB_SEARCH_TIMEOUT", 10)), connect=5.0),
+        "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        "follow_redirects": True,
+    }
+
+
+def get_client() -> Any:
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None:
+            import httpx
+
+            _sync_client = httpx.Client(**_client_kwargs())
+        return _sync_client
+
+
+async def _close_with_loop(client: Any) -> Any:
+    """
+    Gerador assíncrono que fica suspenso enquanto o loop vive: no
+    encerramento (`loop.shutdown_asyncgens()`, chamado por `asyncio.run`)
+    o loop o finaliza e o `finally` fecha o cliente ainda dentro do loop.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def get_async_client() -> Any:
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        entry = _async_clients.get(loop)
+        if entry is None or entry[0].is_closed:
+            import httpx
+
+            client = httpx.AsyncClient(**_client_kwargs())
+            entry = _async_clients[loop] = (client, _close_with_loop(client))
+        else:
+            return entry[0]
+    await entry[1].__anext__()               # registra o gerador no loop
+    return entry[0]
+
+
+async def aclose_async_client() -> None:
+    """Fecha já o cliente do loop corrente (encerramento explícito da aplicação)."""
+    import asyncio
+
+    with _client_lock:
+        entry = _async_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+
+# ---------- Ferramenta ----------
 class WebSearchTool(BaseTool):
-    name = "web_search"
-    description = (
+    name: str = "web_search"
+    description: str = (
         "Busca rápida na Web via DuckDuckGo. "
-        "Use quando precisar de dados públicos atualizados."
+        "Use quando precisar de dados públicos atualizados. "
+        "Entrada: a consulta. Saída: títulos, URLs e trechos."
     )
+    handle_tool_error: bool = True    # falha vira observação para o agente
+    max_results: int = int(os.getenv("WEB_SEARCH_MAX_RESULTS", 5))
+    snippet_chars: int = int(os.getenv("WEB_SEARCH_SNIPPET_CHARS", 200))
 
-    def _run(self, query: str) -> str:  # noqa: D401
-        try:
-            resp = requests.get(
-                "https://duckduckgo.com/html/",
-                params={"q": query},
-                timeout=10,
-            )
-            resp.raise_for_status()
-        except Exception as exc:
-            raise ToolException(f"Falha na busca web: {exc}") from exc
+    def _params(self, query: str) -> Dict[str, str]:
+        return {"q": query, "kl": os.getenv("WEB_SEARCH_REGION", "br-pt")}
+
+    def _parse(self, query: str, resp: Any) -> List[SearchResult]:
+        resp.raise_for_status()
+        return parse_results(resp.text, str(resp.url), self.max_results)
 
-        # parse HTML simples (placeholder)
-        return f"Resultados brutos: {resp.text[:500]}..."
+    def search(self, query: str) -> List[SearchResult]:
+        key = normalize_query(query)
+        cache = get_search_cache()
+        results = cache.get(key)
+        if results is None:
+            try:
+                results = self._parse(query, get_client().get(search_url(), params=self._params(query)))
+            except Exception as exc:  # noqa: BLE001
+                raise ToolException(f"Falha na busca web: {exc}") from exc
+            cache.put(key, results)
+        return results
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        key = normalize_query(query)
+        cache = get_search_cache()
+        results = cache.get(key)
+        if results is None:
+            try:
+                client = await get_async_client()
+                resp = await client.get(search_url(), params=self._params(query))
+                results = self._parse(query, resp)
+            except Exception as exc:  # noqa: BLE001
+                raise ToolException(f"Falha na busca web: {exc}") from exc
+            cache.put(key, results)
+        return results
+
+    def _run(self, query: str) -> str:  # noqa: D401
+        return format_results(query, self.search(query), self.snippet_chars)
 
     async def _arun(self, query: str) -> str:
-        """Versão assíncrona opcional"""
-        raise NotImplementedError("Versão async não implementada.")
+        return format_results(query, await self.asearch(query), self.snippet_chars)